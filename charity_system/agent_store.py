@@ -0,0 +1,269 @@
+# agent_store.py — the agent directory: compacted JSON snapshot plus an append-only change log
+import json
+import os
+import tempfile
+import threading
+
+DIRECTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents", "agent_directory.json")
+
+
+def atomic_write_json(path, data, **dump_kw):
+    """Write JSON to a temp file in the same directory, fsync, then os.replace over `path`."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp.", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+class AgentStore:
+    """Agent name -> agent ID, shared by the provisioning scripts and the servers.
+
+    agent_directory.json is the compacted snapshot; agent_directory.log holds
+    one JSON line per change made since ({"name", "id"}, or {"name",
+    "deleted": true}). A batch of changes is one append and one fsync, and
+    once the log holds compact_every entries the snapshot is rewritten
+    atomically and the log truncated. The current state is `agents`, a dict
+    that is replaced (never mutated) on every change, so readers need no
+    lock. refresh() picks up other processes' changes by reading only the
+    new log bytes (a full reload only after a compaction); watch() does that
+    in the background. subscribe(fn) calls fn(changes) with {name: id or
+    None} after every change, local or reloaded.
+
+    One process should write at a time; any number may read.
+    """
+
+    def __init__(self, path=DIRECTORY_FILE, compact_every=256):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".log"
+        self.compact_every = compact_every
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.agents = {}
+        self.version = 0
+        self._stop = threading.Event()
+        self._load()
+
+    # === Reading ===
+    def _load(self):
+        agents = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                agents = json.load(f)
+        self._snapshot_stat = _stat(self.path)
+        self._offset = 0
+        self._log_entries = 0
+        self._replay(agents)
+        self.agents = agents
+
+    def _replay(self, agents):
+        """Apply log lines past self._offset to `agents`; returns {name: id or None} changed."""
+        changes = {}
+        if not os.path.exists(self.log_path):
+            return changes
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # a torn last line (writer mid-append or crashed) waits for its newline
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            name = entry["name"]
+            if entry.get("deleted"):
+                agents.pop(name, None)
+                changes[name] = None
+            else:
+                agents[name] = entry["id"]
+                changes[name] = entry["id"]
+            self._log_entries += 1
+        self._offset += end
+        return changes
+
+    def get(self, name, default=None):
+        return self.agents.get(name, default)
+
+    def __getitem__(self, name):
+        return self.agents[name]
+
+    def __contains__(self, name):
+        return name in self.agents
+
+    def __len__(self):
+        return len(self.agents)
+
+    def items(self):
+        return self.agents.items()
+
+    # === Writing ===
+    def _append(self, changes):
+        if not changes:
+            return
+        lines = "".join(json.dumps({"name": name, "deleted": True} if agent_id is None else {"name": name, "id": agent_id},
+                                   ensure_ascii=False) + "\n" for name, agent_id in changes.items())
+        with open(self.log_path, "ab") as f:
+            f.write(lines.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            self._offset = f.tell()
+        agents = dict(self.agents)
+        for name, agent_id in changes.items():
+            if agent_id is None:
+                agents.pop(name, None)
+            else:
+                agents[name] = agent_id
+        self.agents = agents
+        self.version += 1
+        self._log_entries += len(changes)
+        if self._log_entries >= self.compact_every:
+            self.compact()
+        self._notify(changes)
+
+    def add_agents(self, agents):
+        """Add or update many agents in one append; entries that are already current are skipped."""
+        with self.lock:
+            self.refresh()
+            changes = {name: agent_id for name, agent_id in dict(agents).items() if self.agents.get(name) != agent_id}
+            self._append(changes)
+            return changes
+
+    def add_agent(self, name, agent_id):
+        return self.add_agents({name: agent_id})
+
+    def remove_agents(self, names):
+        with self.lock:
+            self.refresh()
+            changes = {name: None for name in names if name in self.agents}
+            self._append(changes)
+            return changes
+
+    def compact(self):
+        """Rewrite the snapshot with the current state and empty the log."""
+        with self.lock:
+            atomic_write_json(self.path, dict(sorted(self.agents.items(), key=lambda kv: kv[0].casefold())),
+                              indent=2, ensure_ascii=False)
+            # Snapshot first, then truncate: a reader in between replays entries that are already applied
+            with open(self.log_path, "wb") as f:
+                os.fsync(f.fileno())
+            self._snapshot_stat = _stat(self.path)
+            self._offset = self._log_entries = 0
+
+    # === Hot reload ===
+    def subscribe(self, fn):
+        self.listeners.append(fn)
+        return fn
+
+    def _notify(self, changes):
+        for fn in list(self.listeners):
+            try:
+                fn(changes)
+            except Exception as e:
+                print(f"Agent directory listener failed: {e}")
+
+    def refresh(self, notify=True):
+        """Pick up changes written by other processes; returns {name: id or None} that changed."""
+        with self.lock:
+            log = _stat(self.log_path)
+            if _stat(self.path) != self._snapshot_stat or (log[2] if log else 0) < self._offset:
+                # Compacted elsewhere: reload the snapshot and diff it against what we had
+                before = self.agents
+                self._load()
+                changes = {name: self.agents.get(name) for name in before.keys() | self.agents.keys()
+                           if before.get(name) != self.agents.get(name)}
+            elif log and log[2] > self._offset:
+                agents = dict(self.agents)
+                changes = self._replay(agents)
+                if not changes:
+                    return changes
+                self.agents = agents
+            else:
+                return {}
+            if changes:
+                self.version += 1
+                if notify:
+                    self._notify(changes)
+            return changes
+
+    def watch(self, interval=2.0):
+        """Refresh in a background thread every `interval` seconds (two stat calls when nothing changed)."""
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Agent directory reload failed: {e}")
+
+        threading.Thread(target=loop, daemon=True, name="agent-directory").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+# === Demo: bulk registration and hot reload against the old rewrite-per-agent manager ===
+if __name__ == "__main__":
+    import time
+
+    tmp = tempfile.mkdtemp()
+    n = 2_000
+    agents = {f"Agent {i:05d}": f"agent_{os.urandom(14).hex()}" for i in range(n)}
+
+    # Old behaviour: json.dump of the whole directory on every add_agent
+    old_path, old = os.path.join(tmp, "old.json"), {}
+    t0 = time.perf_counter()
+    for name, agent_id in agents.items():
+        old[name] = agent_id
+        with open(old_path, "w") as f:
+            json.dump(old, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+    t_old = time.perf_counter() - t0
+
+    store = AgentStore(os.path.join(tmp, "agent_directory.json"))
+    t0 = time.perf_counter()
+    for name, agent_id in agents.items():
+        store.add_agent(name, agent_id)
+    t_single = time.perf_counter() - t0
+    batch = {name: agent_id + "x" for name, agent_id in agents.items()}
+    t0 = time.perf_counter()
+    store.add_agents(batch)
+    t_batch = time.perf_counter() - t0
+    print(f"{n} registrations: rewrite per agent {t_old:.2f} s, one append each {t_single:.2f} s, "
+          f"one add_agents() batch {t_batch * 1e3:.1f} ms")
+
+    reader = AgentStore(store.path)
+    seen = []
+    reader.subscribe(lambda changes: seen.append((time.perf_counter(), changes)))
+    reader.watch(interval=0.05)
+    t0 = time.perf_counter()
+    for _ in range(100_000):
+        reader.get("Agent 00042")
+    per_read = (time.perf_counter() - t0) / 100_000
+    t0 = time.perf_counter()
+    for _ in range(1_000):
+        reader.refresh()
+    per_idle_refresh = (time.perf_counter() - t0) / 1_000
+    t0 = time.perf_counter()
+    store.add_agent("Orchestrator Agent", "agent_new")
+    time.sleep(0.2)
+    print(f"reads {per_read * 1e9:.0f} ns, idle refresh {per_idle_refresh * 1e6:.1f} µs; "
+          f"reader saw {seen[-1][1]} {(seen[-1][0] - t0) * 1e3:.0f} ms after the write (poll 50 ms)")
+    store.compact()
+    time.sleep(0.2)
+    assert reader.agents == store.agents == AgentStore(store.path).agents
+    print(f"after compaction: log {os.path.getsize(store.log_path)} bytes, {len(reader)} agents, reader in sync")
+    reader.stop()
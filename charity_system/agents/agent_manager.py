@@ -1,29 +1,39 @@
 import json
 import os
+import sys
 from datetime import datetime
 
+# The directory itself lives in the backend's agent_store: snapshot + append-only log, shared with the servers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_store import AgentStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
 class AgentDirectoryManager:
-    def __init__(self, directory_file='agent_directory.json'):
+    def __init__(self, directory_file=os.path.join(HERE, 'agent_directory.json')):
         self.directory_file = directory_file
-        self.agents = self.load_directory()
-    
-    def load_directory(self):
-        """Load the agent directory from JSON file"""
-        if os.path.exists(self.directory_file):
-            with open(self.directory_file, 'r') as f:
-                return json.load(f)
-        return {}
-    
-    def save_directory(self):
-        """Save the agent directory to JSON file"""
-        with open(self.directory_file, 'w') as f:
-            json.dump(self.agents, f, indent=2)
+        self.store = AgentStore(directory_file)
+
+    @property
+    def agents(self):
+        """Current name -> ID mapping (picks up changes made by other processes)"""
+        self.store.refresh()
+        return self.store.agents
     
     def add_agent(self, agent_name, agent_id):
         """Add or update an agent in the directory"""
-        self.agents[agent_name] = agent_id
-        self.save_directory()
-        print(f"✅ Added {agent_name}: {agent_id}")
+        if self.store.add_agent(agent_name, agent_id):
+            print(f"✅ Added {agent_name}: {agent_id}")
+
+    def add_agents(self, agents):
+        """Add or update many agents with a single log append"""
+        changes = self.store.add_agents(agents)
+        print(f"✅ Registered {len(changes)} agent(s), {len(agents) - len(changes)} already current")
+        return changes
+    
+    def save_directory(self):
+        """Fold the change log into agent_directory.json"""
+        self.store.compact()
     
     def get_agent_id(self, agent_name):
         """Get agent ID by name"""
@@ -51,10 +61,15 @@ class AgentDirectoryManager:
         
         print("✅ System configuration exported to agent_system_config.json")
 
+def load_agent_directory():
+    """Name -> ID for scripts that only read the directory"""
+    return AgentStore(os.path.join(HERE, 'agent_directory.json')).agents
+
 # Usage example
 if __name__ == "__main__":
     manager = AgentDirectoryManager()
     manager.list_agents()
     
     # Example: Add a new agent
-    # manager.add_agent("New Agent Name", "agent_123456789")
\ No newline at end of file
+    # manager.add_agent("New Agent Name", "agent_123456789")
+    # Or many at once: manager.add_agents({"Agent A": "agent_...", "Agent B": "agent_..."})
\ No newline at end of file
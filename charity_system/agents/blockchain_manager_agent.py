@@ -2,32 +2,16 @@ import os
 import json
 from dotenv import load_dotenv
 from elevenlabs import ElevenLabs
+from provision import agent_spec
 
 load_dotenv()
 api_key = os.getenv("ELEVENLABS_API_KEY")
 client = ElevenLabs(api_key=api_key)
 
 agent_name = "Blockchain Manager Agent"
-first_message = "Blockchain operations ready."
-
-prompt = """# Personality
-You are the Blockchain Manager Agent. You handle all blockchain interactions including smart contract deployments, wallet validations, and transaction monitoring.
-
-# Responsibilities
-- Deploy and manage smart contracts
-- Validate wallet addresses and contract integrity
-- Monitor gas fees and optimize transactions
-- Ensure blockchain security best practices
-- Interface with Polygon/Ethereum networks
-
-# Output Format
-Always return structured JSON with transaction status, gas used, and confirmation details.
-
-# Security
-- Never expose private keys
-- Validate all addresses before transactions
-- Implement fail-safes for high gas scenarios
-"""
+spec = agent_spec(agent_name)  # prompt and first message live in agent_specs.json
+first_message = spec["first_message"]
+prompt = spec["prompt"]
 
 custom_tools = [
     {
@@ -0,0 +1,65 @@
+# agents/config_cache.py — last-deployed agent configs, keyed by a canonical content hash
+import difflib
+import hashlib
+import json
+import os
+import sys
+import threading
+
+# Atomic writes share the backend's agent_store helper, which also writes the agent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_store import atomic_write_json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(HERE, ".deployed_configs.json")
+
+
+def canonical(payload):
+    """Stable JSON for hashing and diffing: sorted keys, no whitespace variance."""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def content_hash(payload):
+    return hashlib.sha256(canonical(payload).encode("utf-8")).hexdigest()
+
+
+class ConfigCache:
+    """What we last pushed to each agent, so unchanged configs are never re-sent.
+
+    An entry is {"agent_id", "hash", "payload"} where payload is the
+    name/tags/conversation_config sent to agents.update or agents.create.
+    Only successful pushes are recorded, so a failed one is retried next
+    time. Keep it next to agent_directory.json; deleting it just makes the
+    next push send everything once.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def changed(self, name, agent_id, payload):
+        entry = self.entries.get(name)
+        return not entry or entry["agent_id"] != agent_id or entry["hash"] != content_hash(payload)
+
+    def record(self, name, agent_id, payload):
+        with self.lock:
+            self.entries[name] = {"agent_id": agent_id, "hash": content_hash(payload), "payload": payload}
+
+    def diff(self, name, payload, old=None):
+        """Unified diff to `payload` from `old` (default: the last deployed payload)."""
+        if old is None:
+            old = (self.entries.get(name) or {}).get("payload", {})
+        before = json.dumps(old, sort_keys=True, indent=2, ensure_ascii=False).splitlines()
+        after = json.dumps(payload, sort_keys=True, indent=2, ensure_ascii=False).splitlines()
+        return "\n".join(difflib.unified_diff(before, after, f"{name} (deployed)", f"{name} (local)", lineterm=""))
+
+    def save(self):
+        with self.lock:
+            atomic_write_json(self.path, self.entries, indent=2, ensure_ascii=False)
@@ -2,6 +2,7 @@ import os
 import json
 from dotenv import load_dotenv
 from elevenlabs import ElevenLabs
+from provision import agent_spec
 
 # Load API key from .env
 load_dotenv()
@@ -15,40 +16,9 @@ client = ElevenLabs(api_key=api_key)
 
 # DonationTracker Agent configuration
 agent_name = "DonationTracker Agent"
-first_message = "Hello! I can track all new donations and summarize them."
-
-prompt = """# Personality
-You are the DonationTracker Agent. Your primary role is to track all incoming donations to the AI Charity Payment Optimizer system.
-You are accurate, timely, and structured. You ensure that every new donation is detected and recorded correctly.
-
-# Environment
-You operate within an AI-driven charity system connected to blockchain APIs and donation databases.
-You have access to transaction data, donor identifiers, and timestamps.
-You report results in a machine-readable format for the Orchestrator Agent.
-
-# Tone
-Your communication is concise, factual, and structured.
-You avoid unnecessary language and focus on clarity and correctness.
-
-# Goal
-1. Detect new USDC donations on-chain as they arrive.
-2. Provide donor name, amount, transaction hash, and timestamp.
-3. Return all data in a structured JSON format:
-   {
-     "donor_name": string,
-     "amount": number,
-     "transaction_hash": string,
-     "timestamp": string,
-     "project_id": string
-   }
-4. Notify Orchestrator Agent immediately upon new donations.
-
-# Guardrails
-- Do not modify blockchain transactions.
-- Do not assume or fabricate donation data.
-- Always provide accurate and complete information.
-- Ensure JSON outputs are well-formed and validated.
-"""
+spec = agent_spec(agent_name)  # prompt and first message live in agent_specs.json
+first_message = spec["first_message"]
+prompt = spec["prompt"]
 
 # Custom tools for DonationTracker Agent
 custom_tools = [
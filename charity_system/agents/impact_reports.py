@@ -0,0 +1,267 @@
+# agents/impact_reports.py — every donor's impact report in one local batch, streamed out
+#
+#   python impact_reports.py --db charity.db --since 2025-07-01 --until 2025-09-30 --out q3.jsonl
+#   python impact_reports.py --donations d.csv --disbursements x.csv --milestones m.csv --per-donor reports/
+#   python impact_reports.py --benchmark 200000
+#
+# Tables (SQLite tables or .csv/.jsonl files with these columns):
+#   donations(donor, project_id, amount, timestamp)
+#   disbursements(project_id, amount, tx_hash, timestamp)
+#   milestones(project_id, milestone_id, status, verified_at)      status "verified" counts as completed
+import argparse
+import csv
+import datetime
+import json
+import os
+import re
+import sqlite3
+from collections import defaultdict
+
+import numpy as np
+
+CHUNK = 50_000
+
+
+def _time(value):
+    """Epoch seconds from an epoch number or an ISO date/datetime string."""
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return (parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.timezone.utc)).timestamp()
+
+
+def _read_file(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+class Tables:
+    """The three input tables, from one SQLite file or from separate CSV/JSONL files."""
+
+    def __init__(self, db=None, donations=None, disbursements=None, milestones=None):
+        self.db = sqlite3.connect(db) if db else None
+        self.files = {"donations": donations, "disbursements": disbursements, "milestones": milestones}
+
+    def rows(self, table, columns):
+        if self.db:
+            yield from self.db.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        elif self.files[table]:
+            for row in _read_file(self.files[table]):
+                yield tuple(row.get(c) for c in columns)
+
+    def donation_chunks(self, since=None, until=None, chunk=CHUNK):
+        """(donor, project_id, amount) column arrays, sorted by donor then project, chunk rows at a time."""
+        since, until = since or float("-inf"), until or float("inf")
+        if self.db:
+            # SQLite sorts and streams; only one chunk is in memory at a time
+            cursor = self.db.execute("SELECT donor, project_id, amount, timestamp FROM donations ORDER BY donor, project_id")
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    return
+                rows = [r for r in rows if since <= (_time(r[3]) or 0) <= until]
+                if rows:
+                    donors, projects, amounts, _ = zip(*rows)
+                    yield np.array(donors, dtype=object), np.array(projects, dtype=object), np.array(amounts, dtype=float)
+        # Files are read into columns (tens of bytes per donation) and sorted once
+        donors, projects, amounts = [], [], []
+        for donor, project, amount, ts in self.rows("donations", ("donor", "project_id", "amount", "timestamp")):
+            if since <= (_time(ts) or 0) <= until:
+                donors.append(donor)
+                projects.append(project)
+                amounts.append(float(amount))
+        donor_names, donor_codes = np.unique(np.array(donors, dtype=object), return_inverse=True)
+        project_names, project_codes = np.unique(np.array(projects, dtype=object), return_inverse=True)
+        order = np.lexsort((project_codes, donor_codes))
+        amounts = np.array(amounts)[order]
+        for start in range(0, len(order), chunk):
+            part = order[start:start + chunk]
+            yield donor_names[donor_codes[part]], project_names[project_codes[part]], amounts[start:start + chunk]
+
+    def project_facts(self, since=None, until=None):
+        """Per project: donations raised in the period, funds disbursed and milestones verified by `until`."""
+        since, until = since or float("-inf"), until or float("inf")
+        raised, disbursed, milestones = defaultdict(float), defaultdict(float), defaultdict(list)
+        for project, amount, ts in self.rows("donations", ("project_id", "amount", "timestamp")):
+            if since <= (_time(ts) or 0) <= until:
+                raised[project] += float(amount)
+        for project, amount, ts in self.rows("disbursements", ("project_id", "amount", "timestamp")):
+            if (_time(ts) or 0) <= until:
+                disbursed[project] += float(amount)
+        for project, milestone, status, ts in self.rows("milestones", ("project_id", "milestone_id", "status", "verified_at")):
+            if str(status).lower() == "verified" and (_time(ts) or 0) <= until:
+                milestones[project].append(milestone)
+        return raised, disbursed, milestones
+
+
+def reports(tables, since=None, until=None, report_date=None, chunk=CHUNK):
+    """Yield one ImpactReporter report per (donor, project), donors in sorted order.
+
+    Project facts are aggregated first, in one streaming pass per table;
+    donations then arrive sorted by donor and project, and each chunk's
+    (donor, project) totals come from one np.add.reduceat. A donor whose
+    rows straddle a chunk boundary is carried into the next chunk, so
+    memory holds the project facts plus one chunk, whatever the number of
+    donors.
+    """
+    whole_day = isinstance(until, str) and len(until) == 10  # a plain date includes that whole day
+    since, until = _time(since), _time(until) and _time(until) + (86400 - 1e-3 if whole_day else 0)
+    raised, disbursed, milestones = tables.project_facts(since, until)
+    report_date = report_date or datetime.date.today().isoformat()
+    chunks = tables.donation_chunks(since, until, chunk)
+    part, carry = next(chunks, None), None
+    while part is not None:
+        following = next(chunks, None)
+        if carry is not None:
+            part = tuple(np.concatenate([c, p]) for c, p in zip(carry, part))
+            carry = None
+        donors, projects, amounts = part
+        if following is not None:
+            # The last donor may continue in the next chunk: hold their rows back
+            keep = donors != donors[-1]
+            carry = tuple(col[~keep] for col in part)
+            donors, projects, amounts = (col[keep] for col in part)
+        part = following
+        if not len(donors):
+            continue
+        change = (donors[1:] != donors[:-1]) | (projects[1:] != projects[:-1])
+        starts = np.concatenate([[0], np.flatnonzero(change) + 1])
+        totals = np.add.reduceat(amounts, starts)
+        counts = np.diff(np.append(starts, len(donors)))
+        for start, total, count in zip(starts.tolist(), totals.tolist(), counts.tolist()):
+            donor, project = donors[start], projects[start]
+            share = total / raised[project] if raised[project] else 0.0
+            done = milestones.get(project, [])
+            yield {
+                "donor_name": donor,
+                "project_id": project,
+                "amount_donated": round(total, 2),
+                "milestones_completed": done,
+                "outcomes": (f"{total:,.2f} USDC over {count} donation(s), {share:.2%} of what {project} raised this "
+                             f"period; {disbursed[project]:,.2f} USDC disbursed to the project so far and "
+                             f"{len(done)} milestone(s) verified."),
+                "report_date": report_date,
+                "donations": count,
+                "share_of_funding": round(share, 4),
+                "project_disbursed": round(disbursed[project], 2),
+            }
+
+
+def write_jsonl(stream, path):
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for report in stream:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def write_per_donor(stream, directory):
+    """One JSON list per donor; reports arrive grouped by donor, so only one donor is held at a time."""
+    os.makedirs(directory, exist_ok=True)
+    files, current, batch = 0, None, []
+
+    def flush():
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", str(current))[:100] or "donor"
+        with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(batch, f, indent=2, ensure_ascii=False)
+
+    for report in stream:
+        if report["donor_name"] != current and batch:
+            flush()
+            files += 1
+            batch = []
+        current = report["donor_name"]
+        batch.append(report)
+    if batch:
+        flush()
+        files += 1
+    return files
+
+
+def synthetic_db(path, n, donors=None, projects=500, seed=3):
+    rng = np.random.default_rng(seed)
+    donors = donors or max(1, n // 4)
+    start = datetime.datetime(2025, 7, 1, tzinfo=datetime.timezone.utc).timestamp()
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE donations (donor TEXT, project_id TEXT, amount REAL, timestamp REAL);
+        CREATE INDEX donations_donor ON donations (donor, project_id);
+        CREATE TABLE disbursements (project_id TEXT, amount REAL, tx_hash TEXT, timestamp REAL);
+        CREATE TABLE milestones (project_id TEXT, milestone_id TEXT, status TEXT, verified_at REAL);
+    """)
+    donor_ids = rng.integers(0, donors, n)
+    project_ids = rng.zipf(1.5, n) % projects
+    db.executemany("INSERT INTO donations VALUES (?, ?, ?, ?)",
+                   ((f"0x{d:040x}", f"project_{p:04d}", float(a), float(t)) for d, p, a, t in
+                    zip(donor_ids.tolist(), project_ids.tolist(), rng.choice([5, 20, 50, 100, 500], n).tolist(),
+                        (start + rng.uniform(0, 90 * 86400, n)).tolist())))
+    db.executemany("INSERT INTO disbursements VALUES (?, ?, ?, ?)",
+                   ((f"project_{p:04d}", float(rng.uniform(100, 10_000)), f"0x{rng.integers(1 << 62):064x}",
+                     start + 80 * 86400) for p in range(projects) for _ in range(3)))
+    db.executemany("INSERT INTO milestones VALUES (?, ?, ?, ?)",
+                   ((f"project_{p:04d}", f"m{m}", "verified" if m < 2 else "pending", start + 60 * 86400)
+                    for p in range(projects) for m in range(3)))
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate every donor's impact report in one local batch")
+    parser.add_argument("--db", help="SQLite file with donations, disbursements and milestones tables")
+    parser.add_argument("--donations")
+    parser.add_argument("--disbursements")
+    parser.add_argument("--milestones")
+    parser.add_argument("--since", help="first donation date to include (ISO date or epoch)")
+    parser.add_argument("--until", help="last donation date to include")
+    parser.add_argument("--report-date", help="defaults to today")
+    parser.add_argument("--out", help="JSONL output file")
+    parser.add_argument("--per-donor", metavar="DIR", help="write one JSON file per donor instead")
+    parser.add_argument("--benchmark", type=int, metavar="DONATIONS", help="time a synthetic quarter")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        import tempfile
+        import time
+        import tracemalloc
+
+        tmp = tempfile.mkdtemp()
+        synthetic_db(os.path.join(tmp, "charity.db"), args.benchmark)
+        run = lambda: write_jsonl(reports(Tables(os.path.join(tmp, "charity.db")), "2025-07-01", "2025-09-30T23:59:59"),
+                                  os.path.join(tmp, "q3.jsonl"))
+        t0 = time.perf_counter()
+        n = run()
+        elapsed = time.perf_counter() - t0
+        tracemalloc.start()  # a second, slower run just to measure memory
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{args.benchmark} donations -> {n} donor/project reports in {elapsed:.2f} s "
+              f"({n / elapsed:,.0f} reports/s, peak Python memory {peak / 2**20:.0f} MiB, "
+              f"{os.path.getsize(os.path.join(tmp, 'q3.jsonl')) / 2**20:.0f} MiB written); "
+              f"one ImpactReporter conversation each would be {n:,} LLM calls")
+        with open(os.path.join(tmp, "q3.jsonl")) as f:
+            print(f.readline().strip())
+        return
+    if not (args.db or args.donations):
+        parser.error("--db or --donations is required")
+    if not (args.out or args.per_donor):
+        parser.error("--out or --per-donor is required")
+    tables = Tables(args.db, args.donations, args.disbursements, args.milestones)
+    stream = reports(tables, args.since, args.until, args.report_date)
+    if args.per_donor:
+        print(f"{write_per_donor(stream, args.per_donor)} donor files written to {args.per_donor}")
+    else:
+        print(f"{write_jsonl(stream, args.out)} reports written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
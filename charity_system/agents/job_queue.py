@@ -0,0 +1,265 @@
+# agents/job_queue.py — durable per-stage job queue in SQLite (WAL) with leases and dead-lettering
+#
+#   python job_queue.py [jobs]    enqueue/claim/complete throughput benchmark
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+Job = namedtuple("Job", "id stage key payload attempts max_attempts lease")
+
+
+class JobQueue:
+    """Workflow jobs, one row per (stage, key), that survive a crash or restart.
+
+    enqueue() is idempotent per (stage, key): re-submitting a donation that
+    is already queued, running or done is a no-op. claim() leases up to n
+    ready jobs of a stage to a worker for `lease` seconds; a job whose
+    lease runs out (worker crashed or hung) becomes claimable again. Only
+    the current lease can complete or fail a job, so a late worker whose
+    lease was taken over cannot complete it twice. complete() can enqueue
+    the next stage's jobs in the same transaction, so a hand-off is never
+    half done. A job that fails max_attempts times goes to the dead letters.
+    Every call is one transaction however many jobs it covers, which is
+    what keeps thousands of jobs per second cheap.
+    """
+
+    def __init__(self, path="workflow_jobs.db", lease=60.0, max_attempts=5, backoff=2.0):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe; only the last commit can be lost
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY, stage TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'ready', attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL, available_at REAL NOT NULL, lease TEXT, lease_until REAL,
+                result TEXT, error TEXT, updated_at REAL NOT NULL, UNIQUE (stage, key));
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (stage, state, available_at);
+            CREATE INDEX IF NOT EXISTS jobs_leased ON jobs (stage, state, lease_until);
+        """)
+
+    def _transaction(self):
+        self.db.execute("BEGIN IMMEDIATE")
+
+    def _insert(self, jobs, now):
+        rows = [(stage, str(key), json.dumps(payload), max_attempts or self.max_attempts, now + delay, now)
+                for stage, key, payload, delay, max_attempts in jobs]
+        before = self.db.total_changes
+        self.db.executemany("INSERT OR IGNORE INTO jobs (stage, key, payload, max_attempts, available_at, updated_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return self.db.total_changes - before
+
+    # === Producers ===
+    def enqueue(self, stage, payload, key=None, delay=0.0, max_attempts=None):
+        """Queue one job; returns False if (stage, key) was already queued."""
+        return self.enqueue_many([(stage, key or uuid.uuid4().hex, payload, delay, max_attempts)]) == 1
+
+    def enqueue_many(self, jobs):
+        """Queue (stage, key, payload[, delay[, max_attempts]]) tuples in one transaction; returns how many were new."""
+        jobs = [tuple(job) + (0.0, None)[len(job) - 3:] for job in jobs]
+        with self.lock:
+            self._transaction()
+            try:
+                added = self._insert(jobs, time.time())
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return added
+
+    # === Workers ===
+    def claim(self, stage, n=1, lease=None):
+        """Lease up to n ready (or lease-expired) jobs of `stage`, oldest first."""
+        now, token = time.time(), uuid.uuid4().hex
+        with self.lock:
+            self._transaction()
+            try:
+                # A job whose worker died holding it on every attempt is dead-lettered, not leased forever
+                self.db.execute("UPDATE jobs SET state = 'dead', error = 'lease expired on every attempt', lease = NULL, "
+                                "updated_at = ? WHERE stage = ? AND state = 'leased' AND lease_until < ? "
+                                "AND attempts >= max_attempts", (now, stage, now))
+                rows = self.db.execute(
+                    "UPDATE jobs SET state = 'leased', lease = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id IN (SELECT id FROM jobs WHERE stage = ? AND "
+                    "((state = 'ready' AND available_at <= ?) OR (state = 'leased' AND lease_until < ?)) "
+                    "ORDER BY available_at LIMIT ?) RETURNING id, stage, key, payload, attempts, max_attempts",
+                    (token, now + (lease or self.lease), now, stage, now, now, n)).fetchall()
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return sorted((Job(i, s, k, json.loads(p), a, m, token) for i, s, k, p, a, m in rows), key=lambda j: j.id)
+
+    def extend(self, job, lease=None):
+        """Push a running job's lease out; False if the lease was lost."""
+        with self.lock:
+            return self.db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND state = 'leased' AND lease = ?",
+                                   (time.time() + (lease or self.lease), job.id, job.lease)).rowcount == 1
+
+    def complete(self, job, result=None, next_jobs=()):
+        return self.complete_many([(job, result, next_jobs)])[0]
+
+    def complete_many(self, done):
+        """Finish (job, result, next_jobs) triples in one transaction.
+
+        Returns one bool per job: False when its lease was no longer held
+        (it expired and another worker took the job, or it already
+        completed), in which case its next_jobs are not queued either.
+        """
+        now, accepted = time.time(), []
+        with self.lock:
+            self._transaction()
+            try:
+                for job, result, next_jobs in done:
+                    ok = self.db.execute(
+                        "UPDATE jobs SET state = 'done', result = ?, lease = NULL, lease_until = NULL, updated_at = ? "
+                        "WHERE id = ? AND state = 'leased' AND lease = ?",
+                        (json.dumps(result), now, job.id, job.lease)).rowcount == 1
+                    if ok and next_jobs:
+                        self._insert([tuple(j) + (0.0, None)[len(j) - 3:] for j in next_jobs], now)
+                    accepted.append(ok)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return accepted
+
+    def fail(self, job, error, retry_in=None):
+        """Give the job back for a retry after a backoff, or dead-letter it; returns its new state (None: lease lost)."""
+        state = "dead" if job.attempts >= job.max_attempts else "ready"
+        delay = retry_in if retry_in is not None else self.backoff * 2 ** (job.attempts - 1)
+        with self.lock:
+            changed = self.db.execute(
+                "UPDATE jobs SET state = ?, error = ?, available_at = ?, lease = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE id = ? AND state = 'leased' AND lease = ?",
+                (state, str(error)[:1000], time.time() + delay, time.time(), job.id, job.lease)).rowcount
+        return state if changed else None
+
+    # === Operations ===
+    def dead_letters(self, stage=None, limit=100):
+        sql, args = "SELECT id, stage, key, payload, attempts, error, updated_at FROM jobs WHERE state = 'dead'", []
+        if stage:
+            sql, args = sql + " AND stage = ?", [stage]
+        with self.lock:
+            rows = self.db.execute(sql + " ORDER BY updated_at DESC LIMIT ?", args + [limit]).fetchall()
+        return [{"id": i, "stage": s, "key": k, "payload": json.loads(p), "attempts": a, "error": e, "failed_at": t}
+                for i, s, k, p, a, e, t in rows]
+
+    def requeue(self, ids):
+        """Send dead-lettered jobs back to ready with a fresh attempt budget."""
+        with self.lock:
+            return self.db.executemany("UPDATE jobs SET state = 'ready', attempts = 0, available_at = ?, error = NULL "
+                                       "WHERE id = ? AND state = 'dead'", [(time.time(), i) for i in ids]).rowcount
+
+    def result(self, stage, key):
+        with self.lock:
+            row = self.db.execute("SELECT state, result, error FROM jobs WHERE stage = ? AND key = ?",
+                                  (stage, str(key))).fetchone()
+        return None if row is None else {"state": row[0], "result": json.loads(row[1]) if row[1] else None,
+                                         "error": row[2]}
+
+    def finished(self, stage):
+        """(payload, result) of every completed job of `stage`, in completion order."""
+        with self.lock:
+            rows = self.db.execute("SELECT payload, result FROM jobs WHERE stage = ? AND state = 'done' "
+                                   "ORDER BY updated_at, id", (stage,)).fetchall()
+        return [(json.loads(p), json.loads(r) if r else None) for p, r in rows]
+
+    def pending(self, stage):
+        """Jobs of `stage` not yet finished (ready, waiting for a retry, or leased)."""
+        with self.lock:
+            return sum(self.db.execute("SELECT COUNT(*) FROM jobs WHERE stage = ? AND state = ?", (stage, state)).fetchone()[0]
+                       for state in ("ready", "leased"))
+
+    def counts(self):
+        """{stage: {state: n}}, with leases that ran out counted as ready."""
+        now, counts = time.time(), {}
+        with self.lock:
+            rows = self.db.execute("SELECT stage, CASE WHEN state = 'leased' AND lease_until < ? THEN 'ready' "
+                                   "ELSE state END, COUNT(*) FROM jobs GROUP BY 1, 2", (now,)).fetchall()
+        for stage, state, n in rows:
+            counts.setdefault(stage, {})[state] = n
+        return counts
+
+    def purge_done(self, older_than=7 * 86400):
+        with self.lock:
+            return self.db.execute("DELETE FROM jobs WHERE state = 'done' AND updated_at < ?",
+                                   (time.time() - older_than,)).rowcount
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+# === Benchmark: three-stage pipeline, a pool of worker threads, crashed workers and a poison job ===
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    queue = JobQueue(path, lease=0.5, max_attempts=3, backoff=0.01)
+    stages = ["needs", "verify", "disburse"]
+
+    t0 = time.perf_counter()
+    for start in range(0, n, 500):
+        queue.enqueue_many([("needs", f"donation-{i}", {"amount": i}) for i in range(start, min(start + 500, n))])
+    t_enqueue = time.perf_counter() - t0
+    assert queue.enqueue_many([("needs", "donation-0", {"amount": 0})]) == 0  # idempotent re-submit
+    queue.enqueue("needs", {"amount": -1, "poison": True}, key="poison")
+
+    crashed = []
+
+    def worker(stage, worker_id):
+        while True:
+            jobs = queue.claim(stage, n=50)
+            if not jobs:
+                if not any(queue.pending(s) for s in stages[:stages.index(stage) + 1]):
+                    return
+                time.sleep(0.005)
+                continue
+            done = []
+            for job in jobs:
+                if job.payload.get("poison"):
+                    queue.fail(job, "amount must be positive")
+                elif worker_id == 0 and job.attempts == 1 and job.id % 1000 == 0:
+                    crashed.append(job.id)  # simulate a crash: never complete; the lease expires
+                else:
+                    nxt = stages.index(stage) + 1
+                    done.append((job, {"ok": True}, [(stages[nxt], job.key, job.payload)] if nxt < len(stages) else []))
+            queue.complete_many(done)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(stage, i)) for stage in stages for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    t_process = time.perf_counter() - t0
+    counts = queue.counts()
+    ops = 3 * n * 3  # per stage and job: enqueue, claim, complete
+    print(f"{n} donations x 3 stages, 12 workers: enqueue {n / t_enqueue:,.0f} jobs/s, pipeline {t_process:.2f} s "
+          f"= {ops / (t_enqueue + t_process):,.0f} queue ops/s")
+    print(f"states: {counts}; {len(crashed)} crashed leases recovered, "
+          f"dead letters: {[(d['key'], d['attempts'], d['error']) for d in queue.dead_letters()]}")
+    assert counts["disburse"]["done"] == n
+
+    # Unbatched: one transaction per operation
+    queue2 = JobQueue(os.path.join(tempfile.mkdtemp(), "jobs.db"))
+    m = 2_000
+    t0 = time.perf_counter()
+    for i in range(m):
+        queue2.enqueue("needs", {"amount": i}, key=str(i))
+    for _ in range(m):
+        job, = queue2.claim("needs")
+        queue2.complete(job, {"ok": True})
+    elapsed = time.perf_counter() - t0
+    print(f"one job per call: {3 * m / elapsed:,.0f} ops/s ({elapsed / m * 1e3:.2f} ms per enqueue+claim+complete)")
@@ -3,6 +3,7 @@ import os
 import json
 from dotenv import load_dotenv
 from elevenlabs import ElevenLabs
+from provision import agent_spec
 
 # === LOAD ENV & INIT CLIENT ===
 load_dotenv()
@@ -15,19 +16,9 @@ client = ElevenLabs(api_key=api_key)
 
 # === AGENT CONFIG ===
 agent_name = "NGO Monitor Agent"
-first_message = "Monitoring NGOs for transparency issues..."
-
-prompt = """You are the NGO Monitor Agent.
-Your job: Weekly scan for scandals.
-
-For each NGO:
-1. Search X and web: "{ngo_name} scandal" OR "fraud" OR "misuse"
-2. If >2 credible sources → flag
-3. Output: { "ngo": "...", "alert": true, "sources": [...] }
-4. Transfer to Orchestrator with alert.
-
-Never flag without evidence.
-"""
+spec = agent_spec(agent_name)  # prompt and first message live in agent_specs.json
+first_message = spec["first_message"]
+prompt = spec["prompt"]
 
 custom_tools = [
     {
@@ -3,21 +3,15 @@ import os
 import json
 from dotenv import load_dotenv
 from elevenlabs import ElevenLabs
+from provision import agent_spec
 
 load_dotenv()
 client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
 
 agent_name = "NGO Researcher Agent"
-first_message = "Searching for verified NGOs..."
-
-prompt = """You find real NGOs using web search.
-Query: "climate Europe"
-1. Search web
-2. Extract name, country, website, EIN
-3. Verify rating >80
-4. Output JSON
-5. Transfer to Orchestrator
-"""
+spec = agent_spec(agent_name)  # prompt and first message live in agent_specs.json
+first_message = spec["first_message"]
+prompt = spec["prompt"]
 
 custom_tools = [
     {
@@ -0,0 +1,264 @@
+# agents/proof_ingest.py — milestone proof files: parallel hashing, duplicate detection, cached verdicts
+#
+#   python proof_ingest.py PROJECT MILESTONE file [file ...]     fingerprint, check against earlier proofs
+#   python proof_ingest.py --benchmark 200                        synthetic files, pool vs serial, cache hits
+#
+# Every proof file gets a SHA-256 of its content (read in blocks, memory-mapped when large) and, for
+# images when Pillow is installed, a 64-bit difference hash that survives resizing and recompression.
+# A submission (the set of a milestone's files) is keyed by the digest of its sorted file digests;
+# a verdict is stored under that key, so the same proof resubmitted for the same milestone is answered
+# from proof_cache.db instead of another MilestoneVerifier conversation.
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BLOCK = 1 << 20
+MMAP_OVER = 8 << 20  # files larger than this are memory-mapped instead of read block by block
+NEAR = 6  # difference-hash bits that may differ for two images to count as the same photo
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".tif", ".tiff", ".heic"}
+
+try:
+    from PIL import Image
+except ImportError:  # exact duplicates are still caught; near-duplicate images need Pillow
+    Image = None
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, never holding more than one block in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > MMAP_OVER:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                view = memoryview(m)
+                for start in range(0, size, BLOCK):
+                    h.update(view[start:start + BLOCK])
+                view.release()
+        else:
+            for block in iter(lambda: f.read(BLOCK), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def image_hash(path):
+    """64-bit difference hash (9x8 greyscale, left < right per pixel pair), or None if not an image."""
+    if Image is None or os.path.splitext(path)[1].lower() not in IMAGE_EXTS:
+        return None
+    try:
+        with Image.open(path) as img:
+            img.draft("L", (64, 64))  # JPEG decodes at reduced size: much cheaper for large photos
+            pixels = list(img.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return bits - (1 << 64) if bits >= 1 << 63 else bits  # as a signed 64-bit SQLite integer
+
+
+def fingerprint(path):
+    return {"path": path, "name": os.path.basename(path), "size": os.path.getsize(path),
+            "sha256": file_digest(path), "dhash": image_hash(path)}
+
+
+def fingerprint_files(paths, workers=None, pool=None):
+    """Fingerprints in input order; hashing runs in a process pool when there is enough work for one."""
+    paths = list(paths)
+    if pool is None and (len(paths) < 4 or (workers or os.cpu_count() or 1) < 2):
+        return [fingerprint(p) for p in paths]
+    if pool is not None:
+        return list(pool.map(fingerprint, paths, chunksize=max(1, len(paths) // 32)))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(fingerprint, paths, chunksize=max(1, len(paths) // 32)))
+
+
+def submission_key(prints):
+    return hashlib.sha256("\n".join(sorted(p["sha256"] for p in prints)).encode()).hexdigest()
+
+
+def hamming(a, b):
+    return ((a ^ b) & ((1 << 64) - 1)).bit_count()
+
+
+def _bands(dhash):
+    # Two hashes within NEAR bits share at least one of NEAR + 1 bands unchanged (pigeonhole), so
+    # near-duplicate lookup only compares against images that match one band exactly
+    value = dhash & ((1 << 64) - 1)
+    width = 64 // (NEAR + 1)
+    return [(i, value >> (i * width) & ((1 << width) - 1)) for i in range(NEAR + 1)]
+
+
+class ProofCache:
+    """Every proof file seen, which milestone it came with, and verdicts by submission digest."""
+
+    def __init__(self, path="proof_cache.db"):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS proof_files (
+                sha256 TEXT NOT NULL, project_id TEXT NOT NULL, milestone_id TEXT NOT NULL,
+                name TEXT, size INTEGER, dhash INTEGER, seen_at REAL NOT NULL,
+                PRIMARY KEY (sha256, project_id, milestone_id));
+            CREATE TABLE IF NOT EXISTS image_bands (
+                band INTEGER NOT NULL, value INTEGER NOT NULL, dhash INTEGER NOT NULL, sha256 TEXT NOT NULL,
+                PRIMARY KEY (band, value, sha256));
+            CREATE TABLE IF NOT EXISTS verdicts (
+                submission TEXT PRIMARY KEY, project_id TEXT NOT NULL, milestone_id TEXT NOT NULL,
+                approved INTEGER NOT NULL, comments TEXT, decided_at REAL NOT NULL);
+        """)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def record(self, project_id, milestone_id, prints):
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO proof_files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(p["sha256"], project_id, milestone_id, p["name"], p["size"], p["dhash"], now) for p in prints])
+            self.db.executemany("INSERT OR IGNORE INTO image_bands VALUES (?, ?, ?, ?)",
+                                [(band, value, p["dhash"], p["sha256"]) for p in prints if p["dhash"] is not None
+                                 for band, value in _bands(p["dhash"])])
+
+    def duplicates(self, project_id, milestone_id, prints):
+        """Files already submitted with a different milestone: identical content, or (images) the same photo."""
+        found = []
+        with self.lock:
+            for p in prints:
+                same = {p["sha256"]}
+                if p["dhash"] is not None:
+                    for band, value in _bands(p["dhash"]):
+                        for dhash, sha in self.db.execute(
+                                "SELECT dhash, sha256 FROM image_bands WHERE band = ? AND value = ?", (band, value)):
+                            if hamming(dhash, p["dhash"]) <= NEAR:
+                                same.add(sha)
+                marks = ",".join("?" * len(same))
+                for sha, project, milestone, name in self.db.execute(
+                        f"SELECT sha256, project_id, milestone_id, name FROM proof_files WHERE sha256 IN ({marks}) "
+                        "AND NOT (project_id = ? AND milestone_id = ?)", (*same, project_id, milestone_id)):
+                    found.append({"file": p["name"], "matches": name, "project_id": project,
+                                  "milestone_id": milestone, "exact": sha == p["sha256"]})
+        return found
+
+    def verdict(self, submission, project_id, milestone_id):
+        with self.lock:
+            row = self.db.execute("SELECT approved, comments, decided_at FROM verdicts WHERE submission = ? "
+                                  "AND project_id = ? AND milestone_id = ?",
+                                  (submission, project_id, milestone_id)).fetchone()
+        self.stats["hits" if row else "misses"] += 1
+        return {"approved": bool(row[0]), "comments": row[1], "decided_at": row[2]} if row else None
+
+    def store_verdict(self, submission, project_id, milestone_id, approved, comments=""):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)",
+                            (submission, project_id, milestone_id, int(bool(approved)), comments, time.time()))
+
+    def close(self):
+        self.db.close()
+
+
+class ProofIngest:
+    """Fingerprint a milestone's proof files and answer from the cache whenever the same proof was judged."""
+
+    def __init__(self, cache=None, workers=None):
+        self.cache = cache or ProofCache()
+        self.workers = workers
+
+    def inspect(self, project_id, milestone_id, proof_files):
+        """Fingerprints, duplicates found elsewhere and any cached verdict; records the files as seen."""
+        prints = fingerprint_files(proof_files, self.workers)
+        submission = submission_key(prints)
+        result = {"submission": submission, "files": prints,
+                  "duplicates": self.cache.duplicates(project_id, milestone_id, prints),
+                  "cached": self.cache.verdict(submission, project_id, milestone_id)}
+        self.cache.record(project_id, milestone_id, prints)
+        return result
+
+    def verify(self, project_id, milestone_id, proof_files, judge):
+        """MilestoneVerifier JSON for a submission; judge(project_id, milestone_id, inspection) -> (approved, comments)
+        is only called for a submission not judged before."""
+        inspection = self.inspect(project_id, milestone_id, proof_files)
+        cached = inspection["cached"]
+        if cached:
+            approved, comments = cached["approved"], cached["comments"]
+        else:
+            approved, comments = judge(project_id, milestone_id, inspection)
+            self.cache.store_verdict(inspection["submission"], project_id, milestone_id, approved, comments)
+        return {"milestone_id": milestone_id, "project_id": project_id, "verification_status": bool(approved),
+                "comments": comments, "cached": bool(cached), "duplicates": inspection["duplicates"],
+                "submission": inspection["submission"]}
+
+
+def describe(inspection):
+    """The fingerprints and duplicate findings as text for the MilestoneVerifier prompt."""
+    lines = [f"- {p['name']} ({p['size']} bytes, sha256 {p['sha256'][:16]})" for p in inspection["files"]]
+    for d in inspection["duplicates"]:
+        lines.append(f"! {d['file']} {'is identical to' if d['exact'] else 'looks like the same photo as'} "
+                     f"{d['matches']}, submitted for milestone {d['milestone_id']} of {d['project_id']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint milestone proof files and check them against earlier proofs")
+    parser.add_argument("project_id", nargs="?")
+    parser.add_argument("milestone_id", nargs="?")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--cache", default="proof_cache.db")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--benchmark", type=int, metavar="FILES", help="time hashing and cache lookups on synthetic files")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        import tempfile
+
+        tmp = tempfile.mkdtemp()
+        paths = []
+        for i in range(args.benchmark):
+            # mostly photo-sized files plus a few large PDFs/videos that take the mmap path
+            size = (64 << 20) if i % 50 == 0 else (2 << 20)
+            path = os.path.join(tmp, f"proof_{i:04d}.bin")
+            with open(path, "wb") as f:
+                f.write(os.urandom(1 << 20) * (size >> 20))
+            paths.append(path)
+        total = sum(os.path.getsize(p) for p in paths) / 2**20
+        t0 = time.perf_counter()
+        serial = [fingerprint(p) for p in paths]
+        t_serial = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        pooled = fingerprint_files(paths, pool=ProcessPoolExecutor(args.workers))
+        t_pool = time.perf_counter() - t0
+        assert [p["sha256"] for p in serial] == [p["sha256"] for p in pooled]
+        print(f"{len(paths)} files, {total:,.0f} MiB: serial {t_serial:.2f} s ({total / t_serial:,.0f} MiB/s), "
+              f"process pool of {args.workers or os.cpu_count()} {t_pool:.2f} s ({total / t_pool:,.0f} MiB/s)")
+
+        ingest = ProofIngest(ProofCache(os.path.join(tmp, "proof_cache.db")), args.workers)
+        calls = []
+        judge = lambda project, milestone, inspection: (calls.append(milestone), (True, "synthetic"))[1]
+        submissions = [(f"project_{i % 10}", f"m{i}", paths[i * 4:i * 4 + 4]) for i in range(len(paths) // 4)]
+        for project, milestone, files in submissions:
+            ingest.verify(project, milestone, files, judge)
+        t0 = time.perf_counter()
+        resubmitted = [ingest.verify(project, milestone, files, judge) for project, milestone, files in submissions]
+        elapsed = time.perf_counter() - t0
+        reused = ingest.verify("project_x", "m_reused", paths[:2], judge)
+        print(f"{len(submissions)} resubmissions answered from the cache in {elapsed:.2f} s "
+              f"({elapsed / len(submissions) * 1e3:.1f} ms each, hashing included; "
+              f"{len(calls) - len(submissions) - 1} extra verifier calls, cache {ingest.cache.stats})")
+        print(f"files reused for another milestone are flagged: {reused['duplicates']}")
+        print(f"near-duplicate images: {'enabled' if Image else 'need Pillow (pip install Pillow)'}")
+        return
+    if not (args.project_id and args.milestone_id and args.files):
+        parser.error("PROJECT MILESTONE and at least one file, or --benchmark, are required")
+    inspection = ProofIngest(ProofCache(args.cache), args.workers).inspect(args.project_id, args.milestone_id, args.files)
+    print(json.dumps({k: inspection[k] for k in ("submission", "cached", "duplicates", "files")}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# agents/provision.py — create or update every agent in agent_specs.json concurrently over one client
+#
+#   python provision.py                    deploy the whole fleet
+#   python provision.py --only "NGO Monitor Agent"
+#   python provision.py --simulate 1.5     time a redeploy against a stand-in API (no key needed)
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config_cache import ConfigCache
+
+# The directory itself lives in the backend's agent_store, shared with the servers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_store import AgentStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SPEC_FILE = os.path.join(HERE, "agent_specs.json")
+DIRECTORY_FILE = os.path.join(HERE, "agent_directory.json")
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+# === Spec ===
+def load_specs(path=SPEC_FILE):
+    """Agent definitions with the spec's defaults filled in; @references checked up front."""
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    defaults = spec.get("defaults", {})
+    agents = [{**defaults, **agent} for agent in spec["agents"]]
+    names = {agent["name"] for agent in agents}
+    for agent in agents:
+        missing = references(agent) - names
+        if missing:
+            raise ValueError(f"{agent['name']}: unknown agent reference(s) {sorted(missing)}")
+    return agents
+
+
+def agent_spec(name, path=SPEC_FILE):
+    """One agent's definition from the spec, for the scripts that create a single agent."""
+    for agent in load_specs(path):
+        if agent["name"] == name:
+            return agent
+    raise KeyError(f"{name!r} is not in {path}")
+
+
+def references(agent):
+    """Names of the agents this one transfers to ("agent_id": "@Name")."""
+    refs = set()
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "agent_id" and isinstance(value, str) and value.startswith("@"):
+                    refs.add(value[1:])
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(agent.get("tools", []))
+    return refs
+
+
+def resolve(tools, directory):
+    def walk(node):
+        if isinstance(node, dict):
+            return {key: directory[value[1:]] if key == "agent_id" and isinstance(value, str) and value.startswith("@")
+                    else walk(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [walk(item) for item in node]
+        return node
+
+    return walk(copy.deepcopy(tools))
+
+
+def conversation_config(agent, tools):
+    return {"tts": agent["tts"], "agent": {"first_message": agent["first_message"], "prompt": {"prompt": agent["prompt"]}},
+            "tools": tools}
+
+
+def write_directory(directory, path=DIRECTORY_FILE):
+    """Record new and changed IDs in the directory's change log with one append; returns what changed."""
+    return AgentStore(path).add_agents(directory)
+
+
+# === Provisioning ===
+class RateLimiter:
+    """Token bucket: at most `rate` calls per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Provisioner:
+    """Creates or updates agents in parallel through one shared client.
+
+    Agents already in the directory, and new agents whose transfer targets
+    all exist, are applied in a single concurrent pass. A new agent that
+    points at another new agent is created without tools in that pass and
+    gets its tools in a second concurrent pass, once every ID is known.
+    Calls go through a token bucket, and 429/5xx responses are retried
+    with exponential backoff (honouring Retry-After). With a ConfigCache,
+    an agent whose payload hash matches the last push is skipped.
+    """
+
+    def __init__(self, client, directory, concurrency=4, rate=5.0, retries=4, cache=None, force=False):
+        self.agents_api = client.conversational_ai.agents
+        self.cache = cache
+        self.force = force
+        self.directory = dict(directory)
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.lock = threading.Lock()
+        self.results = {}
+
+    def _call(self, fn, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                return fn(**kwargs)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                if status not in RETRY_STATUS or attempt == self.retries:
+                    raise
+                retry_after = (getattr(e, "headers", None) or {}).get("retry-after")
+                time.sleep(float(retry_after) if retry_after else 0.5 * 2 ** attempt * (1 + random.random()))
+
+    def _apply(self, agent, tools):
+        t0 = time.perf_counter()
+        name = agent["name"]
+        try:
+            payload = {"name": name, "tags": agent.get("tags", []), "conversation_config": conversation_config(agent, tools)}
+            agent_id = self.directory.get(name)
+            if agent_id and self.cache and not self.force and not self.cache.changed(name, agent_id, payload):
+                action = "unchanged"
+            elif agent_id:
+                self._call(self.agents_api.update, agent_id=agent_id, **payload)
+                action = "updated"
+            else:
+                agent_id = self._call(self.agents_api.create, **payload).agent_id
+                action = "created"
+            with self.lock:
+                self.directory[name] = agent_id
+            if self.cache:
+                self.cache.record(name, agent_id, payload)
+            error = None
+        except Exception as e:
+            action, error = "failed", str(e)
+        elapsed = time.perf_counter() - t0
+        with self.lock:
+            result = self.results.setdefault(name, {"action": action, "seconds": 0.0, "error": None})
+            if error:  # a failed second-pass tool update fails the agent, a successful one keeps "created"
+                result.update(action="failed", error=error)
+            result["seconds"] += elapsed
+        print(f"{'❌' if error else '✅'} {name}: {action} in {elapsed:.2f}s" + (f" ({error})" if error else ""))
+
+    def run(self, agents):
+        """Apply every agent; returns {name: {"action", "seconds", "error"}}."""
+        deferred = {a["name"] for a in agents if a["name"] not in self.directory and references(a) - set(self.directory)}
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            list(pool.map(lambda a: self._apply(a, [] if a["name"] in deferred
+                                                 else resolve(a.get("tools", []), self.directory)), agents))
+            second = []
+            for a in agents:
+                if a["name"] not in deferred or self.results[a["name"]]["action"] == "failed":
+                    continue
+                if references(a) <= set(self.directory):
+                    second.append(a)
+                else:
+                    self.results[a["name"]].update(action="failed", error="a transfer target failed to deploy")
+            list(pool.map(lambda a: self._apply(a, resolve(a.get("tools", []), self.directory)), second))
+        return self.results
+
+
+# === Stand-in API for timing a deploy offline ===
+class SimulatedAgents:
+    """agents.create/update with a fixed latency; answers 429 beyond `max_inflight` concurrent calls."""
+
+    class RateLimited(Exception):
+        status_code = 429
+        headers = {"retry-after": "0.2"}
+
+    def __init__(self, latency, max_inflight=6):
+        self.latency = latency
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def _request(self):
+        with self.lock:
+            self.calls += 1
+            if self.inflight >= self.max_inflight:
+                raise self.RateLimited("too many concurrent requests")
+            self.inflight += 1
+        try:
+            time.sleep(self.latency * random.uniform(0.6, 1.0))
+        finally:
+            with self.lock:
+                self.inflight -= 1
+
+    def create(self, **kwargs):
+        self._request()
+        return type("Agent", (), {"agent_id": "agent_sim_" + os.urandom(8).hex()})()
+
+    def update(self, **kwargs):
+        self._request()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or update every agent in agent_specs.json")
+    parser.add_argument("--only", action="append", help="agent name to deploy (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("PROVISION_CONCURRENCY", "9")))
+    parser.add_argument("--rate", type=float, default=float(os.getenv("PROVISION_RATE", "5")),
+                        help="max API calls per second")
+    parser.add_argument("--force", action="store_true", help="push every agent even if its config is unchanged")
+    parser.add_argument("--simulate", type=float, metavar="SECONDS",
+                        help="use a stand-in API with this per-call latency; agent_directory.json is not touched")
+    args = parser.parse_args()
+
+    agents = load_specs()
+    if args.only:
+        unknown = set(args.only) - {a["name"] for a in agents}
+        if unknown:
+            parser.error(f"unknown agent(s): {sorted(unknown)}")
+        agents = [a for a in agents if a["name"] in args.only]
+
+    directory = AgentStore(DIRECTORY_FILE).agents
+    if args.simulate:
+        client = type("Client", (), {})()
+        client.conversational_ai = type("ConvAI", (), {"agents": SimulatedAgents(args.simulate)})()
+    else:
+        from dotenv import load_dotenv
+        from elevenlabs import ElevenLabs
+
+        load_dotenv()
+        api_key = os.getenv("ELEVENLABS_API_KEY")
+        if not api_key:
+            raise SystemExit("ELEVENLABS_API_KEY is not set")
+        client = ElevenLabs(api_key=api_key)
+
+    # A simulated run keeps its push cache in a scratch file
+    cache = ConfigCache(os.path.join(tempfile.mkdtemp(), "configs.json")) if args.simulate else ConfigCache()
+    t0 = time.perf_counter()
+    provisioner = Provisioner(client, directory, concurrency=args.concurrency, rate=args.rate, cache=cache,
+                              force=args.force)
+    results = provisioner.run(agents)
+    elapsed = time.perf_counter() - t0
+    if not args.simulate:
+        changed = write_directory(provisioner.directory)
+        cache.save()
+        print(f"Agent directory: {len(changed)} new or changed ID(s) recorded in {DIRECTORY_FILE}")
+
+    failed = [name for name, r in results.items() if r["action"] == "failed"]
+    seconds = [r["seconds"] for r in results.values()]
+    print(f"{len(results) - len(failed)}/{len(results)} agents deployed in {elapsed:.2f}s "
+          f"(slowest single agent {max(seconds):.2f}s, one at a time would be {sum(seconds):.2f}s)")
+    if args.simulate and not failed:
+        # The common case after that: one prompt edited, the rest untouched
+        api = client.conversational_ai.agents
+        calls = api.calls
+        agents[0] = dict(agents[0], prompt=agents[0]["prompt"] + "\n- Log every action.")
+        Provisioner(client, provisioner.directory, concurrency=args.concurrency, rate=args.rate, cache=cache).run(agents)
+        print(f"push after editing one prompt: {api.calls - calls} API call(s) (was agents.get + agents.update "
+              f"for every agent: {2 * len(agents)})")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
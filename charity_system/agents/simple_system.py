@@ -2,7 +2,7 @@ import os
 import inspect
 from dotenv import load_dotenv
 from elevenlabs import ElevenLabs
-import json
+from agent_manager import load_agent_directory
 
 load_dotenv()
 api_key = os.getenv("ELEVENLABS_API_KEY")
@@ -30,8 +30,7 @@ print("\n🧪 Testing different parameter combinations...")
 
 # Load agent directory
 try:
-    with open('agent_directory.json', 'r') as f:
-        agent_directory = json.load(f)
+    agent_directory = load_agent_directory()
     
     orchestrator_id = agent_directory["Orchestrator Agent"]
     print(f"\nTesting with Orchestrator Agent: {orchestrator_id}")
@@ -1,53 +1,263 @@
+import argparse
+import asyncio
+import hashlib
 import json
+import os
+import tempfile
 import time
+import uuid
 from dotenv import load_dotenv
-from elevenlabs import ElevenLabs
-import os
+from agent_manager import load_agent_directory
+from job_queue import JobQueue
+from needs_forecaster import forecast_needs, history_arrays
+from proof_ingest import ProofIngest, describe
+from workflow_engine import DurableWorkflow, Stage, WorkflowEngine
+
+# Runs the Orchestrator's workflow sequence locally:
+#   donation → NeedsPredictor → MilestoneVerifier → AutoDisbursement → ImpactReporter → notify donor + audit log
+# Rules decide wherever they can; an agent is only asked when they cannot (no open project for a
+# donation, a milestone proof nobody has verified yet).
 
 load_dotenv()
 api_key = os.getenv("ELEVENLABS_API_KEY")
-client = ElevenLabs(api_key=api_key)
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:5000")
+DISBURSER_PK = os.getenv("DISBURSER_PK")
+AUDIT_LOG = "workflow_audit.jsonl"
 
 # Load agent directory
-with open('agent_directory.json', 'r') as f:
-    agent_directory = json.load(f)
+agent_directory = load_agent_directory()
 
-def simulate_donation_workflow():
-    """Simulate a complete donation workflow"""
-    print("🎯 STARTING DONATION WORKFLOW SIMULATION")
-    print("=" * 50)
-    
-    # Start with Orchestrator
-    orchestrator_id = agent_directory["Orchestrator Agent"]
-    
-    # Create a conversation with Orchestrator
-    conversation = client.conversational_ai.conversations.create(
-        agent_id=orchestrator_id
+# Open funding gaps (USDC) and milestone proofs; proofs already checked on-chain are marked verified.
+# A project may carry a history ({donations, spend, balance} per period): the NeedsPredictor then gets
+# needs_forecaster's forecasts along with the gaps.
+# A milestone may list local proof_files instead: they are fingerprinted and checked against every
+# earlier submission, and a submission judged before is answered from proof_cache.db.
+SAMPLE_PROJECTS = {
+    "Project_GreenEarth": {"wallet": "0x1111111111111111111111111111111111111111", "gap": 2000,
+                           "milestone": {"id": "m1", "proof": "ipfs://bafy-greenearth-m1", "verified": True}},
+}
+SAMPLE_DONATIONS = [{"donor": "donor_123", "amount": 500, "project": "Project_GreenEarth"}]
+
+client = None
+agent_calls = {}
+proofs = None
+
+async def ask_agent(name, message):
+    """One simulated conversation with an agent; returns its last reply"""
+    global client
+    if client is None:
+        from elevenlabs import ElevenLabs
+        client = ElevenLabs(api_key=api_key)
+    agent_calls[name] = agent_calls.get(name, 0) + 1
+    result = await asyncio.to_thread(
+        client.conversational_ai.agents.simulate_conversation,
+        agent_id=agent_directory[name],
+        simulation_specification={"simulated_user_config": {"first_message": message, "language": "en"}},
     )
-    
-    print("1. ✅ Orchestrator Agent activated")
-    print("2. 🔄 Checking for new donations...")
-    
-    # Simulate workflow steps
-    workflow_steps = [
-        "Polling DonationTracker for new USDC donations...",
-        "New donation detected: 500 USDC from donor_123",
-        "Predicting funding needs for active projects...",
-        "Milestone verification requested for Project_GreenEarth",
-        "Funds disbursed to verified NGO wallet",
-        "Impact report generated for donor"
+    replies = [turn.message for turn in result.simulated_conversation if turn.role == "agent" and turn.message]
+    return replies[-1] if replies else ""
+
+def project_forecasts(projects):
+    """needs_forecaster's JSON for every project that carries a history, by project name"""
+    histories = {name: p["history"] for name, p in projects.items() if p.get("history")}
+    if not histories:
+        return {}
+    return {f["project_id"]: f for f in forecast_needs(*history_arrays(histories))}
+
+def build_stages(projects):
+    forecasts = None
+
+    async def needs(ctx):
+        nonlocal forecasts
+        donation = ctx["item"]
+        project = donation.get("project")
+        if project not in projects or projects[project]["gap"] <= 0:
+            open_projects = {name: p for name, p in projects.items() if p["gap"] > 0}
+            if open_projects and not donation.get("purpose"):
+                project = max(open_projects, key=lambda name: open_projects[name]["gap"])
+            else:
+                if forecasts is None:  # one vectorized pass for the whole portfolio, on first need
+                    forecasts = await asyncio.to_thread(project_forecasts, projects)
+                reply = await ask_agent("NeedsPredictor Agent", f"Which project should a {donation['amount']} USDC "
+                                        f"donation go to? Purpose: {donation.get('purpose', 'none')}. Open gaps: "
+                                        f"{json.dumps({n: p['gap'] for n, p in projects.items()})}. "
+                                        + (f"Forecasts: {json.dumps(forecasts)}. " if forecasts else "")
+                                        + "Answer with the project name only.")
+                project = next((name for name in projects if name in reply), None)
+                if project is None:
+                    raise ValueError(f"NeedsPredictor gave no known project: {reply[:100]!r}")
+        allocated = min(donation["amount"], max(projects[project]["gap"], 0)) or donation["amount"]
+        projects[project]["gap"] -= allocated
+        return {"project": project, "amount": allocated}
+
+    async def verify(ctx):
+        project = ctx["needs"]["project"]
+        milestone = projects[project].get("milestone")
+        if not milestone or not (milestone.get("proof") or milestone.get("proof_files")):
+            return {"approved": False, "reason": "no milestone proof submitted"}
+        if milestone.get("verified"):
+            return {"approved": True, "milestone": milestone["id"]}
+        if milestone.get("proof_files"):
+            return await verify_proof_files(project, milestone)
+        reply = await ask_agent("MilestoneVerifier Agent", f"Verify milestone {milestone['id']} of {project}: "
+                                f"proof {milestone['proof']}. Reply APPROVED or REJECTED with a reason.")
+        approved = "APPROVED" in reply.upper() and "REJECTED" not in reply.upper()
+        milestone["verified"] = approved  # one verification per milestone, not one per donation
+        return {"approved": approved, "milestone": milestone["id"], "reason": reply[:200]}
+
+    async def verify_proof_files(project, milestone):
+        global proofs
+        if proofs is None:
+            proofs = ProofIngest()
+        inspection = await asyncio.to_thread(proofs.inspect, project, milestone["id"], milestone["proof_files"])
+        if inspection["cached"]:
+            approved, reason = inspection["cached"]["approved"], inspection["cached"]["comments"]
+        else:
+            reply = await ask_agent("MilestoneVerifier Agent", f"Verify milestone {milestone['id']} of {project}. "
+                                    f"Proof files:\n{describe(inspection)}\nReply APPROVED or REJECTED with a reason.")
+            approved, reason = "APPROVED" in reply.upper() and "REJECTED" not in reply.upper(), reply[:200]
+            proofs.cache.store_verdict(inspection["submission"], project, milestone["id"], approved, reason)
+        milestone["verified"] = approved
+        return {"approved": approved, "milestone": milestone["id"], "reason": reason,
+                "duplicates": inspection["duplicates"]}
+
+    async def disburse(ctx):
+        import requests
+
+        transfer = {"pk": DISBURSER_PK, "to": projects[ctx["needs"]["project"]]["wallet"], "amount": ctx["needs"]["amount"]}
+        # One key for every attempt at this donation (the job key under DurableWorkflow, which survives a
+        # crash): /donate answers a retry with the transfer it already sent instead of sending another
+        key = ctx.setdefault("key", uuid.uuid4().hex)
+        resp = await asyncio.to_thread(requests.post, f"{BACKEND_URL}/donate", json=transfer, timeout=60,
+                                       headers={"Idempotency-Key": f"disburse:{key}"})
+        result = resp.json()
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", f"HTTP {resp.status_code}"))
+        return {"tx_hash": result["hash"]}
+
+    async def report(ctx):
+        donation, needs = ctx["item"], ctx["needs"]
+        return {"donor": donation["donor"], "project": needs["project"], "amount_usdc": needs["amount"],
+                "milestone": ctx["verify"]["milestone"], "tx_hash": ctx["disburse"]["tx_hash"],
+                "remaining_gap": projects[needs["project"]]["gap"]}
+
+    async def notify(ctx):
+        r = ctx["report"]
+        print(f"   → {r['donor']}: {r['amount_usdc']} USDC reached {r['project']} (tx {r['tx_hash']})")
+        return True
+
+    async def audit(ctx):
+        entry = {"at": time.time(), "donation": ctx["item"], "report": ctx["report"], "status": ctx["status"]}
+        with open(AUDIT_LOG, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        return True
+
+    return [
+        Stage("needs", needs, concurrency=8),
+        Stage("verify", verify, after=["needs"], concurrency=8),
+        Stage("disburse", disburse, after=["verify"], when=lambda ctx: ctx["verify"]["approved"] and DISBURSER_PK,
+              concurrency=4, retries=3, backoff=1.0, timeout=90),
+        Stage("report", report, after=["disburse"]),
+        Stage("notify", notify, after=["report"]),
+        Stage("audit", audit, after=["report"], concurrency=1),
     ]
-    
-    for step in workflow_steps:
-        print(f"   → {step}")
-        time.sleep(1)
-    
-    print("3. ✅ Workflow completed successfully!")
-    print("4. 📊 Impact report ready for donor")
-    
-    return conversation.conversation_id
-
-# Run the simulation
+
+def restore_state(queue, projects):
+    """Apply the allocations and verdicts of needs/verify jobs that already finished to projects.
+
+    needs and verify change projects in memory, and a finished job never runs
+    again, so a resumed run starts from the projects as first submitted and
+    replays those results from the queue. Returns how many were replayed.
+    """
+    needs, verified = queue.finished("needs"), queue.finished("verify")
+    for _, result in needs:
+        if result["project"] in projects:
+            projects[result["project"]]["gap"] -= result["amount"]
+    for payload, result in verified:
+        milestone = projects.get(payload["results"]["needs"]["project"], {}).get("milestone")
+        if milestone and result.get("milestone") == milestone["id"]:
+            milestone["verified"] = result["approved"]
+    return len(needs) + len(verified)
+
+def run_donation_workflow(donations, projects):
+    """Run every donation through the workflow; returns the per-donation results"""
+    print("🎯 STARTING DONATION WORKFLOW")
+    print("=" * 50)
+    if not DISBURSER_PK:
+        print("⚠️  DISBURSER_PK not set: approved donations stop before disbursement")
+    engine = WorkflowEngine(build_stages(projects), max_in_flight=64)
+    t0 = time.perf_counter()
+    results = asyncio.run(engine.run(donations))
+    elapsed = time.perf_counter() - t0
+    for ctx in results:
+        if ctx["outcome"] != "completed":
+            print(f"   ⚠️  {ctx['item']['donor']}: {ctx['outcome']} {ctx['errors'] or ctx['status']}")
+    print(f"✅ {engine.stats['completed']}/{len(results)} donations completed in {elapsed:.1f}s "
+          f"({engine.stats['retries']} retries, agent calls: {agent_calls or 'none'})")
+    return results
+
+def run_durable_workflow(donations, projects, path):
+    """Same workflow from a SQLite job queue: rerunning after a crash resumes every donation where it stopped.
+
+    projects must be the same input on every run; what finished stages did to it is replayed from the queue.
+    """
+    print(f"🎯 STARTING DURABLE DONATION WORKFLOW ({path})")
+    print("=" * 50)
+    queue = JobQueue(path)
+    replayed = restore_state(queue, projects)
+    if replayed:
+        print(f"   replayed {replayed} finished needs/verify result(s): gaps {({n: p['gap'] for n, p in projects.items()})}")
+    workflow = DurableWorkflow(build_stages(projects), queue)
+    key = lambda d: d.get("tx_hash") or hashlib.sha256(json.dumps(d, sort_keys=True).encode()).hexdigest()[:32]
+    print(f"   {workflow.submit(donations, key)} new donation(s) queued; resuming {queue.counts()}")
+    stats = asyncio.run(workflow.run())
+    for dead in queue.dead_letters():
+        print(f"   ☠️  {dead['stage']} for {dead['payload']['item'].get('donor')}: {dead['error']}")
+    print(f"✅ {stats} (agent calls: {agent_calls or 'none'})")
+    queue.close()
+    return stats
+
+def check_resume():
+    """A durable run stopped after the first donation, then restarted with the second: gaps must carry over"""
+    global AUDIT_LOG
+    tmp = tempfile.mkdtemp()
+    AUDIT_LOG = os.path.join(tmp, "workflow_audit.jsonl")
+    path = os.path.join(tmp, "workflow_jobs.db")
+    projects = lambda: {  # reloaded from the input on every run, as the CLI does
+        "Project_A": {"wallet": "0x1111111111111111111111111111111111111111", "gap": 1000,
+                      "milestone": {"id": "m1", "proof": "ipfs://bafy-a-m1", "verified": True}},
+        "Project_B": {"wallet": "0x2222222222222222222222222222222222222222", "gap": 600,
+                      "milestone": {"id": "m1", "proof": "ipfs://bafy-b-m1", "verified": True}},
+    }
+    d1, d2 = {"donor": "donor_1", "amount": 1000}, {"donor": "donor_2", "amount": 1000}
+    run_durable_workflow([d1], projects(), path)  # the process stops here
+    run_durable_workflow([d1, d2], projects(), path)
+    queue = JobQueue(path)
+    allocated = [result["project"] for _, result in queue.finished("needs")]
+    print(f"resume check: donations went to {allocated}")
+    assert allocated == ["Project_A", "Project_B"], allocated
+
+# Run the workflow
 if __name__ == "__main__":
-    conversation_id = simulate_donation_workflow()
-    print(f"\n💫 Workflow simulation complete! Conversation ID: {conversation_id}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run donations through the Orchestrator's workflow sequence")
+    parser.add_argument("--donations", help="JSON list of {donor, amount, project?, purpose?}")
+    parser.add_argument("--projects", help="JSON {name: {wallet, gap, milestone: {id, proof | proof_files, verified}, "
+                                           "history?: {donations, spend, balance}}}")
+    parser.add_argument("--queue", metavar="DB", help="run from a durable SQLite job queue (e.g. workflow_jobs.db)")
+    parser.add_argument("--check-resume", action="store_true", help="restart a durable run midway and check the gaps")
+    args = parser.parse_args()
+    if args.check_resume:
+        DISBURSER_PK = None  # no transfers: verified projects stop before disbursement
+        check_resume()
+        raise SystemExit
+    donations, projects = SAMPLE_DONATIONS, SAMPLE_PROJECTS
+    if args.donations:
+        with open(args.donations) as f:
+            donations = json.load(f)
+    if args.projects:
+        with open(args.projects) as f:
+            projects = json.load(f)
+    if args.queue:
+        run_durable_workflow(donations, projects, args.queue)
+    else:
+        run_donation_workflow(donations, projects)
\ No newline at end of file
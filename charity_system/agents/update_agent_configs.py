@@ -1,67 +1,91 @@
+import argparse
 import json
 import os
 from dotenv import load_dotenv
 from elevenlabs import ElevenLabs
 
+from agent_manager import load_agent_directory
+from config_cache import ConfigCache, canonical
+
+parser = argparse.ArgumentParser(description="Push prompt and tool updates to the deployed agents")
+parser.add_argument("--dry-run", action="store_true", help="print what would change, send nothing")
+parser.add_argument("--force", action="store_true", help="ignore the local cache and push every agent")
+args = parser.parse_args()
+
 load_dotenv()
 api_key = os.getenv("ELEVENLABS_API_KEY")
 client = ElevenLabs(api_key=api_key)
 
 # Load agent directory
-with open('agent_directory.json', 'r') as f:
-    agent_directory = json.load(f)
+agent_directory = load_agent_directory()
+
+# Last pushed config per agent: unchanged agents are skipped without any API call
+CONFIG_CACHE = ConfigCache()
+
+def payload_from_agent(current_agent, agent_name):
+    """name/tags/conversation_config of a deployed agent, as we would send them back"""
+    conversation_config = {}
+    if hasattr(current_agent, 'conversation_config'):
+        existing_config = current_agent.conversation_config
+        if hasattr(existing_config, 'agent'):
+            conversation_config['agent'] = {
+                'first_message': getattr(existing_config.agent, 'first_message', ''),
+                'prompt': {'prompt': getattr(existing_config.agent.prompt, 'prompt', '')}
+            }
+        if hasattr(existing_config, 'tts'):
+            conversation_config['tts'] = {
+                'voice_id': existing_config.tts.voice_id,
+                'model_id': existing_config.tts.model_id
+            }
+    else:
+        # Create new conversation config
+        conversation_config = {
+            "agent": {
+                "first_message": f"Hello! I'm the {agent_name} for the AI Charity system.",
+                "prompt": {"prompt": ""}
+            },
+            "tts": {
+                "voice_id": "21m00Tcm4TlvDq8ikWAM",
+                "model_id": "eleven_monolingual_v1"
+            }
+        }
+    return {
+        "name": current_agent.name,
+        "tags": list(getattr(current_agent, 'tags', None) or []),
+        "conversation_config": conversation_config,
+    }
 
 def update_agent_with_tools(agent_name, agent_id, tools_config, enhanced_prompt=None):
-    """Update agent with tools using the correct API format"""
+    """Update agent with tools using the correct API format.
+
+    The settings we preserve (first message, TTS, tags) come from the local
+    cache of what we last pushed, so agents.get is only needed the first
+    time; an agent whose config hash is unchanged is skipped entirely.
+    """
     try:
-        print(f"🔄 Updating {agent_name}...")
-        
-        # Get current agent to preserve existing settings
-        current_agent = client.conversational_ai.agents.get(agent_id)
-        
-        # Prepare update data - using the exact parameters from the signature
-        update_data = {
-            "agent_id": agent_id,
-            "name": current_agent.name,
-            "tags": getattr(current_agent, 'tags', []),
-        }
-        
-        # Add conversation_config if we have tools or enhanced prompt
-        conversation_config = {}
-        
-        # Preserve existing conversation config if available
-        if hasattr(current_agent, 'conversation_config'):
-            existing_config = current_agent.conversation_config
-            if hasattr(existing_config, 'agent'):
-                conversation_config['agent'] = {
-                    'first_message': getattr(existing_config.agent, 'first_message', ''),
-                    'prompt': {'prompt': enhanced_prompt if enhanced_prompt else getattr(existing_config.agent.prompt, 'prompt', '')}
-                }
-            if hasattr(existing_config, 'tts'):
-                conversation_config['tts'] = {
-                    'voice_id': existing_config.tts.voice_id,
-                    'model_id': existing_config.tts.model_id
-                }
+        cached = CONFIG_CACHE.get(agent_name)
+        if cached and cached["agent_id"] == agent_id and not args.force:
+            base = cached["payload"]
         else:
-            # Create new conversation config
-            conversation_config = {
-                "agent": {
-                    "first_message": f"Hello! I'm the {agent_name} for the AI Charity system.",
-                    "prompt": {"prompt": enhanced_prompt if enhanced_prompt else ""}
-                },
-                "tts": {
-                    "voice_id": "21m00Tcm4TlvDq8ikWAM",
-                    "model_id": "eleven_monolingual_v1"
-                }
-            }
-        
-        # Add tools to conversation config
+            base = payload_from_agent(client.conversational_ai.agents.get(agent_id), agent_name)
+
+        payload = json.loads(json.dumps(base))
+        conversation_config = payload["conversation_config"]
+        if enhanced_prompt:
+            conversation_config.setdefault('agent', {})['prompt'] = {'prompt': enhanced_prompt}
         conversation_config['tools'] = tools_config
-        
-        update_data['conversation_config'] = conversation_config
-        
-        # Perform the update
-        response = client.conversational_ai.agents.update(**update_data)
+
+        if canonical(payload) == canonical(base) and not args.force:
+            CONFIG_CACHE.record(agent_name, agent_id, payload)
+            print(f"⏭️  {agent_name} unchanged, skipped")
+            return True
+        if args.dry_run:
+            print(CONFIG_CACHE.diff(agent_name, payload, old=base))
+            return True
+
+        print(f"🔄 Updating {agent_name}...")
+        client.conversational_ai.agents.update(agent_id=agent_id, **payload)
+        CONFIG_CACHE.record(agent_name, agent_id, payload)
         print(f"✅ Successfully updated {agent_name}")
         return True
         
@@ -237,4 +261,6 @@ update_agent_with_tools(
     enhanced_prompts["AutoDisbursement Agent"]
 )
 
+if not args.dry_run:
+    CONFIG_CACHE.save()
 print("\n✅ AGENT UPDATE PROCESS COMPLETED!")
\ No newline at end of file
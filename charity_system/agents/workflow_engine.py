@@ -0,0 +1,302 @@
+# agents/workflow_engine.py — asyncio DAG runner: many donations in flight, bounded per stage
+#
+#   python workflow_engine.py [donations]    throughput benchmark with stub stages (no key needed)
+import asyncio
+import random
+import time
+
+
+class Stage:
+    """One step of the workflow: `await handler(ctx)` returns the stage's result, stored as ctx[name].
+
+    The stage starts once every stage in `after` succeeded; `when(ctx)`
+    returning False skips it, and everything that depends on it, for that
+    item. At most `concurrency` runs execute at once across all items. A
+    run that raises or exceeds `timeout` is retried `retries` times with
+    jittered exponential backoff, without holding a concurrency slot while
+    it waits.
+    """
+
+    def __init__(self, name, handler, after=(), when=None, concurrency=8, retries=2, backoff=0.2, timeout=30.0):
+        self.name = name
+        self.handler = handler
+        self.after = tuple(after)
+        self.when = when
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+
+class WorkflowEngine:
+    """Runs every submitted item through a DAG of Stages concurrently.
+
+    Each item gets a ctx dict ({"item", "status", "errors"} plus one entry
+    per finished stage) and its stages run as soon as their dependencies
+    finish, so independent stages overlap. submit() waits while
+    max_in_flight items are unfinished: a fast producer is slowed down to
+    the pace of the slowest stage instead of queueing without bound.
+    An item ends "completed", "halted" (a `when` said stop) or "failed"
+    (a stage ran out of retries; its dependents are skipped).
+    """
+
+    def __init__(self, stages, max_in_flight=256):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = self._toposort()
+        self.max_in_flight = max_in_flight
+        self.stats = {"submitted": 0, "completed": 0, "halted": 0, "failed": 0, "retries": 0}
+        self.stage_stats = {name: {"ok": 0, "failed": 0, "skipped": 0, "busy_s": 0.0, "active": 0, "peak": 0}
+                            for name in self.order}
+        self._limits = None
+        self._slots = None
+
+    def _toposort(self):
+        for stage in self.stages.values():
+            unknown = set(stage.after) - set(self.stages)
+            if unknown:
+                raise ValueError(f"stage {stage.name!r} depends on unknown stage(s) {sorted(unknown)}")
+        order, ready = [], [name for name, s in self.stages.items() if not s.after]
+        waiting = {name: set(s.after) for name, s in self.stages.items() if s.after}
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for other, deps in list(waiting.items()):
+                deps.discard(name)
+                if not deps:
+                    ready.append(other)
+                    del waiting[other]
+        if waiting:
+            raise ValueError(f"workflow has a cycle through {sorted(waiting)}")
+        return order
+
+    async def _run_stage(self, stage, ctx, tasks):
+        outcomes = await asyncio.gather(*(tasks[dep] for dep in stage.after))
+        stats = self.stage_stats[stage.name]
+        if any(outcome != "ok" for outcome in outcomes) or (stage.when and not stage.when(ctx)):
+            stats["skipped"] += 1
+            ctx["status"][stage.name] = "skipped"
+            return "skipped"
+        for attempt in range(stage.retries + 1):
+            async with self._limits[stage.name]:
+                stats["active"] += 1
+                stats["peak"] = max(stats["peak"], stats["active"])
+                t0 = time.perf_counter()
+                try:
+                    ctx[stage.name] = await asyncio.wait_for(stage.handler(ctx), stage.timeout)
+                    error = None
+                except Exception as e:
+                    error = e
+                finally:
+                    stats["active"] -= 1
+                    stats["busy_s"] += time.perf_counter() - t0
+            if error is None:
+                stats["ok"] += 1
+                ctx["status"][stage.name] = "ok"
+                return "ok"
+            if attempt < stage.retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(stage.backoff * 2 ** attempt * (0.5 + random.random()))
+        stats["failed"] += 1
+        ctx["status"][stage.name] = "failed"
+        ctx["errors"][stage.name] = repr(error) if isinstance(error, asyncio.TimeoutError) else str(error)
+        return "failed"
+
+    async def _process(self, item):
+        ctx = {"item": item, "status": {}, "errors": {}, "started": time.perf_counter()}
+        try:
+            tasks = {}
+            for name in self.order:  # dependencies come first, so their tasks already exist
+                tasks[name] = asyncio.create_task(self._run_stage(self.stages[name], ctx, tasks))
+            outcomes = await asyncio.gather(*tasks.values())
+            ctx["outcome"] = "failed" if "failed" in outcomes else "halted" if "skipped" in outcomes else "completed"
+            ctx["elapsed"] = time.perf_counter() - ctx.pop("started")
+            self.stats[ctx["outcome"]] += 1
+            return ctx
+        finally:
+            self._slots.release()
+
+    async def submit(self, item):
+        """Start an item; waits while max_in_flight items are unfinished. Returns the item's task."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._limits = {name: asyncio.Semaphore(stage.concurrency) for name, stage in self.stages.items()}
+        await self._slots.acquire()
+        self.stats["submitted"] += 1
+        return asyncio.create_task(self._process(item))
+
+    async def run(self, items):
+        """Push every item (a list or an async iterator) through the workflow; returns their ctx dicts."""
+        tasks = []
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                tasks.append(await self.submit(item))
+        else:
+            for item in items:
+                tasks.append(await self.submit(item))
+        return await asyncio.gather(*tasks)
+
+
+
+class DurableWorkflow:
+    """Runs the same Stages from a job_queue.JobQueue, one job per (stage, item key).
+
+    A job's payload carries the item and the results of the stages before
+    it; finishing a stage queues its dependents in the same transaction,
+    so after a crash or restart run() picks up every donation where it
+    stopped and a stage that already finished is never run again. Retries
+    come from the queue: a failing job is retried after a backoff up to
+    stage.retries + 1 attempts, then dead-lettered. A stage that was
+    running when the process died runs again, so handlers with side effects
+    should be idempotent per ctx["key"]. Stage results must be
+    JSON-serializable, and each stage may depend on at most one other
+    (chains and fan-out, like the donation workflow).
+    """
+
+    def __init__(self, stages, queue, poll_interval=0.2):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            if len(stage.after) > 1:
+                raise ValueError(f"stage {stage.name!r}: a durable workflow stage can depend on one stage at most")
+        self.order = WorkflowEngine(stages).order  # validates the DAG
+        self.dependents = {name: [s for s in stages if name in s.after] for name in self.stages}
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.stats = {"ok": 0, "retried": 0, "dead": 0, "lost_leases": 0}
+
+    def _jobs(self, stages, key, item, results):
+        ctx = {"item": item, "status": {name: "ok" for name in results}, "errors": {}, **results}
+        return [(stage.name, key, {"item": item, "results": results}, 0.0, stage.retries + 1)
+                for stage in stages if not stage.when or stage.when(ctx)]
+
+    def submit(self, items, key):
+        """Queue the first stage for every item; key(item) must be stable. Returns how many were new."""
+        roots = [self.stages[name] for name in self.order if not self.stages[name].after]
+        return self.queue.enqueue_many([job for item in items for job in self._jobs(roots, key(item), item, {})])
+
+    async def _run_job(self, stage, job):
+        results = job.payload["results"]
+        ctx = {"item": job.payload["item"], "key": job.key, "status": {name: "ok" for name in results}, "errors": {},
+               **results}
+        try:
+            result = await asyncio.wait_for(stage.handler(ctx), stage.timeout)
+        except Exception as e:
+            state = await asyncio.to_thread(self.queue.fail, job, e, stage.backoff * 2 ** (job.attempts - 1))
+            self.stats["dead" if state == "dead" else "retried" if state else "lost_leases"] += 1
+            return
+        next_jobs = self._jobs(self.dependents[stage.name], job.key, job.payload["item"], {**results, stage.name: result})
+        if await asyncio.to_thread(self.queue.complete, job, result, next_jobs):
+            self.stats["ok"] += 1
+        else:
+            self.stats["lost_leases"] += 1
+
+    async def _worker(self, stage, idle):
+        running = set()
+        while True:
+            free = stage.concurrency - len(running)
+            jobs = await asyncio.to_thread(self.queue.claim, stage.name, free, 2 * stage.timeout) if free else []
+            for job in jobs:
+                task = asyncio.create_task(self._run_job(stage, job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            if not jobs and not running and idle.is_set():
+                return
+            await asyncio.sleep(0 if jobs else self.poll_interval)
+
+    async def run(self):
+        """Work every stage until no job is left ready, leased or waiting for a retry."""
+        idle = asyncio.Event()
+        workers = [asyncio.create_task(self._worker(self.stages[name], idle)) for name in self.order]
+        while not all(worker.done() for worker in workers):
+            pending = await asyncio.to_thread(lambda: sum(self.queue.pending(name) for name in self.order))
+            if pending:
+                idle.clear()
+            else:
+                idle.set()
+            await asyncio.sleep(self.poll_interval)
+        for worker in workers:
+            worker.result()
+        return self.stats
+
+
+# === Benchmark: the Orchestrator's donation sequence with stub stages ===
+if __name__ == "__main__":
+    import statistics
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = random.Random(7)
+    llm_calls = {"NeedsPredictor": 0, "MilestoneVerifier": 0}
+    handler_calls = [0]
+
+    def stub(seconds, fail_rate=0.0, llm=None, llm_rate=0.0, llm_seconds=0.5):
+        async def handler(ctx):
+            handler_calls[0] += 1
+            delay = seconds * rng.uniform(0.5, 1.5)
+            if llm and rng.random() < llm_rate:  # rules could not decide: ask the agent
+                llm_calls[llm] += 1
+                delay += llm_seconds * rng.uniform(0.5, 1.5)
+            await asyncio.sleep(delay)
+            if rng.random() < fail_rate:
+                raise ConnectionError("transient RPC error")
+            return {"ok": True}
+        return handler
+
+    stages = [
+        Stage("needs", stub(0.005, llm="NeedsPredictor", llm_rate=0.05), concurrency=64),
+        Stage("verify", stub(0.02, llm="MilestoneVerifier", llm_rate=0.05), after=["needs"], concurrency=64),
+        Stage("disburse", stub(0.1, fail_rate=0.02), after=["verify"], concurrency=32, retries=3, backoff=0.05),
+        Stage("report", stub(0.01), after=["disburse"], concurrency=32),
+        Stage("notify", stub(0.005), after=["report"], concurrency=64),
+        Stage("audit", stub(0.002), after=["report"], concurrency=64),
+    ]
+    engine = WorkflowEngine(stages, max_in_flight=256)
+
+    async def donations():
+        for i in range(n):
+            yield {"donor": f"donor_{i}", "amount": rng.choice([5, 20, 100, 500])}
+
+    t0 = time.perf_counter()
+    results = asyncio.run(engine.run(donations()))
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(ctx["elapsed"] for ctx in results)
+    serial = sum(stats["busy_s"] for stats in engine.stage_stats.values())
+    print(f"{n} donations through 6 stages in {elapsed:.2f} s: {n / elapsed:.0f} donations/s "
+          f"(one at a time: ~{serial:.0f} s, {n / serial:.1f}/s)")
+    print(f"end-to-end latency p50 {statistics.median(latencies) * 1e3:.0f} ms, "
+          f"p95 {latencies[int(0.95 * len(latencies))] * 1e3:.0f} ms; {engine.stats}")
+    print(f"agent calls: {sum(llm_calls.values())} {llm_calls} (an agent per stage: {len(stages) * n})")
+    for name, stats in engine.stage_stats.items():
+        print(f"  {name:9s} ok {stats['ok']:5d}  failed {stats['failed']:3d}  peak concurrency {stats['peak']:3d}"
+              f"/{engine.stages[name].concurrency:<3d} busy {stats['busy_s']:6.1f} s")
+
+    # Durable: the same stages from a SQLite job queue, killed after 1 s and restarted
+    import os
+    import tempfile
+
+    from job_queue import JobQueue
+
+    path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    queue = JobQueue(path)
+    for stage in stages:
+        stage.timeout = 1.0  # leases are 2 x timeout: work lost in the crash is picked up again after 2 s
+    durable = DurableWorkflow(stages, queue, poll_interval=0.05)
+    durable.submit([{"donor": f"donor_{i}", "amount": 100} for i in range(n)], key=lambda item: item["donor"])
+    handler_calls[0] = 0
+
+    async def crash_after(seconds):
+        try:
+            await asyncio.wait_for(durable.run(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    t0 = time.perf_counter()
+    asyncio.run(crash_after(1.0))
+    at_crash = {stage: counts.get("done", 0) for stage, counts in queue.counts().items()}
+    restarted = DurableWorkflow(stages, JobQueue(path), poll_interval=0.05)
+    asyncio.run(restarted.run())
+    elapsed = time.perf_counter() - t0
+    counts = restarted.queue.counts()
+    retries = durable.stats["retried"] + restarted.stats["retried"]
+    print(f"durable: {n} donations in {elapsed:.2f} s across a crash at 1 s (done then: {at_crash}); "
+          f"all {counts['audit']['done']} audited, {handler_calls[0] - 6 * n - retries} stage run(s) repeated "
+          f"(in flight at the crash), {retries} retried")
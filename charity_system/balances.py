@@ -0,0 +1,123 @@
+# balances.py — USDC balances of every registered NGO wallet, one batched read per block
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+from disbursement import BATCH_SIZE
+
+BALANCE_OF_SELECTOR = "70a08231"  # balanceOf(address)
+
+
+def rpc_call(provider, method, params):
+    """One JSON-RPC call's result; an error reply raises ValueError."""
+    resp = provider.make_request(method, params)
+    if "error" in resp:
+        raise ValueError(resp["error"].get("message", resp["error"]))
+    return resp["result"]
+
+
+class BalanceBook:
+    """Serves the balances of a fixed set of wallets, refreshed at most once per block.
+
+    The head is re-read at most every head_ttl seconds. When it has moved,
+    all balanceOf calls go out as one JSON-RPC batch pinned to that block,
+    and the response is serialized once. Concurrent requests during a
+    refresh wait on the same read instead of starting their own; if the
+    node is unreachable the last block read keeps being served.
+    """
+
+    def __init__(self, provider, token, wallets, decimals=6, head_ttl=2.0):
+        self.provider = provider
+        self.token = token
+        self.wallets = wallets  # [(name, address)]
+        self.decimals = decimals
+        self.head_ttl = head_ttl
+        self.lock = threading.Lock()
+        self.snapshot = None  # (block, body bytes, etag)
+        self.checked_at = 0.0
+        self.inflight = None
+        self.stats = {"served": 0, "head_reads": 0, "balance_reads": 0}
+
+    def _read(self, block):
+        calls = [("eth_call", [{"to": self.token, "data": "0x" + BALANCE_OF_SELECTOR + addr[2:].lower().rjust(64, "0")},
+                               hex(block)]) for _, addr in self.wallets]
+        results = []
+        for start in range(0, len(calls), BATCH_SIZE):
+            responses = self.provider.make_batch_request(calls[start:start + BATCH_SIZE])
+            if isinstance(responses, dict):
+                raise ValueError(responses.get("error", {}).get("message", "batch refused"))
+            results += sorted(responses, key=lambda r: r.get("id", 0))
+        self.stats["balance_reads"] += 1
+        balances = [{"name": name, "wallet": addr,
+                     "balance": int(r["result"] or "0x0", 16) / 10**self.decimals if "result" in r else None}
+                    for (name, addr), r in zip(self.wallets, results)]
+        body = json.dumps({"block": block, "token": self.token, "balances": balances}, separators=(",", ":")).encode()
+        return block, body, f'"{block}"'
+
+    def _refresh(self):
+        block = int(rpc_call(self.provider, "eth_blockNumber", []), 16)
+        self.stats["head_reads"] += 1
+        if self.snapshot and self.snapshot[0] == block:
+            return self.snapshot
+        return self._read(block)
+
+    def get(self):
+        """(block, json_body, etag) for the current head."""
+        with self.lock:
+            self.stats["served"] += 1
+            if self.snapshot and time.time() - self.checked_at < self.head_ttl:
+                return self.snapshot
+            owner = self.inflight is None
+            if owner:
+                self.inflight = Future()
+            future = self.inflight
+        if not owner:
+            return future.result()
+        try:
+            snapshot = self._refresh()
+        except Exception as e:
+            # Keep serving the last block we read rather than failing every dashboard
+            with self.lock:
+                self.inflight = None
+                stale = self.snapshot
+            if stale is None:
+                future.set_exception(e)
+                raise
+            future.set_result(stale)
+            return stale
+        with self.lock:
+            self.snapshot, self.checked_at, self.inflight = snapshot, time.time(), None
+        future.set_result(snapshot)
+        return snapshot
+
+
+# === Demo: 200 concurrent dashboard viewers against devchain.LocalRPC with 50 ms round trips ===
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    from devchain import LocalChain, LocalRPC
+    from ngo_registry import NGORegistry
+
+    chain = LocalChain()
+    rpc = LocalRPC(chain, latency=0.05)
+    registry = NGORegistry.from_file()
+    usdc = "0x41e94eb019c0762f9bfcf9fb2e58725bfb0e7582"
+    for i, ngo in enumerate(registry.ngos):
+        chain.emit_transfer(usdc, "0x" + "d0" * 20, ngo["wallet"], (i + 1) * 12_500_000)
+    chain.mine()
+    book = BalanceBook(rpc, usdc, registry.wallets(), head_ttl=0.5)
+
+    def viewer(_):
+        return json.loads(book.get()[1])["block"]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(200) as pool:
+        for _ in range(3):
+            list(pool.map(viewer, range(200)))
+            chain.mine()
+            time.sleep(0.5)
+    elapsed = time.perf_counter() - t0
+    print(f"600 dashboard loads over 3 blocks in {elapsed:.2f} s: {rpc.round_trips} RPC round trips "
+          f"(one eth_call per wallet per viewer would be {600 * len(registry.wallets())}); stats {book.stats}")
+    print(json.loads(book.get()[1])["balances"][:3])
@@ -0,0 +1,219 @@
+# chat_sessions.py — bounded server-side chat history: ring buffer, token budget, rolling summary, LRU/TTL
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+TURN_OVERHEAD = 200  # bytes per stored turn beyond its text (dict, deque slot, strings' headers)
+
+
+def estimate_tokens(text):
+    """~4 characters per token for English; close enough to budget a prompt without a tokenizer."""
+    return max(1, (len(text) + 3) // 4)
+
+
+class Session:
+    __slots__ = ("id", "turns", "summary", "pending", "summarizing", "last_used", "size")
+
+    def __init__(self, session_id, max_turns, now):
+        self.id = session_id
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.pending = []  # turns pushed out of the ring, not yet folded into the summary
+        self.summarizing = False
+        self.last_used = now
+        self.size = TURN_OVERHEAD
+
+
+class SessionStore:
+    """Conversation history kept by the server, so a chat turn carries only the new message.
+
+    Each session keeps its last max_turns turns in a ring buffer. history()
+    returns the newest turns that fit token_budget, preceded by the rolling
+    summary when there is one, so what goes upstream stays the same size
+    however long the conversation runs. Turns that fall out of the ring are
+    handed, summary_every at a time, to summarize(previous_summary, turns)
+    on a background thread (an LLM call, say); without a summarizer they
+    are dropped. Sessions idle for ttl seconds expire, and the least
+    recently used go first whenever the store holds more than max_bytes.
+    """
+
+    def __init__(self, max_turns=40, token_budget=2000, summary_tokens=300, ttl=1800, max_bytes=64 << 20,
+                 summarize=None, summary_every=8, clock=time.time):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.summarize = summarize
+        self.summary_every = summary_every
+        self.clock = clock
+        self.sessions = OrderedDict()  # least recently used first
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "expired": 0, "evicted": 0, "summaries": 0, "summary_errors": 0, "dropped_turns": 0}
+
+    def _evict_locked(self, now):
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_used >= self.ttl:
+                self.stats["expired"] += 1
+            elif self.size > self.max_bytes:
+                self.stats["evicted"] += 1
+            else:
+                return
+            self.sessions.popitem(last=False)
+            self.size -= session.size
+
+    def _touch_locked(self, session_id, now, create):
+        session = self.sessions.get(session_id) if session_id else None
+        if session is not None and now - session.last_used >= self.ttl:
+            self.sessions.pop(session_id)
+            self.size -= session.size
+            self.stats["expired"] += 1
+            session = None
+        if session is None:
+            if not create:
+                return None
+            session_id = session_id or uuid.uuid4().hex
+            session = self.sessions[session_id] = Session(session_id, self.max_turns, now)
+            self.size += session.size
+            self.stats["created"] += 1
+        session.last_used = now
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def open(self, session_id=None):
+        """The id of a live session: session_id if it is still held, else a new one (under that id if given)."""
+        with self.lock:
+            now = self.clock()
+            session = self._touch_locked(session_id, now, create=True)
+            self._evict_locked(now)
+            return session.id
+
+    def append(self, session_id, role, content):
+        """Add a turn; returns False if the session is gone (expired or evicted)."""
+        turn = {"role": role, "content": content}
+        cost = len(content) + TURN_OVERHEAD
+        with self.lock:
+            now = self.clock()
+            session = self._touch_locked(session_id, now, create=False)
+            if session is None:
+                return False
+            if len(session.turns) == session.turns.maxlen:
+                old = session.turns[0]
+                freed = len(old["content"]) + TURN_OVERHEAD
+                if self.summarize:
+                    session.pending.append(old)
+                else:
+                    session.size -= freed
+                    self.size -= freed
+                    self.stats["dropped_turns"] += 1
+            session.turns.append(turn)
+            session.size += cost
+            self.size += cost
+            fold = self.summarize and len(session.pending) >= self.summary_every and not session.summarizing
+            if fold:
+                session.summarizing = True
+                batch, summary = session.pending, session.summary
+            self._evict_locked(now)
+        if fold:
+            threading.Thread(target=self._fold, args=(session, summary, batch), daemon=True).start()
+        return True
+
+    def _fold(self, session, summary, batch):
+        try:
+            summary = self.summarize(summary, batch) or summary
+            self.stats["summaries"] += 1
+        except Exception as e:
+            self.stats["summary_errors"] += 1
+            print(f"Chat summary failed for {session.id}: {e}")
+            batch = []  # keep the turns pending; the next fold retries them
+        summary = summary[:self.summary_tokens * 4]
+        with self.lock:
+            freed = sum(len(t["content"]) + TURN_OVERHEAD for t in batch)
+            del session.pending[:len(batch)]
+            grown = len(summary) - len(session.summary)
+            session.summary = summary
+            session.summarizing = False
+            if session.id in self.sessions:  # evicted meanwhile: its bytes are already off the books
+                session.size += grown - freed
+                self.size += grown - freed
+
+    def history(self, session_id):
+        """[{role, content}] to send upstream: the summary, then the newest turns within token_budget."""
+        with self.lock:
+            session = self._touch_locked(session_id, self.clock(), create=False)
+            if session is None:
+                return []
+            turns, summary = list(session.turns), session.summary
+        budget = self.token_budget
+        kept = []
+        for turn in reversed(turns):
+            budget -= estimate_tokens(turn["content"])
+            if budget < 0 and kept:
+                break
+            kept.append(turn)
+        kept.reverse()
+        if summary:
+            kept.insert(0, {"role": "system", "content": f"Summary of the conversation so far: {summary}"})
+        return kept
+
+    def seed(self, session_id, history):
+        """Load a client-sent history into a new session (older clients still send the whole thing)."""
+        for turn in list(history)[-self.max_turns:]:
+            if isinstance(turn, dict) and isinstance(turn.get("content"), str):
+                self.append(session_id, turn.get("role", "user"), turn["content"])
+
+    def drop(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                self.size -= session.size
+
+    def status(self):
+        with self.lock:
+            return {"sessions": len(self.sessions), "bytes": self.size, "max_bytes": self.max_bytes, **self.stats}
+
+
+# === Demo: payload per turn over a long conversation, and a memory-capped store under many sessions ===
+if __name__ == "__main__":
+    import json
+    import random
+
+    rng = random.Random(5)
+    words = "donate project clean water school Pakistan Kenya milestone verified wallet USDC impact report".split()
+    say = lambda n: " ".join(rng.choice(words) for _ in range(n))
+
+    store = SessionStore(summarize=lambda summary, turns: (summary + " " + "; ".join(t["content"][:40] for t in turns))[-1200:])
+    sid = store.open()
+    client_history = []
+    for turn in range(1, 1001):
+        message, reply = say(12), say(60)
+        old = len(json.dumps({"message": message, "history": client_history}))
+        new = len(json.dumps({"message": message, "session_id": sid, "history": store.history(sid)}))
+        store.append(sid, "user", message)
+        store.append(sid, "assistant", reply)
+        client_history += [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+        if turn in (1, 10, 100, 1000):
+            print(f"turn {turn:4d}: upstream payload {old / 1024:7.1f} KiB with the client's full history, "
+                  f"{new / 1024:5.1f} KiB from the session store")
+    time.sleep(0.1)
+    print(f"summaries folded: {store.stats['summaries']}")
+
+    now = [0.0]
+    store = SessionStore(max_bytes=32 << 20, ttl=1800, clock=lambda: now[0])
+    t0 = time.perf_counter()
+    for i in range(100_000):
+        now[0] += 0.05  # a new visitor every 50 ms, each chatting for a few turns
+        sid = store.open()
+        for _ in range(rng.randint(1, 6)):
+            store.append(sid, "user", say(12))
+            store.append(sid, "assistant", say(60))
+    elapsed = time.perf_counter() - t0
+    print(f"100k sessions over {now[0] / 3600:.1f} h: {json.dumps(store.status())}; "
+          f"{elapsed / 100_000 * 1e6:.0f} us per session of turns")
+    print(f"store bytes tracked {store.size / 2**20:.1f} MiB (Python objects measured: "
+          f"{sum(sys.getsizeof(t['content']) + sys.getsizeof(t) for s in store.sessions.values() for t in s.turns) / 2**20:.1f} MiB "
+          f"of turn text and dicts)")
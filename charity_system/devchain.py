@@ -0,0 +1,374 @@
+# devchain.py — in-memory chain stand-in for exercising the backend offline
+import asyncio
+import json
+import random
+import threading
+import time
+
+import rlp
+from eth_account import Account
+from eth_utils import keccak
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+
+class NonceError(ValueError):
+    pass
+
+
+TRANSFER_TOPIC = "0x" + keccak(b"Transfer(address,address,uint256)").hex()
+
+
+def transfer_log(token, sender, to, value, tx_hash):
+    return {"address": token.lower(), "data": "0x" + format(value, "064x"), "transactionHash": tx_hash,
+            "topics": [TRANSFER_TOPIC, "0x" + sender[2:].lower().rjust(64, "0"), "0x" + to[2:].lower().rjust(64, "0")]}
+
+
+def log_filter(flt):
+    """Predicate for an eth_getLogs / eth_subscribe filter (address and topic0 only)."""
+    address = flt.get("address")
+    addresses = {a.lower() for a in ([address] if isinstance(address, str) else address or [])}
+    topic0 = (flt.get("topics") or [None])[0]
+    return lambda log: (not addresses or log["address"] in addresses) and (topic0 is None or log["topics"][0] == topic0)
+
+
+class LocalChain:
+    """Just enough of an EVM node's transaction pool to test nonce handling.
+
+    Transactions are accepted per sender by nonce: below the mined count is
+    "nonce too low", a duplicate is "already known", anything above the next
+    contiguous nonce waits in the queue until the gap is filled. mine() moves
+    every contiguous pending transaction into a block, along with the token
+    Transfer logs they (or emit_transfer) produced; reorg() replaces the top
+    blocks with a competing fork.
+    """
+
+    def __init__(self, reject_rate=0.0, seed=None):
+        self.lock = threading.Lock()
+        self.mined = {}     # sender -> mined tx count
+        self.pool = {}      # sender -> {nonce: tx}
+        self.blocks = []
+        self.base_fee = 10**9
+        self.balances = {}  # address -> token units, for balanceOf
+        self.code = {}      # address -> deployed bytecode hex
+        self.pending_logs = []
+        self.forks = 0
+        self.listeners = []  # called with each new block dict, e.g. by LocalWS
+        self.removal_listeners = []  # called with the logs a reorg orphaned, marked removed
+        self.reject_rate = reject_rate
+        self.rng = random.Random(seed)
+        self.rpc_calls = 0
+
+    def _pending_count(self, sender):
+        n = self.mined.get(sender, 0)
+        pool = self.pool.get(sender, {})
+        while n in pool:
+            n += 1
+        return n
+
+    def get_transaction_count(self, sender, block="pending"):
+        with self.lock:
+            self.rpc_calls += 1
+            return self._pending_count(sender) if block == "pending" else self.mined.get(sender, 0)
+
+    def send_transaction(self, sender, nonce, tx=None):
+        with self.lock:
+            self.rpc_calls += 1
+            if nonce < self.mined.get(sender, 0):
+                raise NonceError("nonce too low")
+            pool = self.pool.setdefault(sender, {})
+            if nonce in pool:
+                raise NonceError("already known")
+            if self.rng.random() < self.reject_rate:
+                raise ValueError("transaction underpriced")
+            pool[nonce] = tx if tx is not None else {"from": sender, "nonce": nonce}
+            return f"0x{len(self.blocks):08x}{nonce:056x}"
+
+    def queued(self, sender):
+        """Nonces stuck behind a gap."""
+        with self.lock:
+            ready = self._pending_count(sender)
+            return sorted(n for n in self.pool.get(sender, {}) if n > ready)
+
+    def emit_transfer(self, token, sender, to, value):
+        """Queue a token Transfer log for the next block without signing a transaction."""
+        with self.lock:
+            tx_hash = "0x" + keccak(f"{token}{sender}{to}{value}{len(self.pending_logs)}{self.rng.random()}".encode()).hex()
+            self.pending_logs.append(transfer_log(token, sender, to, value, tx_hash))
+        return tx_hash
+
+    def mine(self):
+        with self.lock:
+            block = []
+            for sender, pool in self.pool.items():
+                n = self.mined.get(sender, 0)
+                while n in pool:
+                    block.append(pool.pop(n))
+                    n += 1
+                self.mined[sender] = n
+            # EIP-1559: base fee moves up to 12.5% toward a 100-tx "target" block
+            self.base_fee = max(7, self.base_fee + self.base_fee * (len(block) - 100) // 800)
+            number = len(self.blocks) + 1
+            parent = self.blocks[-1]["hash"] if self.blocks else "0x" + "00" * 32
+            block_hash = "0x" + keccak(f"{parent}{number}{self.forks}".encode()).hex()
+            logs = self.pending_logs + [tx["log"] for tx in block if tx.get("log")]
+            self.pending_logs = []
+            for i, log in enumerate(logs):
+                log.update(blockNumber=hex(number), blockHash=block_hash, logIndex=hex(i), removed=False)
+                value = int(log["data"], 16)
+                sender, to = "0x" + log["topics"][1][-40:], "0x" + log["topics"][2][-40:]
+                self.balances[sender] = max(0, self.balances.get(sender, 0) - value)
+                self.balances[to] = self.balances.get(to, 0) + value
+            mined = {"txs": block, "base_fee": self.base_fee, "number": number, "hash": block_hash,
+                     "parentHash": parent, "timestamp": int(time.time()), "logs": logs}
+            self.blocks.append(mined)
+        for listener in self.listeners:
+            listener(mined)
+        return block
+
+    def reorg(self, depth):
+        """Orphan the top `depth` blocks and mine a competing fork of the same height.
+
+        The orphaned logs go back to the pool and land in the fork's first
+        block, like transactions re-included after a reorg.
+        """
+        with self.lock:
+            orphaned = self.blocks[-depth:]
+            del self.blocks[-depth:]
+            self.forks += 1
+            removed = []
+            for block in orphaned:
+                for log in block["logs"]:
+                    self.pending_logs.append({k: log[k] for k in ("address", "topics", "data", "transactionHash")})
+                    removed.append(dict(log, removed=True))
+        for listener in self.removal_listeners:
+            listener(removed)
+        for _ in range(depth):
+            self.mine()
+
+
+class LocalRPC:
+    """JSON-RPC front for LocalChain, usable as a web3 provider.
+
+    latency is added once per HTTP round trip, so a batch of N calls costs
+    one latency and N single calls cost N, like a remote node would.
+    drop_rate is the share of round trips whose reply is lost after the
+    node has acted on the request, like a timeout on a slow connection.
+    """
+
+    def __init__(self, chain, chain_id=5042002, latency=0.0, max_logs=10_000, drop_rate=0.0, seed=None):
+        self.chain = chain
+        self.chain_id = chain_id
+        self.latency = latency
+        self.max_logs = max_logs
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.round_trips = 0
+        self.methods = {
+            "eth_chainId": lambda: hex(self.chain_id),
+            "eth_blockNumber": lambda: hex(len(self.chain.blocks)),
+            "eth_getTransactionCount": lambda addr, block="pending": hex(self.chain.get_transaction_count(addr.lower(), block)),
+            "eth_sendRawTransaction": self._send_raw,
+            "eth_gasPrice": lambda: hex(self.chain.base_fee + 10**9),
+            "eth_feeHistory": self._fee_history,
+            "eth_getCode": lambda addr, block="latest": self.chain.code.get(addr.lower(), "0x"),
+            "eth_call": self._call,
+            "eth_estimateGas": self._estimate_gas,
+            "eth_getBlockByNumber": self._get_block,
+            "eth_getLogs": self._get_logs,
+            "eth_getTransactionByHash": self._get_transaction,
+        }
+
+    def _block_number(self, tag):
+        return len(self.chain.blocks) if tag in ("latest", "pending", "safe", "finalized") else int(tag, 16)
+
+    def _get_block(self, tag, full=False):
+        number = self._block_number(tag)
+        if not 1 <= number <= len(self.chain.blocks):
+            return None
+        b = self.chain.blocks[number - 1]
+        return {"number": hex(number), "hash": b["hash"], "parentHash": b["parentHash"], "timestamp": hex(b["timestamp"])}
+
+    def _get_transaction(self, tx_hash):
+        with self.chain.lock:
+            pending = [(None, tx) for pool in self.chain.pool.values() for tx in pool.values()]
+            mined = [(b["number"], tx) for b in self.chain.blocks for tx in b["txs"]]
+        for number, tx in pending + mined:
+            if tx.get("hash") == tx_hash:
+                return {"hash": tx_hash, "from": tx["from"], "nonce": hex(tx["nonce"]),
+                        "blockNumber": hex(number) if number else None}
+        return None
+
+    def _get_logs(self, flt):
+        lo = self._block_number(flt.get("fromBlock", "latest"))
+        hi = min(self._block_number(flt.get("toBlock", "latest")), len(self.chain.blocks))
+        matches = log_filter(flt)
+        out = []
+        for block in self.chain.blocks[max(lo, 1) - 1:hi]:
+            for log in block["logs"]:
+                if matches(log):
+                    out.append(dict(log))
+            # Public nodes refuse oversized responses rather than truncating them
+            if len(out) > self.max_logs:
+                raise ValueError(f"query returned more than {self.max_logs} results")
+        return out
+
+    def _fee_history(self, count, newest="latest", percentiles=()):
+        blocks = self.chain.blocks[-int(count, 16):]
+        # Tips spread from 0.1 to 2 gwei, wider when blocks are full
+        rewards = [[hex(int(10**8 * (1 + p / 5) * (1 + len(b["txs"]) / 100))) for p in percentiles] for b in blocks]
+        return {"oldestBlock": hex(len(self.chain.blocks) - len(blocks)),
+                "baseFeePerGas": [hex(b["base_fee"]) for b in blocks] + [hex(self.chain.base_fee)],
+                "gasUsedRatio": [min(1.0, len(b["txs"]) / 200) for b in blocks], "reward": rewards}
+
+    def _call(self, tx, block="latest"):
+        data = tx.get("data") or tx.get("input") or "0x"
+        if data[2:10] != "70a08231":
+            raise ValueError("execution reverted")
+        return hex(self.chain.balances.get("0x" + data[-40:].lower(), 0))
+
+    def _estimate_gas(self, tx, block="latest"):
+        data = tx.get("data") or tx.get("input") or "0x"
+        if data[2:10] != "a9059cbb":
+            return hex(21_000)
+        to = "0x" + data[10:74][-40:]
+        # Writing a zero balance slot costs the 20k SSTORE (not for a transfer to oneself, which rewrites
+        # the sender's slot); a contract recipient adds a little on top
+        fresh = not self.chain.balances.get(to) and (tx.get("from") or "").lower() != to
+        gas = 35_000 + (17_100 if fresh else 0)
+        return hex(gas + (2_600 if to in self.chain.code else 0))
+
+    def _send_raw(self, raw):
+        raw = bytes.fromhex(raw[2:] if raw.startswith("0x") else raw)
+        sender = Account.recover_transaction(raw).lower()
+        # Typed (EIP-2718) transactions carry chainId before the nonce; to/data sit 3 fields on
+        typed = raw[0] < 0x7f
+        fields = rlp.decode(raw[1:]) if typed else rlp.decode(raw)
+        nonce_at, to_at, data_at = (1, 5, 7) if typed else (0, 3, 5)
+        nonce, to, data = int.from_bytes(fields[nonce_at], "big"), fields[to_at], fields[data_at]
+        tx_hash = "0x" + keccak(raw).hex()
+        tx = {"from": sender, "nonce": nonce, "raw": raw, "hash": tx_hash}
+        if data[:4].hex() == "a9059cbb":
+            tx["log"] = transfer_log("0x" + to.hex(), sender, "0x" + data[16:36].hex(), int.from_bytes(data[36:68], "big"), tx_hash)
+        self.chain.send_transaction(sender, nonce, tx)
+        return tx_hash
+
+    def _dispatch(self, method, params, req_id=0):
+        fn = self.methods.get(method)
+        if fn is None:
+            return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32601, "message": f"method {method} not found"}}
+        try:
+            return {"jsonrpc": "2.0", "id": req_id, "result": fn(*(params or []))}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32000, "message": str(e)}}
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _reply(self, reply):
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            raise ConnectionError("read timed out")
+        return reply
+
+    # web3 provider interface
+    def make_request(self, method, params):
+        self._round_trip()
+        return self._reply(self._dispatch(method, params))
+
+    def make_batch_request(self, requests):
+        self._round_trip()
+        return self._reply([self._dispatch(method, params, i) for i, (method, params) in enumerate(requests)])
+
+
+class LocalWS:
+    """Websocket front for LocalRPC with eth_subscribe("newHeads" | "logs").
+
+    Runs its own event loop in a thread. pause(seconds) drops every
+    connection and refuses new ones for that long, to exercise a client's
+    reconnect path.
+    """
+
+    def __init__(self, rpc, host="127.0.0.1", port=0):
+        self.rpc = rpc
+        self.host = host
+        self.port = port
+        self.subs = {}  # subscription id -> (ws, kind, filter)
+        self.conns = set()
+        self.refuse_until = 0.0
+        self.loop = None
+        rpc.chain.listeners.append(self._on_block)
+        rpc.chain.removal_listeners.append(self._on_removed)
+
+    def start(self):
+        ready = threading.Event()
+
+        async def main():
+            async with serve(self._handler, self.host, self.port) as server:
+                self.port = server.sockets[0].getsockname()[1]
+                ready.set()
+                await asyncio.Future()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(main())
+
+        threading.Thread(target=run, daemon=True, name="local-ws").start()
+        ready.wait()
+        return f"ws://{self.host}:{self.port}"
+
+    def pause(self, seconds):
+        self.refuse_until = time.time() + seconds
+        for ws in list(self.conns):
+            asyncio.run_coroutine_threadsafe(ws.close(1012, "restarting"), self.loop)
+
+    async def _handler(self, ws):
+        if time.time() < self.refuse_until:
+            await ws.close(1013, "try again later")
+            return
+        self.conns.add(ws)
+        try:
+            async for message in ws:
+                req = json.loads(message)
+                method, params, req_id = req.get("method"), req.get("params") or [], req.get("id")
+                if method == "eth_subscribe":
+                    sub_id = hex(random.getrandbits(64))
+                    self.subs[sub_id] = (ws, params[0], params[1] if len(params) > 1 else {})
+                    resp = {"jsonrpc": "2.0", "id": req_id, "result": sub_id}
+                elif method == "eth_unsubscribe":
+                    resp = {"jsonrpc": "2.0", "id": req_id, "result": self.subs.pop(params[0], None) is not None}
+                else:
+                    resp = self.rpc._dispatch(method, params, req_id)
+                await ws.send(json.dumps(resp))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.conns.discard(ws)
+            for sub_id in [k for k, (conn, *_) in self.subs.items() if conn is ws]:
+                del self.subs[sub_id]
+
+    def _on_block(self, block):
+        # Called on the mining thread
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self._publish(block)))
+
+    def _on_removed(self, logs):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self._publish({"logs": logs})))
+
+    async def _publish(self, block):
+        header = {"number": hex(block["number"]), "hash": block["hash"], "parentHash": block["parentHash"],
+                  "timestamp": hex(block["timestamp"]), "baseFeePerGas": hex(block["base_fee"])} if "hash" in block else None
+        for sub_id, (ws, kind, flt) in list(self.subs.items()):
+            if kind == "newHeads":
+                items = [header] if header else []
+            else:
+                matches = log_filter(flt)
+                items = [log for log in block["logs"] if matches(log)]
+            try:
+                for item in items:
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "method": "eth_subscription",
+                                              "params": {"subscription": sub_id, "result": item}}))
+            except ConnectionClosed:
+                pass
@@ -0,0 +1,198 @@
+# disbursement.py — bulk USDC transfers signed locally and sent as JSON-RPC batches
+from decimal import Decimal, InvalidOperation
+
+from eth_utils import is_address, keccak, to_checksum_address
+
+TRANSFER_SELECTOR = "a9059cbb"  # transfer(address,uint256)
+BATCH_SIZE = 100  # most public nodes cap JSON-RPC batches around 100 calls
+# Replies that do not say whether our transaction is in the pool: it may have been accepted already
+AMBIGUOUS = ("already known", "known transaction", "nonce too low")
+
+
+def transfer_data(to, value):
+    """ABI-encoded calldata for USDC transfer(to, value)."""
+    return "0x" + TRANSFER_SELECTOR + to[2:].lower().rjust(64, "0") + format(value, "064x")
+
+
+def parse_transfer(item):
+    """Validate one {"to", "amount"} entry; returns (checksum_to, value_in_units)."""
+    if not isinstance(item, dict):
+        raise ValueError(f"transfer must be an object with to and amount: {item!r}")
+    to, amount = item.get("to"), item.get("amount")
+    if not to or not is_address(to):
+        raise ValueError(f"invalid recipient: {to!r}")
+    try:
+        value = int(Decimal(str(amount)) * 10**6)
+    except (InvalidOperation, TypeError, ValueError, OverflowError):  # "NaN" and "Infinity" parse as Decimals
+        raise ValueError(f"invalid amount: {amount!r}")
+    if value <= 0:
+        raise ValueError(f"amount must be positive: {amount!r}")
+    return to_checksum_address(to), value
+
+
+def _sign(account, token, todo, results, nonces, chain_id, gas, fees):
+    """Sign `todo` [(index, to, value)] under fresh nonces; returns [(index, to, value, nonce, raw_hex, hash)]."""
+    signed = []
+    for i, to, value in todo:
+        nonce = nonces.allocate(account.address)
+        tx = {"chainId": chain_id, "nonce": nonce, "to": token, "value": 0,
+              "gas": gas(to) if callable(gas) else gas, "data": transfer_data(to, value), **fees}
+        try:
+            raw = bytes(account.sign_transaction(tx).raw_transaction)
+        except Exception as e:
+            nonces.release(account.address, nonce, e)
+            results[i].update(success=False, error=str(e))
+            continue
+        signed.append((i, to, value, nonce, "0x" + raw.hex(), "0x" + keccak(raw).hex()))
+    return signed
+
+
+def _batch(provider, calls):
+    """One reply per call, in order; a lost or refused batch becomes an error reply for every call."""
+    replies = []
+    for start in range(0, len(calls), BATCH_SIZE):
+        chunk = calls[start:start + BATCH_SIZE]
+        try:
+            responses = provider.make_batch_request(chunk)
+        except Exception as e:
+            responses = [{"error": {"message": str(e)}, "transport": True}] * len(chunk)
+        if isinstance(responses, dict):  # node refused the whole batch
+            responses = [responses] * len(chunk)
+        replies += responses
+    return replies
+
+
+def _send_round(provider, account, signed, results, nonces):
+    """Send every signed transaction; returns (todo, unresolved).
+
+    todo are the items the node definitely rejected, whose nonces went
+    back to the pool so they can be signed again. unresolved are those
+    whose fate is unknown (the reply was lost, or the node reports the
+    nonce as already used): they keep their nonce and their signed bytes,
+    and are only ever sent again byte for byte, so however many times a
+    transfer is retried at most one transaction can pay it.
+    """
+    rejected, unknown = [], []
+    for item, resp in zip(signed, _batch(provider, [("eth_sendRawTransaction", [raw]) for *_, raw, _ in signed])):
+        i, nonce, tx_hash = item[0], item[3], item[5]
+        error = resp.get("error", {}).get("message", "unknown error") if "result" not in resp else None
+        if error is None:
+            results[i].update(success=True, nonce=nonce, hash=tx_hash)
+            results[i].pop("error", None)
+        elif resp.get("transport") or any(s in error.lower() for s in AMBIGUOUS):
+            unknown.append((item, error))
+        else:
+            rejected.append((item, error))
+
+    unresolved = []
+    if unknown:
+        lookups = _batch(provider, [("eth_getTransactionByHash", [item[5]]) for item, _ in unknown])
+        for (item, error), found in zip(unknown, lookups):
+            i, nonce, tx_hash = item[0], item[3], item[5]
+            if found.get("result"):
+                results[i].update(success=True, nonce=nonce, hash=tx_hash)
+                results[i].pop("error", None)
+            elif "error" not in found and "nonce too low" in error.lower():
+                # Not our transaction: something else took the nonce, so ours can never be mined
+                rejected.append((item, error))
+            else:
+                results[i].update(success=False, error=error)
+                unresolved.append(item)
+
+    # Release highest nonces first so a failure at the tail just rolls the counter back
+    for (i, to, value, nonce, _, _), error in sorted(rejected, key=lambda pair: -pair[0][3]):
+        nonces.release(account.address, nonce, ValueError(error))
+        results[i].update(success=False, error=error)
+    return sorted((i, to, value) for (i, to, value, *_), _ in rejected), unresolved
+
+
+def disburse_batch(provider, account, token, transfers, nonces, chain_id, gas=100_000, fees=None, retries=2):
+    """Sign every transfer locally and submit them in JSON-RPC batches.
+
+    gas is a limit or a function of the recipient; fees holds either
+    gasPrice or the EIP-1559 maxFeePerGas/maxPriorityFeePerGas pair.
+
+    Returns one result per input item, in order. Items that fail validation
+    never get a nonce. Items the node rejects give their nonce back and are
+    re-signed in another round, which fills the gaps they left so the rest
+    of the batch is not stuck in the node's queue. An item whose send may
+    have reached the node (timeout, "already known") is looked up by its
+    locally computed hash and, if not found, re-sent as the same signed
+    transaction, never under a new nonce; one still unresolved after the
+    last round is reported with pending=True and its hash, and its nonce
+    stays taken.
+
+    The transfers go out as separate signed transactions rather than one
+    multicall: USDC's transfer() pays from msg.sender, which would be the
+    multicall contract, not the donor.
+    """
+    token = to_checksum_address(token)
+    fees = fees or {"gasPrice": 20 * 10**9}
+    results = []
+    todo = []
+    for i, item in enumerate(transfers):
+        results.append({"to": item.get("to"), "amount": item.get("amount")} if isinstance(item, dict) else {})
+        try:
+            to, value = parse_transfer(item)
+        except ValueError as e:
+            results[i].update(success=False, error=str(e))
+            continue
+        results[i]["to"] = to
+        todo.append((i, to, value))
+
+    unresolved = []
+    for _ in range(retries + 1):
+        signed = unresolved + _sign(account, token, todo, results, nonces, chain_id, gas, fees)
+        if not signed:
+            break
+        todo, unresolved = _send_round(provider, account, signed, results, nonces)
+    for i, to, value, nonce, _, tx_hash in unresolved:
+        results[i].update(pending=True, nonce=nonce, hash=tx_hash)
+    return results
+
+
+# === Demo: a few hundred grantees against devchain.LocalRPC with 50 ms round trips ===
+if __name__ == "__main__":
+    import time
+
+    from eth_account import Account
+
+    from devchain import LocalChain, LocalRPC
+    from nonce_manager import NonceManager
+
+    chain = LocalChain(reject_rate=0.02, seed=3)
+    rpc = LocalRPC(chain, latency=0.05)
+    account = Account.create()
+    nonces = NonceManager(lambda addr: int(rpc.make_request("eth_getTransactionCount", [addr, "pending"])["result"], 16))
+    usdc = "0x41E94Eb019C0762f9Bfcf9Fb2E58725BfB0e7582"
+    grantees = [{"to": Account.create().address, "amount": "12.5"} for _ in range(300)]
+    grantees[7] = {"to": "0xNOTANADDRESS", "amount": "1"}
+
+    t0 = time.perf_counter()
+    results = disburse_batch(rpc, account, usdc, grantees, nonces, rpc.chain_id)
+    elapsed = time.perf_counter() - t0
+    ok = sum(1 for r in results if r["success"])
+    print(f"{len(grantees)} transfers in {elapsed:.2f} s over {rpc.round_trips} RPC round trips: "
+          f"{ok} sent, {len(grantees) - ok} failed")
+    print(f"old /donate path: {len(grantees)} HTTP requests x 2 RPC round trips = "
+          f"~{len(grantees) * 2 * rpc.latency:.0f} s of network time alone")
+    print("failures:", [r for r in results if not r["success"]])
+    print("stuck behind a nonce gap:", chain.queued(account.address.lower()))
+
+    # Replies lost after the node accepted the batch must not turn into a second payment
+    flaky = LocalRPC(LocalChain(seed=4), latency=0.0, drop_rate=0.3, seed=5)
+    payer = Account.create()
+    nonces = NonceManager(lambda addr: flaky.chain.get_transaction_count(addr.lower(), "pending"))
+    grantees = [{"to": Account.create().address, "amount": "5"} for _ in range(50)]
+    results = disburse_batch(flaky, payer, usdc, grantees + ["oops", {"to": grantees[0]["to"], "amount": "Infinity"}],
+                             nonces, flaky.chain_id, retries=4)
+    flaky.chain.mine()
+    paid = {}
+    for block in flaky.chain.blocks:
+        for log in block["logs"]:
+            paid[log["topics"][2]] = paid.get(log["topics"][2], 0) + 1
+    ok = [r for r in results if r["success"]]
+    print(f"30% of replies lost: {len(ok)} sent, {sum(1 for r in results if r.get('pending'))} unresolved, "
+          f"{sum(paid.values())} transfers mined, {sum(n > 1 for n in paid.values())} recipients paid twice")
+    print("invalid items:", [r["error"] for r in results[-2:]])
+    assert all(n == 1 for n in paid.values()) and not any(r.get("error") for r in ok)
@@ -0,0 +1,307 @@
+# donation_indexer.py — follows USDC Transfer logs into a local SQLite donation index
+import sqlite3
+import threading
+import time
+
+from disbursement import BATCH_SIZE
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"  # Transfer(address,address,uint256)
+# Node errors meaning "ask for fewer blocks", as worded by geth, erigon, alchemy, infura, ...
+RANGE_ERRORS = ("more than", "too many", "limit exceeded", "block range", "too large", "response size", "timeout")
+KEEP_HASHES = 128  # committed block hashes kept for reorg detection
+
+
+def _is_range_error(error):
+    msg = str(error).lower()
+    return any(s in msg for s in RANGE_ERRORS)
+
+
+class DonationIndex:
+    """Decoded Transfer logs plus the indexer's checkpoint, in one SQLite file.
+
+    A range of logs, the hash of its last block and the new checkpoint are
+    committed in one transaction, so a crash never leaves the index half a
+    range ahead of its checkpoint. Logs pushed over a subscription can be
+    recorded ahead of the checkpoint; committing their range later replaces
+    whatever was recorded for it, so a pushed log that was reorged out
+    never outlives the indexer catching up.
+    """
+
+    def __init__(self, path="donations.db"):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe; only the last commit can be lost
+        with self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS donations (
+                    tx_hash TEXT NOT NULL, log_index INTEGER NOT NULL, block_number INTEGER NOT NULL,
+                    block_hash TEXT NOT NULL, sender TEXT NOT NULL, recipient TEXT NOT NULL, amount INTEGER NOT NULL,
+                    PRIMARY KEY (tx_hash, log_index));
+                CREATE INDEX IF NOT EXISTS donations_recipient ON donations (recipient, block_number, log_index);
+                CREATE INDEX IF NOT EXISTS donations_sender ON donations (sender, block_number, log_index);
+                CREATE INDEX IF NOT EXISTS donations_block ON donations (block_number);
+                CREATE TABLE IF NOT EXISTS indexed_blocks (number INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS checkpoint (token TEXT PRIMARY KEY, block INTEGER NOT NULL);
+            """)
+
+    def checkpoint(self, token):
+        with self.lock:
+            row = self.db.execute("SELECT block FROM checkpoint WHERE token = ?", (token,)).fetchone()
+        return row[0] if row else None
+
+    def block_hashes(self):
+        """{number: hash} of committed range ends, newest first."""
+        with self.lock:
+            return dict(self.db.execute("SELECT number, hash FROM indexed_blocks ORDER BY number DESC"))
+
+    @staticmethod
+    def _rows(logs):
+        return [(log["transactionHash"], int(log["logIndex"], 16), int(log["blockNumber"], 16), log["blockHash"],
+                 "0x" + log["topics"][1][-40:], "0x" + log["topics"][2][-40:], int(log["data"], 16))
+                for log in logs if len(log["topics"]) == 3]
+
+    def record(self, log):
+        """Store a pushed log now, ahead of the checkpoint (donation_subscriber's on_donation)."""
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO donations VALUES (?, ?, ?, ?, ?, ?, ?)", self._rows([log]))
+
+    def retract(self, log):
+        """Drop a pushed log the node reported as removed by a reorg."""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM donations WHERE tx_hash = ? AND log_index = ? AND block_hash = ?",
+                            (log["transactionHash"], int(log["logIndex"], 16), log["blockHash"]))
+
+    def commit(self, token, logs, block, block_hash, first_block=None):
+        """Logs of blocks first_block..block, which replace anything recorded for that range."""
+        rows = self._rows(logs)
+        with self.lock, self.db:
+            if first_block is not None:
+                self.db.execute("DELETE FROM donations WHERE block_number BETWEEN ? AND ?", (first_block, block))
+            self.db.executemany("INSERT OR REPLACE INTO donations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.execute("INSERT OR REPLACE INTO indexed_blocks VALUES (?, ?)", (block, block_hash))
+            self.db.execute("DELETE FROM indexed_blocks WHERE number NOT IN "
+                            "(SELECT number FROM indexed_blocks ORDER BY number DESC LIMIT ?)", (KEEP_HASHES,))
+            self.db.execute("INSERT OR REPLACE INTO checkpoint VALUES (?, ?)", (token, block))
+        return len(rows)
+
+    def rewind(self, token, block):
+        """Forget everything above `block` (a reorg orphaned it)."""
+        with self.lock, self.db:
+            removed = self.db.execute("DELETE FROM donations WHERE block_number > ?", (block,)).rowcount
+            self.db.execute("DELETE FROM indexed_blocks WHERE number > ?", (block,))
+            self.db.execute("INSERT OR REPLACE INTO checkpoint VALUES (?, ?)", (token, block))
+        return removed
+
+    def donations(self, recipient=None, sender=None, since_block=None, limit=100):
+        """Newest first; amounts in USDC (6 decimals)."""
+        where, args = [], []
+        for column, value in (("recipient", recipient), ("sender", sender)):
+            if value:
+                where.append(f"{column} = ?")
+                args.append(value.lower())
+        if since_block is not None:
+            where.append("block_number > ?")
+            args.append(since_block)
+        sql = ("SELECT tx_hash, log_index, block_number, sender, recipient, amount FROM donations"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY block_number DESC, log_index DESC LIMIT ?")
+        with self.lock:
+            rows = self.db.execute(sql, args + [limit]).fetchall()
+        return [{"hash": h, "log_index": i, "block": b, "from": s, "to": r, "amount": a / 10**6}
+                for h, i, b, s, r, a in rows]
+
+    def totals(self, recipient):
+        with self.lock:
+            count, units = self.db.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM donations "
+                                           "WHERE recipient = ?", (recipient.lower(),)).fetchone()
+        return {"recipient": recipient.lower(), "donations": count, "amount": units / 10**6}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class DonationIndexer:
+    """Follows one token's Transfer logs with eth_getLogs and feeds a DonationIndex.
+
+    The block range per request adapts: it doubles while responses stay
+    small and halves when the node refuses a range or a response runs past
+    target_logs. Each step first checks the checkpoint block's hash against
+    the chain; on a mismatch it rewinds to the newest committed block the
+    chain still agrees with and indexes forward again.
+    """
+
+    def __init__(self, provider, token, index, start_block="latest", confirmations=0,
+                 initial_range=500, max_range=50_000, target_logs=5_000, on_donations=None):
+        self.provider = provider
+        self.token = token.lower()
+        self.index = index
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.range = initial_range
+        self.max_range = max_range
+        self.target_logs = target_logs
+        self.on_donations = on_donations
+        self.head = None
+        self.stats = {"blocks": 0, "logs": 0, "requests": 0, "range_errors": 0, "reorgs": 0, "rewound_logs": 0}
+        self._stop = threading.Event()
+
+    def _batch(self, calls):
+        self.stats["requests"] += 1
+        responses = self.provider.make_batch_request(calls)
+        if isinstance(responses, dict):
+            raise ValueError(responses.get("error", {}).get("message", "batch refused"))
+        responses = sorted(responses, key=lambda r: r.get("id", 0))
+        for resp in responses:
+            if "error" in resp:
+                raise ValueError(resp["error"].get("message", resp["error"]))
+        return [resp["result"] for resp in responses]
+
+    def _find_fork(self, checkpoint):
+        """Newest committed block still on the canonical chain."""
+        stored = self.index.block_hashes()
+        numbers = list(stored)  # newest first; most forks are found in the first batch
+        for start in range(0, len(numbers), BATCH_SIZE):
+            chunk = numbers[start:start + BATCH_SIZE]
+            chain = self._batch([("eth_getBlockByNumber", [hex(n), False]) for n in chunk])
+            for number, block in zip(chunk, chain):
+                if block and block["hash"] == stored[number]:
+                    return number
+        # Deeper than every hash we kept: start over from the oldest one we knew
+        return (min(numbers) - 1) if numbers else checkpoint
+
+    def step(self):
+        """Index one range; returns the number of blocks covered (0 when caught up)."""
+        checkpoint = self.index.checkpoint(self.token)
+        calls = [("eth_blockNumber", [])]
+        if checkpoint is not None:
+            calls.append(("eth_getBlockByNumber", [hex(checkpoint), False]))
+        head_hex, *known = self._batch(calls)
+        self.head = int(head_hex, 16)
+        if checkpoint is None:
+            # "latest" means the newest block we would index at all: with confirmations, the safe head
+            checkpoint = (self.head - self.confirmations if self.start_block == "latest" else int(self.start_block)) - 1
+        stored = self.index.block_hashes().get(checkpoint)
+        if known and stored and (known[0] is None or known[0]["hash"] != stored):
+            fork = self._find_fork(checkpoint)
+            self.stats["reorgs"] += 1
+            self.stats["rewound_logs"] += self.index.rewind(self.token, fork)
+            checkpoint = fork
+
+        lo = checkpoint + 1
+        safe_head = self.head - self.confirmations
+        if lo > safe_head:
+            return 0
+        while True:
+            hi = min(lo + self.range - 1, safe_head)
+            flt = {"address": self.token, "topics": [TRANSFER_TOPIC], "fromBlock": hex(lo), "toBlock": hex(hi)}
+            try:
+                logs, block = self._batch([("eth_getLogs", [flt]), ("eth_getBlockByNumber", [hex(hi), False])])
+            except ValueError as e:
+                if not _is_range_error(e) or self.range == 1:
+                    raise
+                self.stats["range_errors"] += 1
+                self.range = max(1, self.range // 2)
+                continue
+            break
+
+        if block is None or any(int(log["blockNumber"], 16) == hi and log["blockHash"] != block["hash"] for log in logs):
+            return 0  # the tip moved between calls; the next step re-reads it
+        logs = [log for log in logs if not log.get("removed")]
+        self.index.commit(self.token, logs, hi, block["hash"], first_block=lo)
+        if len(logs) > self.target_logs:
+            self.range = max(1, self.range // 2)
+        elif len(logs) < self.target_logs // 4:
+            self.range = min(self.max_range, self.range * 2)
+        self.stats["blocks"] += hi - lo + 1
+        self.stats["logs"] += len(logs)
+        if logs and self.on_donations:
+            self.on_donations(logs)
+        return hi - lo + 1
+
+    def catch_up(self):
+        while self.step():
+            pass
+
+    def run(self, poll_interval=2.0):
+        while not self._stop.is_set():
+            try:
+                if self.step():
+                    continue
+            except Exception as e:
+                print(f"Donation indexer step failed: {e}")
+            self._stop.wait(poll_interval)
+
+    def start(self, poll_interval=2.0):
+        threading.Thread(target=self.run, args=(poll_interval,), daemon=True, name="donation-indexer").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        checkpoint = self.index.checkpoint(self.token)
+        return {"token": self.token, "checkpoint": checkpoint, "head": self.head,
+                "lag": (self.head - checkpoint) if self.head is not None and checkpoint is not None else None,
+                "range": self.range, **self.stats}
+
+
+# === Demo: 20k blocks with a congested stretch, a restart and a reorg, on devchain.LocalRPC ===
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+
+    from devchain import LocalChain, LocalRPC
+
+    usdc, other = "0x41e94eb019c0762f9bfcf9fb2e58725bfb0e7582", "0x" + "ee" * 20
+    ngos = ["0x" + f"{i:040x}" for i in range(1, 9)]
+    rng = random.Random(4)
+    chain = LocalChain()
+    rpc = LocalRPC(chain, latency=0.02)
+
+    def fill(blocks, per_block):
+        for _ in range(blocks):
+            for _ in range(rng.randint(0, per_block)):
+                chain.emit_transfer(usdc, "0x" + f"{rng.getrandbits(160):040x}", rng.choice(ngos), rng.randint(1, 10**8))
+            chain.emit_transfer(other, ngos[0], ngos[1], 1)  # another token's noise, filtered by address
+            chain.mine()
+
+    fill(9_000, 2)
+    fill(1_000, 80)  # a congested stretch: ~40k transfers in 1k blocks
+    fill(10_000, 2)
+    total = sum(1 for b in chain.blocks for log in b["logs"] if log["address"] == usdc)
+    path = os.path.join(tempfile.mkdtemp(), "donations.db")
+
+    indexer = DonationIndexer(rpc, usdc, DonationIndex(path), start_block=1)
+    t0 = time.perf_counter()
+    indexer.catch_up()
+    elapsed = time.perf_counter() - t0
+    print(f"indexed {indexer.stats['blocks']} blocks / {indexer.stats['logs']} transfers (chain has {total}) "
+          f"in {elapsed:.2f} s = {indexer.stats['blocks'] / elapsed:,.0f} blocks/s over {rpc.round_trips} round trips, "
+          f"{indexer.stats['range_errors']} range refusals")
+    print(f"polling block by block at {rpc.latency * 1e3:.0f} ms/round trip would take "
+          f"~{len(chain.blocks) * rpc.latency:.0f} s; the old LLM-turn tracker never caught up")
+
+    indexer.index.close()
+    restarted = DonationIndexer(rpc, usdc, DonationIndex(path), start_block=1)
+    fill(50, 3)
+    restarted.catch_up()
+    print(f"after restart: resumed from checkpoint, indexed {restarted.stats['blocks']} new blocks")
+
+    chain.reorg(6)
+    fill(2, 3)
+    restarted.catch_up()
+    on_chain = {(log["transactionHash"], log["blockHash"]) for b in chain.blocks for log in b["logs"] if log["address"] == usdc}
+    with restarted.index.lock:
+        indexed = set(restarted.index.db.execute("SELECT tx_hash, block_hash FROM donations"))
+    print(f"after a 6-block reorg: {restarted.stats['reorgs']} reorg handled, {restarted.stats['rewound_logs']} rows "
+          f"rewound, index matches chain: {indexed == on_chain}")
+    assert indexed == on_chain
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        restarted.index.donations(recipient=ngos[3], limit=20)
+    print(f"donations to one NGO: {(time.perf_counter() - t0) * 1e3:.0f} µs per lookup (was an LLM turn);",
+          restarted.index.totals(ngos[3]))
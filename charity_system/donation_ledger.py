@@ -0,0 +1,174 @@
+# donation_ledger.py — signed donations by idempotency key, so a retried /donate never pays twice
+import sqlite3
+import threading
+import time
+
+from eth_utils import keccak
+
+from disbursement import AMBIGUOUS
+
+
+class DonationLedger:
+    """The one signed transaction behind each idempotency key.
+
+    send() records the signed transaction before broadcasting it. A repeat
+    of the same key (a client retry after a timeout, a workflow stage run
+    again after a crash) re-sends those same bytes under the same nonce,
+    which the node either already has or mines once, and returns the same
+    hash. A new transaction is only signed when the first one can never be
+    mined: the node rejected it outright, or its nonce went to another
+    transaction. Repeats of one key wait for each other, so two concurrent
+    requests cannot both sign.
+    """
+
+    def __init__(self, path="donation_ledger.db"):
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS donations (key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                        "hash TEXT NOT NULL, raw TEXT NOT NULL, nonce INTEGER NOT NULL, created_at REAL NOT NULL)")
+        self.stats = {"sent": 0, "repeats": 0, "resigned": 0}
+
+    def _key_lock(self, key):
+        with self.lock:
+            lock = self.key_locks.get(key)
+            if lock is None:
+                lock = self.key_locks[key] = [threading.Lock(), 0]
+            lock[1] += 1
+            return lock
+
+    def _release_key(self, key, lock):
+        with self.lock:
+            lock[1] -= 1
+            if not lock[1]:
+                del self.key_locks[key]
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT fingerprint, hash, raw, nonce FROM donations WHERE key = ?", (key,)).fetchone()
+        return dict(zip(("fingerprint", "hash", "raw", "nonce"), row)) if row else None
+
+    def _put(self, key, fingerprint, tx_hash, raw, nonce):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO donations VALUES (?, ?, ?, ?, ?, ?)",
+                            (key, fingerprint, tx_hash, raw, nonce, time.time()))
+
+    def _forget(self, key):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM donations WHERE key = ?", (key,))
+
+    @staticmethod
+    def _broadcast(provider, raw, tx_hash):
+        """"sent" if the node has the transaction, "taken" if its nonce went to another one.
+
+        Raises ValueError when the node rejects it and ConnectionError when
+        the outcome is unknown (the transaction may still be mined).
+        """
+        resp = provider.make_request("eth_sendRawTransaction", [raw])
+        if "result" in resp:
+            return "sent"
+        error = resp.get("error", {}).get("message", "unknown error")
+        if not any(s in error.lower() for s in AMBIGUOUS):
+            raise ValueError(error)
+        found = provider.make_request("eth_getTransactionByHash", [tx_hash])
+        if found.get("result"):
+            return "sent"
+        if "error" not in found and "nonce too low" in error.lower():
+            return "taken"
+        raise ConnectionError(f"{error}; {tx_hash} not found yet")
+
+    def send(self, provider, key, fingerprint, address, nonces, sign):
+        """Hash of the transaction paying `key`, signed by sign(nonce) -> raw bytes only if none is pending.
+
+        fingerprint identifies the donation (recipient, amount); reusing a
+        key for a different donation is a ValueError.
+        """
+        lock = self._key_lock(key)
+        try:
+            with lock[0]:
+                prior = self.get(key)
+                if prior:
+                    if prior["fingerprint"] != fingerprint:
+                        raise ValueError("idempotency key already used for a different donation")
+                    try:
+                        state = self._broadcast(provider, prior["raw"], prior["hash"])
+                    except ValueError:
+                        state = "taken"  # rejected outright: it can never be mined
+                        nonces.release(address, prior["nonce"], None)
+                    if state == "sent":
+                        self.stats["repeats"] += 1
+                        return prior["hash"]
+                    self._forget(key)
+                    self.stats["resigned"] += 1
+                return self._sign_and_send(provider, key, fingerprint, address, nonces, sign)
+        finally:
+            self._release_key(key, lock)
+
+    def _sign_and_send(self, provider, key, fingerprint, address, nonces, sign):
+        nonce = nonces.allocate(address)
+        try:
+            raw = bytes(sign(nonce))
+        except Exception as e:
+            nonces.release(address, nonce, e)
+            raise
+        raw_hex, tx_hash = "0x" + raw.hex(), "0x" + keccak(raw).hex()
+        self._put(key, fingerprint, tx_hash, raw_hex, nonce)
+        try:
+            state = self._broadcast(provider, raw_hex, tx_hash)
+        except ConnectionError:
+            raise  # keep the nonce and the record: a retry re-sends these bytes
+        except Exception as e:
+            nonces.release(address, nonce, e)
+            self._forget(key)
+            raise
+        if state == "taken":
+            nonces.release(address, nonce, ValueError("nonce too low"))  # resyncs with the chain
+            self._forget(key)
+            raise ValueError("nonce too low")
+        self.stats["sent"] += 1
+        return tx_hash
+
+
+# === Demo: retried and concurrent requests for the same donation behind lost replies ===
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from eth_account import Account
+    from eth_utils import to_checksum_address
+
+    from devchain import LocalChain, LocalRPC
+    from disbursement import transfer_data
+    from nonce_manager import NonceManager
+
+    rpc = LocalRPC(LocalChain(seed=1), drop_rate=0.3, seed=2)
+    payer = Account.create()
+    nonces = NonceManager(lambda addr: rpc.chain.get_transaction_count(addr.lower(), "pending"))
+    ledger = DonationLedger(os.path.join(tempfile.mkdtemp(), "ledger.db"))
+    usdc = to_checksum_address("0x41E94Eb019C0762f9Bfcf9Fb2E58725BfB0e7582")
+    donations = [(f"donation-{i}", Account.create().address) for i in range(40)]
+
+    def sign(to):
+        return lambda nonce: payer.sign_transaction({"chainId": rpc.chain_id, "nonce": nonce, "to": usdc, "value": 0,
+                                                      "gas": 100_000, "gasPrice": 20 * 10**9,
+                                                      "data": transfer_data(to, 5 * 10**6)}).raw_transaction
+
+    def donate(key, to):
+        for attempt in range(10):  # the client retries until it gets an answer
+            try:
+                return ledger.send(rpc, key, f"{to}:5", payer.address, nonces, sign(to))
+            except (ConnectionError, ValueError):
+                continue
+
+    with ThreadPoolExecutor(8) as pool:  # every donation requested twice at once, like a retry racing a slow first try
+        hashes = list(pool.map(lambda d: donate(*d), donations + donations))
+    rpc.chain.mine()
+    mined = sum(len(b["logs"]) for b in rpc.chain.blocks)
+    print(f"{len(donations)} donations, each requested twice with 30% of replies lost: {mined} transfers mined, "
+          f"{sum(h is None for h in hashes)} unanswered, same hash for both requests: "
+          f"{hashes[:len(donations)] == hashes[len(donations):]}")
+    print("stats:", ledger.stats)
+    assert mined == len(donations)
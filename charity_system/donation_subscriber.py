@@ -0,0 +1,236 @@
+# donation_subscriber.py — push-based donation detection over eth_subscribe, with HTTP polling fallback
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import WebSocketException
+
+from donation_indexer import TRANSFER_TOPIC
+
+
+class DonationSubscriber:
+    """Drives a DonationIndexer from websocket subscriptions instead of a timer.
+
+    `logs` notifications for the token's Transfer events are handed to
+    on_donation as soon as the block carrying them arrives; every `newHeads`
+    notification runs the indexer, which commits the same logs and
+    catches anything the socket missed. When the socket drops, the indexer
+    is polled over HTTP every poll_interval while reconnects back off
+    exponentially up to max_backoff. After reconnecting, the indexer
+    resumes from its checkpoint, so nothing between the drop and the new
+    subscription is lost. Each log is delivered once, whichever path sees
+    it first. A pushed log the node later reports as removed (a reorg) is
+    handed to on_removed, and delivered again if it is re-included.
+    """
+
+    def __init__(self, ws_url, indexer, on_donation=None, on_removed=None, poll_interval=2.0, max_backoff=30.0,
+                 seen_size=10_000):
+        self.ws_url = ws_url
+        self.indexer = indexer
+        self.on_donation = on_donation
+        self.on_removed = on_removed
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.seen = OrderedDict()
+        self.seen_size = seen_size
+        self.lock = threading.Lock()
+        self.catch_up_lock = threading.Lock()
+        self.mode = "starting"
+        self.stats = {"pushed": 0, "caught_up": 0, "duplicates": 0, "heads": 0, "disconnects": 0, "removed": 0}
+        self._indexing = None
+        self._dirty = False
+        self._task = None
+        self._loop = None
+        indexer.on_donations = lambda logs: self._deliver(logs, "caught_up")
+
+    def _deliver(self, logs, source):
+        fresh = []
+        with self.lock:
+            for log in logs:
+                key = (log["transactionHash"], log["logIndex"], log["blockHash"])
+                if key in self.seen:
+                    self.stats["duplicates"] += 1
+                    continue
+                self.seen[key] = True
+                if len(self.seen) > self.seen_size:
+                    self.seen.popitem(last=False)
+                self.stats[source] += 1
+                fresh.append(log)
+        if self.on_donation:
+            for log in fresh:
+                self.on_donation(log)
+
+    def _retract(self, log):
+        with self.lock:
+            self.seen.pop((log["transactionHash"], log["logIndex"], log["blockHash"]), None)
+            self.stats["removed"] += 1
+        if self.on_removed:
+            self.on_removed(log)
+
+    def _catch_up(self):
+        # The head-driven task and the polling fallback overlap while the socket reconnects; one indexer run at a time
+        try:
+            with self.catch_up_lock:
+                self.indexer.catch_up()
+        except Exception as e:
+            print(f"Donation indexer catch-up failed: {e}")
+
+    def _kick(self):
+        """Run the indexer in a worker thread; coalesce heads that arrive while it runs."""
+        if self._indexing and not self._indexing.done():
+            self._dirty = True
+            return
+        self._indexing = asyncio.get_running_loop().create_task(self._index())
+
+    async def _index(self):
+        while True:
+            self._dirty = False
+            await asyncio.to_thread(self._catch_up)
+            if not self._dirty:
+                return
+
+    async def _subscribe(self, ws, req_id, *params):
+        await ws.send(json.dumps({"jsonrpc": "2.0", "id": req_id, "method": "eth_subscribe", "params": list(params)}))
+        while True:
+            resp = json.loads(await asyncio.wait_for(ws.recv(), 10))
+            if resp.get("id") == req_id:
+                if "error" in resp:
+                    raise ValueError(resp["error"].get("message", resp["error"]))
+                return resp["result"]
+
+    async def _follow_socket(self):
+        """Stream notifications until the socket drops; True if subscriptions were established."""
+        subscribed = False
+        try:
+            async with connect(self.ws_url, open_timeout=5, ping_interval=20, ping_timeout=20) as ws:
+                heads = await self._subscribe(ws, 1, "newHeads")
+                logs = await self._subscribe(ws, 2, "logs", {"address": self.indexer.token, "topics": [TRANSFER_TOPIC]})
+                subscribed = True
+                self.mode = "websocket"
+                self._kick()  # resume from the checkpoint: whatever happened while we were away
+                async for message in ws:
+                    params = json.loads(message).get("params") or {}
+                    if params.get("subscription") == logs:
+                        if params["result"].get("removed"):
+                            self._retract(params["result"])
+                        else:
+                            self._deliver([params["result"]], "pushed")
+                    elif params.get("subscription") == heads:
+                        self.stats["heads"] += 1
+                        self._kick()
+        except (OSError, ValueError, asyncio.TimeoutError, WebSocketException) as e:
+            print(f"Donation websocket dropped ({e}); polling over HTTP")
+        return subscribed
+
+    async def _poll_for(self, seconds):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while True:
+            await asyncio.to_thread(self._catch_up)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    async def run(self):
+        backoff = 1.0
+        while True:
+            if await self._follow_socket():
+                backoff = 1.0
+            self.stats["disconnects"] += 1
+            self.mode = "polling"
+            await self._poll_for(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def start(self):
+        ready = threading.Event()
+
+        def main():
+            self._loop = asyncio.new_event_loop()
+            self._task = self._loop.create_task(self.run())
+            ready.set()
+            try:
+                self._loop.run_until_complete(self._task)
+            except asyncio.CancelledError:
+                pass
+
+        threading.Thread(target=main, daemon=True, name="donation-subscriber").start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def status(self):
+        return {"mode": self.mode, **self.stats}
+
+
+# === Demo: 250 ms blocks on devchain, a websocket outage in the middle, then a reorg ===
+if __name__ == "__main__":
+    import os
+    import random
+    import statistics
+    import tempfile
+    import time
+
+    from devchain import LocalChain, LocalRPC, LocalWS
+    from donation_indexer import DonationIndex, DonationIndexer
+
+    usdc = "0x41e94eb019c0762f9bfcf9fb2e58725bfb0e7582"
+    chain = LocalChain()
+    rpc = LocalRPC(chain, latency=0.02)
+    ws = LocalWS(rpc)
+    url = ws.start()
+    rng = random.Random(5)
+    sent = {}         # tx hash -> time submitted
+    detected = {}     # tx hash -> (latency, mode)
+    delivered = []
+
+    def record(log):
+        index.record(log)  # queryable now, a block ahead of the indexer's confirmation
+        delivered.append(log["transactionHash"])
+        detected.setdefault(log["transactionHash"], (time.time() - sent[log["transactionHash"]], sub.mode))
+
+    chain.mine()
+    index = DonationIndex(os.path.join(tempfile.mkdtemp(), "donations.db"))
+    sub = DonationSubscriber(url, DonationIndexer(rpc, usdc, index, confirmations=1), on_donation=record,
+                             on_removed=index.retract, poll_interval=1.0).start()
+    time.sleep(0.5)
+
+    block_time = 0.25
+    stop = threading.Event()
+
+    def miner():
+        while not stop.is_set():
+            for _ in range(rng.randint(0, 3)):
+                tx = chain.emit_transfer(usdc, "0x" + f"{rng.getrandbits(160):040x}", "0x" + "ab" * 20, 10**6)
+                sent[tx] = time.time()
+            time.sleep(block_time * rng.random())
+            chain.mine()
+
+    threading.Thread(target=miner, daemon=True).start()
+    time.sleep(4)
+    ws.pause(3)
+    time.sleep(6)
+    stop.set()
+    time.sleep(1.5)
+    twice = len(delivered) - len(set(delivered))
+    chain.reorg(2)  # the pushed logs of the top two blocks come back removed, then re-included in the fork
+    time.sleep(0.5)
+    on_chain = {(log["transactionHash"], log["blockHash"]) for b in chain.blocks for log in b["logs"]}
+    with index.lock:
+        stored = set(index.db.execute("SELECT tx_hash, block_hash FROM donations"))
+    sub.stop()
+
+    print(f"{len(sent)} donations, {len(detected)} detected, {twice} delivered twice;",
+          sub.status())
+    for mode in ("websocket", "polling"):
+        lat = sorted(l for l, m in detected.values() if m == mode)
+        if lat:
+            print(f"  {mode:9s}: {len(lat):3d} donations, detection latency median {statistics.median(lat) * 1e3:.0f} ms, "
+                  f"max {lat[-1] * 1e3:.0f} ms (block time {block_time * 1e3:.0f} ms; old 60 s poll: ~30 s median)")
+    print(f"after a 2-block reorg: {sub.stats['removed']} pushed logs retracted, index matches chain: {stored == on_chain}")
+    assert set(detected) == set(sent) and not twice and stored == on_chain
@@ -0,0 +1,224 @@
+# fee_oracle.py — background EIP-1559 fee tracking and memoized USDC transfer gas
+import statistics
+import threading
+import time
+from collections import OrderedDict
+
+from balances import BALANCE_OF_SELECTOR, rpc_call
+from disbursement import BATCH_SIZE, transfer_data
+
+DEFAULT_GAS = 100_000
+TIERS = {"slow": 10, "standard": 50, "fast": 90}
+
+
+class FeeOracle:
+    """Keeps fee suggestions and transfer gas limits warm so a donation needs
+    no fee round trip of its own.
+
+    Fees come from eth_feeHistory reward percentiles over the last `blocks`
+    blocks, refreshed in the background; chains without it fall back to
+    eth_gasPrice. Gas limits are estimated once per recipient type
+    (contract or EOA, empty or funded balance, which changes the SSTORE
+    cost) and reused for gas_ttl seconds. Only estimates for a real sender
+    are cached: without one (/fees with no `from`) the recipient would be
+    priced as a transfer to itself, which skips the empty-slot cost, so
+    such a quote gets the type's cached limit or DEFAULT_GAS.
+
+    Recipient types are kept for the max_types most recently used
+    addresses. quote() serves the public /fees endpoint, so it looks up
+    at most lookup_rate new addresses per second (bursts of lookup_burst);
+    past that, an unknown recipient is quoted the default gas limit.
+    """
+
+    def __init__(self, provider, token, refresh=12, blocks=20, gas_ttl=600, gas_buffer=1.2, max_types=10_000,
+                 lookup_rate=5.0, lookup_burst=20):
+        self.provider = provider
+        self.token = token
+        self.refresh_interval = refresh
+        self.blocks = blocks
+        self.gas_ttl = gas_ttl
+        self.gas_buffer = gas_buffer
+        self.lock = threading.Lock()
+        self.current = None
+        self.types = OrderedDict()  # address -> (recipient type, classified_at), least recently used first
+        self.max_types = max_types
+        self.gas = {}  # recipient type -> (limit, estimated_at)
+        self.lookup_rate = lookup_rate
+        self.lookup_burst = lookup_burst
+        self.lookup_tokens = float(lookup_burst)
+        self.lookup_at = time.monotonic()
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True, name="fee-oracle").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Fee oracle refresh failed: {e}")
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def refresh(self):
+        try:
+            history = rpc_call(self.provider, "eth_feeHistory", [hex(self.blocks), "latest", list(TIERS.values())])
+            base_fee = int(history["baseFeePerGas"][-1], 16)  # the next block's base fee
+            rewards = history.get("reward") or [[hex(0)] * len(TIERS)]
+            tiers = {}
+            for col, name in enumerate(TIERS):
+                tip = int(statistics.median(int(r[col], 16) for r in rewards))
+                # 2x base fee absorbs six consecutive full blocks before the tx underprices
+                tiers[name] = {"maxPriorityFeePerGas": tip, "maxFeePerGas": 2 * base_fee + tip}
+            current = {"type": "eip1559", "baseFeePerGas": base_fee, "tiers": tiers}
+        except (ValueError, KeyError):
+            gas_price = int(rpc_call(self.provider, "eth_gasPrice", []), 16)
+            current = {"type": "legacy", "tiers": {name: {"gasPrice": gas_price * (100 + pct // 2) // 100}
+                                                   for name, pct in TIERS.items()}}
+        current["updated"] = int(time.time())
+        with self.lock:
+            self.current = current
+        return current
+
+    def fees(self, tier="standard"):
+        current = self.current or self.refresh()
+        return dict(current["tiers"][tier])
+
+    def _cached_type(self, address):
+        """The address's recipient type if classified within gas_ttl, else None."""
+        with self.lock:
+            cached = self.types.get(address.lower())
+            if not cached or time.time() - cached[1] >= self.gas_ttl:
+                return None
+            self.types.move_to_end(address.lower())
+            return cached[0]
+
+    def _remember(self, address, kind, now):
+        with self.lock:
+            self.types[address.lower()] = (kind, now)
+            self.types.move_to_end(address.lower())
+            while len(self.types) > self.max_types:
+                self.types.popitem(last=False)
+
+    def _allow_lookup(self):
+        """Token bucket for lookups of addresses nobody has donated to yet."""
+        with self.lock:
+            now = time.monotonic()
+            self.lookup_tokens = min(self.lookup_burst, self.lookup_tokens + (now - self.lookup_at) * self.lookup_rate)
+            self.lookup_at = now
+            if self.lookup_tokens < 1:
+                return False
+            self.lookup_tokens -= 1
+            return True
+
+    def classify(self, addresses):
+        """Look up the recipient type of every unknown address, two calls each, in JSON-RPC batches."""
+        now = time.time()
+        todo = [a for a in dict.fromkeys(addresses) if self._cached_type(a) is None]
+        for start in range(0, len(todo), BATCH_SIZE // 2):
+            chunk = todo[start:start + BATCH_SIZE // 2]
+            calls = []
+            for a in chunk:
+                data = "0x" + BALANCE_OF_SELECTOR + a[2:].lower().rjust(64, "0")
+                calls += [("eth_getCode", [a, "latest"]), ("eth_call", [{"to": self.token, "data": data}, "latest"])]
+            responses = self.provider.make_batch_request(calls)
+            if isinstance(responses, dict):
+                raise ValueError(responses.get("error", {}).get("message", "batch refused"))
+            responses = sorted(responses, key=lambda r: r["id"]) if all("id" in r for r in responses) else responses
+            for a, code, balance in zip(chunk, responses[::2], responses[1::2]):
+                if "result" not in code or "result" not in balance:
+                    continue
+                kind = "contract" if code["result"] not in ("0x", "0x0", "") else "eoa"
+                funded = "funded" if int(balance["result"] or "0x0", 16) else "empty"
+                self._remember(a, f"{kind}:{funded}", now)
+
+    def recipient_type(self, to):
+        """contract/eoa and empty/funded, cached for gas_ttl seconds per address."""
+        kind = self._cached_type(to)
+        if kind is None:
+            self.classify([to])
+            kind = self._cached_type(to)
+            if kind is None:
+                raise ValueError(f"could not classify {to}")
+        return kind
+
+    def gas_limit(self, sender, to):
+        """Buffered eth_estimateGas for transfer(to, ...), shared by recipient type; sender may be None."""
+        try:
+            kind = self.recipient_type(to)
+        except Exception:
+            return DEFAULT_GAS
+        cached = self.gas.get(kind)
+        if cached and time.time() - cached[1] < self.gas_ttl:
+            return cached[0]
+        if not sender or sender.lower() == to.lower():
+            return cached[0] if cached else DEFAULT_GAS
+        try:
+            estimate = int(rpc_call(self.provider, "eth_estimateGas",
+                                [{"from": sender, "to": self.token, "data": transfer_data(to, 1)}]), 16)
+        except Exception:
+            return cached[0] if cached else DEFAULT_GAS
+        limit = int(estimate * self.gas_buffer)
+        self.gas[kind] = (limit, time.time())
+        return limit
+
+    def quote(self, to=None, sender=None):
+        """What /fees serves: every fee tier, plus the gas limit when a recipient is given."""
+        quote = dict(self.current or self.refresh())
+        if to:
+            if self._cached_type(to) is not None or self._allow_lookup():
+                quote["gas"] = self.gas_limit(sender, to)
+            else:
+                quote["gas"] = DEFAULT_GAS
+            quote["recipientType"] = self._cached_type(to) or "unknown"
+        return quote
+
+    def tx_params(self, sender, to, tier="standard"):
+        """gas + fee fields ready to merge into a transaction dict."""
+        return {"gas": self.gas_limit(sender, to), **self.fees(tier)}
+
+
+# === Demo: congestion building on devchain.LocalRPC with 50 ms round trips ===
+if __name__ == "__main__":
+    from devchain import LocalChain, LocalRPC
+
+    chain = LocalChain()
+    rpc = LocalRPC(chain, latency=0.05)
+    usdc = "0x41E94Eb019C0762f9Bfcf9Fb2E58725BfB0e7582"
+    donor = "0x" + "d0" * 20
+    recipients = ["0x" + f"{i:040x}" for i in range(1, 201)]
+    for r in recipients[::2]:
+        chain.balances[r] = 10**6
+    for r in recipients[::10]:
+        chain.code[r] = "0x6080"
+
+    oracle = FeeOracle(rpc, usdc)
+    for load in (20, 100, 180, 200, 200):
+        for i in range(load):
+            chain.send_transaction(f"0x{i:040x}", chain.get_transaction_count(f"0x{i:040x}"))
+        chain.mine()
+        oracle.refresh()
+        print(f"block {len(chain.blocks)} with {load:3d} txs: base fee {chain.base_fee / 1e9:.3f} gwei, "
+              f"standard maxFee {oracle.fees()['maxFeePerGas'] / 1e9:.3f} gwei (old code: fixed 20 gwei)")
+
+    start = rpc.round_trips
+    t0 = time.perf_counter()
+    oracle.classify(recipients)  # what a batch disbursement does up front
+    limits = [oracle.tx_params(donor, r)["gas"] for r in recipients]
+    elapsed = time.perf_counter() - t0
+    print(f"{len(recipients)} donations priced in {elapsed:.2f} s over {rpc.round_trips - start} RPC round trips "
+          f"({len(oracle.gas)} gas estimates); old code: one estimateGas per click")
+    print("limits by recipient type:", {k: v[0] for k, v in oracle.gas.items()}, "vs. fixed 100000")
+    start = rpc.round_trips
+    [oracle.tx_params(donor, r) for r in recipients]
+    print(f"repeat donations to the same recipients: {rpc.round_trips - start} RPC round trips")
+    start = rpc.round_trips
+    for i in range(1000):  # someone walking /fees?to= through fresh addresses
+        oracle.quote("0x" + f"{10**6 + i:040x}")
+    print(f"1000 quotes for unseen addresses: {rpc.round_trips - start} RPC round trips, "
+          f"{len(oracle.types)} recipient types held (max {oracle.max_types})")
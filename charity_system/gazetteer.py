@@ -0,0 +1,144 @@
+# gazetteer.py — one-pass country/alias/demonym/city matcher for chat intent
+import json
+import os
+from collections import deque, namedtuple
+
+Match = namedtuple("Match", "start end key surface")
+
+
+class Gazetteer:
+    """Aho-Corasick automaton over place names.
+
+    Built once from (surface form, canonical key) pairs. find_all() walks the
+    message a single time, so the cost per message depends on the message
+    length only, not on how many names the gazetteer holds.
+    """
+
+    def __init__(self, entries):
+        goto, out = [{}], [[]]
+        for surface, key in entries:
+            surface = surface.casefold().strip()
+            if not surface:
+                continue
+            state = 0
+            for ch in surface:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((len(surface), key, surface))
+
+        # Breadth-first failure links; each state inherits its suffix matches
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch) != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+        self.size = sum(1 for o in out for _ in o)
+
+    @classmethod
+    def from_file(cls, path):
+        """Load {"Canonical Key": ["alias", "demonym", "city", ...]} from JSON."""
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+        return cls((surface, key) for key, aliases in table.items() for surface in [key, *aliases])
+
+    def find_all(self, text):
+        """All non-overlapping whole-word mentions, leftmost-longest first."""
+        text = text.casefold()
+        goto, fail, out = self._goto, self._fail, self._out
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                if end < len(text) and text[end].isalnum():
+                    continue
+                for length, key, surface in out[state]:
+                    start = end - length
+                    if start == 0 or not text[start - 1].isalnum():
+                        found.append(Match(start, end, key, surface))
+
+        found.sort(key=lambda m: (m.start, m.start - m.end))
+        matches, last_end = [], 0
+        for m in found:
+            if m.start >= last_end:
+                matches.append(m)
+                last_end = m.end
+        return matches
+
+    def keys(self, text):
+        """Canonical keys mentioned in text, in order of first mention."""
+        return list(dict.fromkeys(m.key for m in self.find_all(text)))
+
+    def first(self, text, default=None):
+        keys = self.keys(text)
+        return keys[0] if keys else default
+
+
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.json")
+
+
+# === Micro-benchmark: messages per second vs gazetteer size ===
+if __name__ == "__main__":
+    import random
+    import string
+    import time
+
+    messages = [
+        "Find NGOs in Pakistan",
+        "I want to help flood victims in Karachi and Lahore",
+        "Any verified charities for Afghan refugees?",
+        "show me ngos in the usa please",
+        "donate to education projects in rural india or bangladesh",
+        "what about Rio de Janeiro, São Paulo and the Amazonas region",
+        "hello, how does the USDC transfer work?",
+        "Which foundations help Syrian and Yemeni children in Gaza?",
+    ] * 2500
+
+    base = Gazetteer.from_file(GAZETTEER_FILE)
+    for m in messages[:8]:
+        print(f"  {m!r:70} -> {base.keys(m)}")
+
+    rng = random.Random(7)
+    with open(GAZETTEER_FILE, encoding="utf-8") as f:
+        table = json.load(f)
+    pairs = [(s, k) for k, v in table.items() for s in [k, *v]]
+
+    for extra in (0, 5_000, 50_000):
+        synthetic = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 14))) for _ in range(extra)]
+        t0 = time.perf_counter()
+        g = Gazetteer(pairs + [(s, "Synthetic") for s in synthetic])
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for m in messages:
+            g.find_all(m)
+        elapsed = time.perf_counter() - t0
+        print(f"{g.size:6d} entries: build {build * 1e3:7.1f} ms   {len(messages) / elapsed:9.0f} msgs/s"
+              f"   {elapsed / len(messages) * 1e6:5.1f} µs/msg")
+
+    # The loop it replaces, for reference
+    t0 = time.perf_counter()
+    for m in messages:
+        msg = m.lower()
+        for c in ["afghanistan", "india", "usa", "brazil"]:
+            if c in msg:
+                break
+    elapsed = time.perf_counter() - t0
+    print(f"     4 entries (old `in` loop): {len(messages) / elapsed:9.0f} msgs/s")
@@ -0,0 +1,217 @@
+# health.py — concurrent health checks with latency histograms, served from a background snapshot
+import bisect
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from agent_store import AgentStore
+
+# Latency bucket upper bounds in ms (Prometheus-style, last bucket is +Inf)
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+ELEVENLABS_API = "https://api.elevenlabs.io/v1"
+AIML_API = "https://api.aimlapi.com"
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None if empty or past the last bound)."""
+        if not self.total:
+            return None
+        rank, seen = q * self.total, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        labels = [f"le_{b}" for b in self.bounds] + ["le_inf"]
+        return {"count": self.total, "mean_ms": round(self.sum_ms / self.total, 1) if self.total else None,
+                "p50_ms": self.quantile(0.5), "p95_ms": self.quantile(0.95), "buckets": dict(zip(labels, self.counts))}
+
+
+class Check:
+    """fn() returns a short detail string or raises; timeout is in seconds."""
+
+    def __init__(self, name, fn, timeout=5.0, critical=True, group=None):
+        self.name = name
+        self.fn = fn
+        self.timeout = timeout
+        self.critical = critical
+        self.group = group
+        self.histogram = Histogram()
+        self.running = None  # future of a run that outlived its timeout
+        self.last = {"ok": None, "detail": "not checked yet"}
+
+
+class HealthMonitor:
+    """Runs every check concurrently in the background and keeps the result as ready-to-send bytes.
+
+    Each round starts all checks at once and waits for each no longer than
+    its own timeout; a check still running from a previous round is
+    reported as timed out instead of being started again, so a hung
+    dependency never piles up threads. /health just returns the last
+    snapshot: 200 while every critical check passes, 503 otherwise.
+    """
+
+    def __init__(self, checks, interval=10.0):
+        self.checks = list(checks)
+        self.interval = interval
+        self.executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.checks)), thread_name_prefix="health")
+        self.lock = threading.Lock()
+        self.status_code = 503
+        self.body = self.verbose_body = json.dumps({"status": "starting"}).encode()
+        self._stop = threading.Event()
+
+    def _timed(self, check):
+        t0 = time.perf_counter()
+        detail = check.fn()
+        return detail, (time.perf_counter() - t0) * 1e3
+
+    def run_once(self):
+        t0 = time.perf_counter()
+        started = {}
+        for check in self.checks:
+            if check.running is not None and not check.running.done():
+                continue
+            check.running = None
+            started[check.name] = (check, self.executor.submit(self._timed, check), time.perf_counter())
+
+        for check in self.checks:
+            if check.name not in started:
+                check.last = {"ok": False, "error": f"still running after {check.timeout}s", "latency_ms": None}
+                continue
+            _, future, submitted = started[check.name]
+            try:
+                detail, ms = future.result(timeout=max(0.0, submitted + check.timeout - time.perf_counter()))
+                check.histogram.record(ms)
+                check.last = {"ok": True, "latency_ms": round(ms, 1), "detail": detail}
+            except TimeoutError:
+                check.running = future
+                check.histogram.record(check.timeout * 1e3)
+                check.last = {"ok": False, "error": f"timed out after {check.timeout}s", "latency_ms": None}
+            except Exception as e:
+                check.last = {"ok": False, "error": str(e)[:200], "latency_ms": None}
+
+        critical_down = [c.name for c in self.checks if c.critical and not c.last["ok"]]
+        degraded = [c.name for c in self.checks if not c.critical and not c.last["ok"]]
+        status = "down" if critical_down else "degraded" if degraded else "ok"
+        summary = {"status": status, "checked_at": int(time.time()),
+                   "duration_ms": round((time.perf_counter() - t0) * 1e3, 1), "failing": critical_down + degraded}
+        checks = {c.name: dict(c.last, group=c.group, critical=c.critical) for c in self.checks}
+        verbose = {c.name: dict(checks[c.name], histogram=c.histogram.snapshot()) for c in self.checks}
+        with self.lock:
+            self.status_code = 503 if critical_down else 200
+            self.body = json.dumps({**summary, "checks": checks}).encode()
+            self.verbose_body = json.dumps({**summary, "checks": verbose}).encode()
+        return summary
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Health round failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True, name="health").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, verbose=False):
+        """(status_code, json_body) of the latest snapshot."""
+        with self.lock:
+            return self.status_code, self.verbose_body if verbose else self.body
+
+
+# === Standard checks ===
+def rpc_check(name, provider, timeout=4.0):
+    def fn():
+        resp = provider.make_request("eth_blockNumber", [])
+        if "result" not in resp:
+            raise ValueError(resp.get("error", {}).get("message", "no result"))
+        return f"block {int(resp['result'], 16)}"
+    return Check(f"rpc:{name}", fn, timeout, group="rpc")
+
+
+def http_check(name, session, url, headers=None, timeout=5.0, critical=True, group=None, detail=None):
+    def fn():
+        resp = session.get(url, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        return detail(resp) if detail else f"HTTP {resp.status_code}"
+    return Check(name, fn, timeout, critical=critical, group=group)
+
+
+def standard_checks(rpc_providers=(), agent_directory=None, elevenlabs_key=None, aiml_key=None,
+                    aiml_base=None, timeout=5.0):
+    """RPC endpoints, every agent in agent_directory.json and the AI/ML API.
+
+    Agents are only checked with an ElevenLabs key and the AI/ML API only
+    with its key; agents and AI/ML are non-critical so a flaky third party
+    degrades /health instead of taking the server out of rotation.
+    """
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+    checks = [rpc_check(name, provider, timeout) for name, provider in rpc_providers]
+    if elevenlabs_key and agent_directory and os.path.exists(agent_directory):
+        for agent_name, agent_id in AgentStore(agent_directory).items():
+            checks.append(http_check(f"agent:{agent_name}", session, f"{ELEVENLABS_API}/convai/agents/{agent_id}",
+                                     {"xi-api-key": elevenlabs_key}, timeout, critical=False, group="agents",
+                                     detail=lambda r: r.json().get("name", "ok")))
+    if aiml_key:
+        checks.append(http_check("aiml", session, f"{(aiml_base or AIML_API).rstrip('/')}/v1/models",
+                                 {"Authorization": f"Bearer {aiml_key}"}, timeout, critical=False, group="aiml"))
+    return checks
+
+
+# === Demo: nine slow agents, a dead RPC and a hung dependency, polled every "second" by a load balancer ===
+if __name__ == "__main__":
+    import random
+
+    def fake(delay, fail=False):
+        def fn():
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            if fail:
+                raise ConnectionError("connection refused")
+            return "ok"
+        return fn
+
+    checks = [Check(f"agent:{i}", fake(0.4), 2.0, critical=False, group="agents") for i in range(9)]
+    checks += [Check("rpc:arc", fake(0.05), 2.0, group="rpc"), Check("rpc:backup", fake(0.1, fail=True), 2.0, critical=False),
+               Check("aiml", fake(6), 1.0, critical=False, group="aiml")]
+    monitor = HealthMonitor(checks, interval=0.5).start()
+
+    time.sleep(0.1)
+    t0 = time.perf_counter()
+    for _ in range(100_000):
+        monitor.get()
+    per_hit = (time.perf_counter() - t0) / 100_000
+    time.sleep(3)
+    code, body = monitor.get()
+    snap = json.loads(body)
+    print(f"/health served from the snapshot in {per_hit * 1e6:.2f} µs per hit "
+          f"(old serial loop: ~{sum(0.4 for _ in range(9)):.1f} s of remote calls per hit)")
+    print(f"HTTP {code}, status {snap['status']}, round took {snap['duration_ms']} ms "
+          f"(checks run concurrently; the hung one is capped at its 1 s timeout), failing: {snap['failing']}")
+    print("agent:0 histogram:", json.loads(monitor.get(verbose=True)[1])["checks"]["agent:0"]["histogram"])
+    print("hung check threads:", sum(1 for c in checks if c.running is not None), "(not restarted while still running)")
+    monitor.stop()
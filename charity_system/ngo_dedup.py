@@ -0,0 +1,259 @@
+# ngo_dedup.py — resolves researched NGOs to known entities (EIN, website, then fuzzy name)
+import re
+import threading
+import unicodedata
+from array import array
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Words that do not tell two charities apart: articles and legal forms
+STOPWORDS = frozenset("""
+    the a an of and for e v ev inc incorporated ltd limited llc plc cic co corp gmbh ggmbh ag asbl vzw aisbl
+    ong ngo npo org registered charity
+""".split())
+# Hosts many unrelated NGOs share, so a match on them means nothing
+SHARED_HOSTS = frozenset("""
+    facebook.com instagram.com x.com twitter.com linkedin.com youtube.com linktr.ee wixsite.com
+    blogspot.com wordpress.com medium.com google.com sites.google.com gofundme.com justgiving.com
+""".split())
+EMPTY = array("i")
+DIRECT = 16  # candidates few enough to compare trigram sets directly instead of through the postings
+SECOND_LEVEL = frozenset("co com org net ac gov edu or ne".split())  # bbc.co.uk, msf.org.uk keep three labels
+
+
+def normalize_name(name):
+    """'The Edhi Foundation, Inc.' -> 'edhi foundation'"""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode().casefold()
+    words = re.findall(r"[a-z0-9]+", text.replace("&", " and "))
+    return " ".join(w for w in words if w not in STOPWORDS) or " ".join(words)
+
+
+def normalize_ein(ein):
+    """Registration numbers compared by their letters and digits only: '12-3456789' -> '123456789'."""
+    value = re.sub(r"[^0-9A-Za-z]", "", str(ein or "")).upper()
+    return value if len(value) >= 5 and value not in {"NONE", "NULL", "UNKNOWN", "NOTAVAILABLE"} else None
+
+
+def normalize_site(url):
+    """'https://www.Donate.MSF.org/uk?x=1' -> 'msf.org'; None for hosts shared by unrelated NGOs."""
+    url = str(url or "").strip()
+    if not url:
+        return None
+    host = (urlsplit(url if "//" in url else f"//{url}").hostname or "").removeprefix("www.")
+    labels = host.split(".")
+    if len(labels) < 2:
+        return None
+    keep = 3 if len(labels) >= 3 and labels[-2] in SECOND_LEVEL and len(labels[-1]) == 2 else 2
+    site = ".".join(labels[-keep:])
+    return None if site in SHARED_HOSTS or host in SHARED_HOSTS else site
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NGOIndex:
+    """Known NGOs as entities, resolved by EIN, then website, then fuzzy name.
+
+    Fuzzy names are compared by trigram Jaccard similarity, found through
+    an inverted index from trigram to alias. A name with similarity >=
+    threshold shares at least m = ceil(threshold * n) of the query's n
+    trigrams, so any n - m + k of them include k it shares: candidates are
+    the aliases counted k times across the postings of the query's
+    n - m + k rarest trigrams. Common trigrams (" fo", "ion") are never
+    read, the count runs in C (Counter over the posting lists) and only a
+    few aliases get an exact similarity check. A name match also needs the
+    countries to agree when both are known (national chapters of one
+    charity are separate entities); an EIN match always wins and
+    conflicting EINs never match.
+    """
+
+    def __init__(self, records=(), threshold=0.6, shared=3):
+        self.threshold = threshold
+        self.shared = shared
+        self.lock = threading.Lock()
+        self.entities = []
+        self.by_ein, self.by_site = {}, {}
+        self.alias_ids = {}  # normalized name -> alias id
+        self.aliases = []  # alias id -> (trigram set, [entity ids])
+        self.postings = {}  # trigram -> alias ids, as int32 arrays numpy reads in place
+        self.sizes = array("i")  # alias id -> number of trigrams
+        self.stats = {"resolved": 0, "matched": 0, "created": 0, "similarity_checks": 0}
+        for record in records:
+            self.add(record)
+
+    def _country(self, entity_or_record):
+        return normalize_name(entity_or_record.get("country") or "") or None
+
+    def _compatible(self, entity, record, country):
+        ein = normalize_ein(record.get("ein"))
+        known = normalize_ein(entity.get("ein"))
+        if ein and known and ein != known:
+            return False
+        other = self._country(entity)
+        return not (country and other and country != other)
+
+    def _similar_names(self, grams):
+        """[(alias id, similarity)] of every alias at or above threshold, most similar first."""
+        n = len(grams)
+        need = max(1, -(-round(self.threshold * n * 1e6) // 10**6))  # ceil, immune to float error
+        k = min(self.shared, need)
+        postings = sorted((self.postings.get(g, EMPTY) for g in grams), key=len)
+        prefix = [np.frombuffer(ids, dtype=np.int32) for ids in postings[:n - need + k] if ids]
+        if not prefix:
+            return []
+        found, common = np.unique(np.concatenate(prefix), return_counts=True)
+        sizes = np.frombuffer(self.sizes, dtype=np.int32)[found]
+        keep = (common >= k) & (sizes >= self.threshold * n) & (sizes <= n / self.threshold)  # similarity bounds size
+        found, sizes, common = found[keep], sizes[keep], common[keep]
+        # The rest of the query's trigrams, looked up in their sorted posting lists: after each one, a
+        # candidate needs one more shared trigram, so the candidates thin out as the postings get longer
+        for done, ids in enumerate(postings[n - need + k:], start=k + 1):
+            if len(found) <= DIRECT:
+                common = np.array([len(grams & self.aliases[a][0]) for a in found.tolist()], dtype=np.int64)
+                break
+            ids = np.frombuffer(ids, dtype=np.int32)
+            at = np.minimum(np.searchsorted(ids, found), len(ids) - 1)
+            common = common + (ids[at] == found)
+            keep = common >= done
+            found, sizes, common = found[keep], sizes[keep], common[keep]
+        scores = common / (n + sizes - common)
+        order = np.argsort(-scores, kind="stable")
+        order = order[scores[order] >= self.threshold]
+        return list(zip(found[order].tolist(), scores[order].tolist()))
+
+    def resolve(self, record):
+        """(entity id, score, matched on) for the known entity this record describes, or None."""
+        with self.lock:
+            return self._resolve(record)
+
+    def _resolve(self, record):
+        self.stats["resolved"] += 1
+        country = self._country(record)
+        ein = normalize_ein(record.get("ein"))
+        if ein and ein in self.by_ein:
+            return self.by_ein[ein], 1.0, "ein"
+        site = normalize_site(record.get("website"))
+        for entity_id in self.by_site.get(site, ()) if site else ():
+            if self._compatible(self.entities[entity_id], record, None):
+                return entity_id, 1.0, "website"
+        name = normalize_name(record.get("name", ""))
+        if name in self.alias_ids:
+            for entity_id in self.aliases[self.alias_ids[name]][1]:
+                if self._compatible(self.entities[entity_id], record, country):
+                    return entity_id, 1.0, "name"
+        for alias_id, score in self._similar_names(trigrams(name)):
+            self.stats["similarity_checks"] += 1
+            for entity_id in self.aliases[alias_id][1]:
+                if self._compatible(self.entities[entity_id], record, country):
+                    return entity_id, score, "fuzzy name"
+        return None
+
+    def _index(self, entity_id, entity, record):
+        ein = normalize_ein(record.get("ein"))
+        if ein:
+            self.by_ein.setdefault(ein, entity_id)
+        site = normalize_site(record.get("website"))
+        if site and entity_id not in self.by_site.setdefault(site, []):
+            self.by_site[site].append(entity_id)
+        name = normalize_name(record.get("name", ""))
+        if not name:
+            return
+        if name not in self.alias_ids:
+            self.alias_ids[name] = len(self.aliases)
+            self.aliases.append((frozenset(trigrams(name)), []))
+            self.sizes.append(len(self.aliases[-1][0]))
+            for gram in self.aliases[-1][0]:
+                self.postings.setdefault(gram, array("i")).append(self.alias_ids[name])
+        entity_ids = self.aliases[self.alias_ids[name]][1]
+        if entity_id not in entity_ids:
+            entity_ids.append(entity_id)
+            if record.get("name") and record["name"] != entity.get("name"):
+                entity["aliases"].append(record["name"])
+
+    def add(self, record, defaults=None):
+        """(entity, created): the known entity, with any missing fields filled in from record, or a new
+        one made from record and defaults. Fields in defaults are the caller's to set: record never
+        overrides them, on a new entity or a known one."""
+        defaults = defaults or {}
+        fields = {key: value for key, value in record.items() if key not in defaults}
+        with self.lock:
+            match = self._resolve(record)
+            if match:
+                entity_id = match[0]
+                entity = self.entities[entity_id]
+                for key, value in fields.items():
+                    if value not in (None, "") and entity.get(key) in (None, ""):
+                        entity[key] = value
+                self.stats["matched"] += 1
+            else:
+                entity_id = len(self.entities)
+                entity = {**fields, **defaults, "aliases": []}
+                self.entities.append(entity)
+                self.stats["created"] += 1
+            self._index(entity_id, entity, record)
+            return entity, match is None
+
+    def __len__(self):
+        return len(self.entities)
+
+
+# === Demo: a registry of synthetic charities queried with the spellings an LLM returns ===
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = random.Random(7)
+    onsets = "b c d f g h j k l m n p r s t v w z br ch cl dr fl gr kr pl sh st th tr".split()
+    codas = [""] * 6 + "n r s l m t nd rk st ng".split()
+    words = ["".join(rng.choice(onsets) + rng.choice("aeiouy") + rng.choice(codas) for _ in range(rng.randint(2, 3)))
+             for _ in range(20000)]
+    kinds = ["Foundation", "Trust", "Relief", "Aid", "Children's Fund", "Initiative", "Society", "Alliance"]
+    countries = ["Germany", "France", "United Kingdom", "Spain", "Italy", "Poland", "Netherlands", "Sweden"]
+    records = []
+    for i in range(n):
+        name = f"{' '.join(rng.sample(words, rng.randint(1, 2))).title()} {rng.choice(kinds)}"
+        records.append({"name": name, "country": rng.choice(countries),
+                        "website": f"https://www.{name.split()[0].lower()}{i}.org",
+                        "ein": f"{rng.randrange(10**8, 10**9)}" if i % 3 == 0 else None})
+    t0 = time.perf_counter()
+    index = NGOIndex(records)
+    print(f"{len(index)} entities from {n} records indexed in {time.perf_counter() - t0:.1f} s "
+          f"({len(index.postings)} trigrams)")
+
+    def variant(record):
+        name = record["name"]
+        change = rng.randrange(4)
+        if change == 0:
+            name = f"The {name}"
+        elif change == 1:
+            name = f"{name} e.V."
+        elif change == 2:
+            i = rng.randrange(1, len(name) - 1)
+            name = name[:i] + name[i + 1:]  # a dropped letter
+        else:
+            name = name.replace(" ", "  ").upper()
+        return {"name": name, "country": record["country"]}
+
+    sample = rng.sample(range(n), 5000)
+    queries = [variant(records[i]) for i in sample]
+    t0 = time.perf_counter()
+    results = [index.resolve(q) for q in queries]
+    elapsed = time.perf_counter() - t0
+    correct = sum(r is not None and index.entities[r[0]]["name"] == records[i]["name"] for r, i in zip(results, sample))
+    unknown = [{"name": f"{' '.join(rng.sample(words, 2)).title()} Hospital Fund", "country": "Norway"} for _ in range(2000)]
+    t1 = time.perf_counter()
+    false = sum(index.resolve(q) is not None for q in unknown)
+    t_unknown = time.perf_counter() - t1
+    print(f"{len(queries)} respellings of known NGOs: {correct / len(queries):.1%} resolved to the right entity, "
+          f"{elapsed / len(queries) * 1e6:.0f} us each")
+    print(f"{len(unknown)} unknown NGOs: {false} wrongly matched, {t_unknown / len(unknown) * 1e6:.0f} us each")
+    print(f"by website/EIN: {index.resolve({'name': 'Renamed Org', 'website': records[3]['website'] + '/donate'})}, "
+          f"{index.resolve({'name': 'x', 'ein': records[3]['ein']})}")
+    edhi = NGOIndex([{"name": "Edhi Foundation", "country": "Pakistan"}])
+    print(f"'The Edhi Foundation' -> {edhi.resolve({'name': 'The Edhi Foundation', 'country': 'Pakistan'})}, "
+          f"'Edhi Foundaton' -> {edhi.resolve({'name': 'Edhi Foundaton'})}")
@@ -0,0 +1,107 @@
+# ngo_registry.py — indexed NGO registry with pre-serialized /research responses
+import gzip
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from eth_utils import is_address, to_checksum_address
+
+NGO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ngos.json")
+
+# Secondary indexes, in the order /research tries them
+INDEX_FIELDS = ("country", "name", "region", "category", "wallet")
+
+
+class Bucket(namedtuple("Bucket", "ngos body gzip_body etag gzip_etag rejected")):
+    """One index bucket: the NGO list plus its ready-to-send JSON bytes, and
+    how many entries under the same key were rejected."""
+
+    @classmethod
+    def build(cls, ngos, rejected=0):
+        body = json.dumps(ngos, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(body + b"/%d" % rejected).hexdigest()[:32]
+        return cls(tuple(ngos), body, gzip.compress(body, 9, mtime=0), f'"{digest}"', f'"{digest}-gz"', rejected)
+
+
+def valid_wallet(wallet):
+    """The checksummed address, or None if wallet is missing or not an address."""
+    return to_checksum_address(wallet) if wallet and is_address(wallet) else None
+
+
+def _norm(value):
+    return " ".join(str(value).split()).casefold()
+
+
+class NGORegistry:
+    """Loads the NGO list once and keeps one pre-serialized bucket per index key.
+
+    A hot lookup is a dict hit returning bytes that were serialized and
+    gzip-compressed at load time, so /research does no JSON work per request.
+    Wallets are validated and checksummed here, once: an entry whose wallet
+    is not an address is rejected (kept in .rejected) instead of reaching
+    a donation form or a balanceOf call. Rejected entries still count in
+    their buckets' `rejected`, so a country whose every entry was rejected
+    answers an empty list that says so rather than falling back to default.
+    """
+
+    def __init__(self, ngos, default_country="Global", resolve=None):
+        self.ngos, self.rejected = [], []
+        for ngo in ngos:
+            wallet = ngo.get("wallet")
+            if wallet and not valid_wallet(wallet):
+                self.rejected.append(ngo)
+                print(f"NGO registry: rejected {ngo.get('name')!r}, invalid wallet {wallet!r}")
+                continue
+            self.ngos.append(dict(ngo, wallet=valid_wallet(wallet)) if wallet else ngo)
+        if self.rejected:
+            print(f"NGO registry: {len(self.ngos)} NGOs loaded, {len(self.rejected)} rejected")
+        self.resolve = resolve
+        self.indexes = {field: {} for field in INDEX_FIELDS}
+        grouped = {field: {} for field in INDEX_FIELDS}
+        rejected = {field: {} for field in INDEX_FIELDS}
+        for entries, groups in ((self.ngos, grouped), (self.rejected, rejected)):
+            for ngo in entries:
+                for field in INDEX_FIELDS:
+                    if ngo.get(field) and not (field == "wallet" and groups is rejected):
+                        groups[field].setdefault(_norm(ngo[field]), []).append(ngo)
+        for field, groups in grouped.items():
+            self.indexes[field] = {key: Bucket.build(groups.get(key, []), len(rejected[field].get(key, [])))
+                                   for key in {**groups, **rejected[field]}}
+        self.default = self.indexes["country"].get(_norm(default_country)) or Bucket.build([])
+
+    @classmethod
+    def from_file(cls, path=NGO_FILE, **kw):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **kw)
+
+    def get(self, field, value):
+        return self.indexes[field].get(_norm(value))
+
+    def has_country(self, country):
+        """True if the country has at least one NGO that can take donations."""
+        bucket = self.indexes["country"].get(_norm(country))
+        return bool(bucket and bucket.ngos)
+
+    def wallets(self):
+        """[(name, wallet)] for every NGO with a wallet."""
+        return [(ngo["name"], ngo["wallet"]) for ngo in self.ngos if ngo.get("wallet")]
+
+    def countries(self):
+        return sorted({ngo["country"] for ngo in self.ngos})
+
+    def lookup(self, q):
+        """Bucket for a free-text query: exact index hit first, then the
+        resolver (e.g. a city or demonym mapped to its country), then default."""
+        key = _norm(q)
+        for field in INDEX_FIELDS:
+            bucket = self.indexes[field].get(key)
+            if bucket is not None:
+                return bucket
+        if self.resolve:
+            resolved = self.resolve(q)
+            if resolved:
+                bucket = self.indexes["country"].get(_norm(resolved))
+                if bucket is not None:
+                    return bucket
+        return self.default
@@ -0,0 +1,144 @@
+# research_cache.py — single-flight TTL/LRU cache for LLM-backed NGO research
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def normalize_query(q):
+    """'Climate  Europe', 'europe climate!' -> 'climate europe'"""
+    return " ".join(sorted(set(re.findall(r"\w+", q.casefold()))))
+
+
+class DiskTier:
+    """Optional SQLite persistence so cached research survives restarts."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS research_cache "
+                        "(key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT value, fetched_at FROM research_cache WHERE key = ?", (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key, value, fetched_at):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO research_cache VALUES (?, ?, ?)",
+                            (key, json.dumps(value), fetched_at))
+
+
+class ResearchCache:
+    """Results by normalized query with TTL, LRU eviction and stale-while-revalidate.
+
+    Concurrent misses for the same key share one upstream call. Entries older
+    than ``ttl`` but younger than ``ttl + stale_ttl`` are served as-is while a
+    single background refresh runs. Loader errors are never cached.
+    """
+
+    def __init__(self, ttl=3600, stale_ttl=86400, max_entries=1024, path=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.disk = DiskTier(path) if path else None
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "loads": 0, "disk_hits": 0}
+
+    def get_or_load(self, key, loader):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self.entries.move_to_end(key)
+                    self.stats["stale"] += 1
+                    self._refresh_locked(key, loader)
+                    return value
+                del self.entries[key]
+            self.stats["misses"] += 1
+            future, owner = self._flight_locked(key)
+
+        if not owner:
+            return future.result()
+
+        if self.disk:
+            stored = self.disk.get(key)
+            if stored and now - stored[1] < self.ttl:
+                self.stats["disk_hits"] += 1
+                self._finish(key, future, stored[0], stored[1], persist=False)
+                return stored[0]
+        self._load(key, loader, future)
+        return future.result()
+
+    def _flight_locked(self, key):
+        future = self.inflight.get(key)
+        if future is not None:
+            return future, False
+        future = self.inflight[key] = Future()
+        return future, True
+
+    def _refresh_locked(self, key, loader):
+        future, owner = self._flight_locked(key)
+        if owner:
+            threading.Thread(target=self._load, args=(key, loader, future), daemon=True).start()
+
+    def _load(self, key, loader, future):
+        self.stats["loads"] += 1
+        try:
+            value = loader()
+        except BaseException as e:
+            with self.lock:
+                self.inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        self._finish(key, future, value, time.time())
+
+    def _finish(self, key, future, value, fetched_at, persist=True):
+        with self.lock:
+            self.entries[key] = (value, fetched_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.inflight.pop(key, None)
+        if persist and self.disk:
+            self.disk.put(key, value, fetched_at)
+        future.set_result(value)
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+
+    def slow_research():
+        calls.append(1)
+        time.sleep(0.5)  # stand-in for a GPT-4o round trip
+        return [{"name": "Climate Action Network Europe", "country": "Belgium"}]
+
+    cache = ResearchCache(ttl=60)
+    key = normalize_query("climate Europe")
+    with ThreadPoolExecutor(50) as pool:
+        t0 = time.perf_counter()
+        list(pool.map(lambda _: cache.get_or_load(key, slow_research), range(50)))
+    print(f"50 concurrent identical misses: {time.perf_counter() - t0:.2f} s, upstream calls: {len(calls)}")
+
+    n = 200_000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        cache.get_or_load(normalize_query("Europe  climate"), slow_research)
+    print(f"hit latency incl. normalization: {(time.perf_counter() - t0) / n * 1e6:.2f} µs")
+    print("stats:", cache.stats)
@@ -0,0 +1,203 @@
+# rpc_pool.py — latency-ranked RPC endpoint pool with background re-probing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+
+
+class Endpoint:
+    def __init__(self, name, url, chain_id, timeout):
+        self.name = name
+        self.url = url
+        self.chain_id = chain_id
+        # No provider-level retries: a failing endpoint should fail fast and let the pool fail over
+        self.provider = Web3.HTTPProvider(url, request_kwargs={"timeout": timeout},
+                                          exception_retry_configuration=None)
+        self.ewma_ms = None
+        self.healthy = False
+        self.failures = 0
+        self.last_probe = 0.0
+        self.block = None
+        self.reported_chain_id = None  # what eth_chainId answered; None until it has
+
+    def info(self):
+        return {"name": self.name, "rpc": self.url, "chain_id": self.chain_id,
+                "reported_chain_id": self.reported_chain_id, "healthy": self.healthy,
+                "ewma_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+                "failures": self.failures, "block": self.block}
+
+
+class RPCPool:
+    """Sends every JSON-RPC call to the fastest healthy endpoint.
+
+    All endpoints are probed concurrently at start and again every
+    probe_interval seconds in the background. Latency is tracked as an EWMA
+    over probes and real calls; a call that fails on one endpoint marks it
+    unhealthy and is retried on the next-fastest one.
+
+    The pool serves one chain: chain_id, by default the first endpoint's.
+    Each endpoint's eth_chainId is checked before it is first used, and one
+    on another chain is never ranked or failed over to, so reads, nonces
+    and signed transactions all land on the chain they were signed for.
+    """
+
+    def __init__(self, endpoints, chain_id=None, timeout=4, probe_interval=15, alpha=0.3):
+        self.endpoints = [Endpoint(name, url, ep_chain, timeout) for name, url, ep_chain in endpoints]
+        self.chain_id = chain_id if chain_id is not None else self.endpoints[0].chain_id
+        self.probe_interval = probe_interval
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=len(self.endpoints), thread_name_prefix="rpc-probe")
+        self._stop = threading.Event()
+
+    def start(self, wait=3.0):
+        """Probe everything concurrently; return once one endpoint answers or after `wait` seconds."""
+        for ep in self.endpoints:
+            self.executor.submit(self.probe, ep)
+        threading.Thread(target=self._reprobe_loop, daemon=True, name="rpc-reprobe").start()
+        self.ready.wait(wait)
+        return self.best()
+
+    def stop(self):
+        self._stop.set()
+        self.executor.shutdown(wait=False)
+
+    def _reprobe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            for ep in self.endpoints:
+                self.executor.submit(self.probe, ep)
+
+    def _record(self, ep, elapsed_ms, ok):
+        with self.lock:
+            if ok:
+                ep.ewma_ms = elapsed_ms if ep.ewma_ms is None else self.alpha * elapsed_ms + (1 - self.alpha) * ep.ewma_ms
+                ep.healthy = True
+                ep.failures = 0
+            else:
+                ep.healthy = False
+                ep.failures += 1
+        if ok:
+            self.ready.set()
+
+    def probe(self, ep):
+        t0 = time.perf_counter()
+        try:
+            if ep.reported_chain_id is None:
+                resp = ep.provider.make_request("eth_chainId", [])
+                if "result" in resp:
+                    ep.reported_chain_id = int(resp["result"], 16)
+                    if ep.reported_chain_id != self.chain_id:
+                        print(f"RPC pool: {ep.name} is on chain {ep.reported_chain_id}, not {self.chain_id}; not used")
+                t0 = time.perf_counter()
+            ok = False
+            if ep.reported_chain_id == self.chain_id:
+                resp = ep.provider.make_request("eth_blockNumber", [])
+                ok = "result" in resp
+                if ok:
+                    ep.block = int(resp["result"], 16)
+        except Exception:
+            ok = False
+        ep.last_probe = time.time()
+        self._record(ep, (time.perf_counter() - t0) * 1e3, ok)
+
+    def ranked(self):
+        """Healthy endpoints fastest first, then the rest of the pool's chain as a last resort."""
+        with self.lock:
+            healthy = sorted((ep for ep in self.endpoints if ep.healthy), key=lambda ep: ep.ewma_ms)
+            return healthy + [ep for ep in self.endpoints if not ep.healthy and ep.reported_chain_id == self.chain_id]
+
+    def best(self):
+        with self.lock:
+            healthy = [ep for ep in self.endpoints if ep.healthy]
+        return min(healthy, key=lambda ep: ep.ewma_ms) if healthy else None
+
+    def call(self, fn):
+        """Run fn(endpoint) on the fastest endpoint, failing over on transport errors.
+
+        fn should only do transport work (e.g. provider.make_request) so that
+        a validation error is never mistaken for a bad endpoint.
+        """
+        last_error = None
+        for ep in self.ranked():
+            t0 = time.perf_counter()
+            try:
+                result = fn(ep)
+            except (OSError, ValueError) as e:
+                # requests' connection/timeout/HTTP errors are OSErrors; ValueError is an undecodable body
+                self._record(ep, 0, False)
+                last_error = e
+                continue
+            self._record(ep, (time.perf_counter() - t0) * 1e3, True)
+            return result
+        raise ConnectionError(f"All RPC endpoints failed: {last_error}")
+
+    def status(self):
+        ranked = self.ranked()
+        return [ep.info() for ep in ranked + [ep for ep in self.endpoints if ep not in ranked]]
+
+
+class PooledProvider(JSONBaseProvider):
+    """web3 provider that routes every request through an RPCPool."""
+
+    def __init__(self, pool, **kw):
+        super().__init__(**kw)
+        self.pool = pool
+
+    def make_request(self, method, params):
+        return self.pool.call(lambda ep: ep.provider.make_request(method, params))
+
+    def make_batch_request(self, requests):
+        return self.pool.call(lambda ep: ep.provider.make_batch_request(requests))
+
+    def is_connected(self, show_traceback=False):
+        return self.pool.best() is not None
+
+
+# === Demo against local stand-ins: one fast, one slow, one dead endpoint, one on another chain ===
+if __name__ == "__main__":
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    def stub(delay, chain_id=1):
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(delay)
+                result = hex(chain_id) if req["method"] == "eth_chainId" else "0x10"
+                body = json.dumps({"jsonrpc": "2.0", "id": req["id"], "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    slow, fast, other = stub(0.15), stub(0.01), stub(0.0, chain_id=80002)
+    pool = RPCPool([
+        ("other chain", f"http://127.0.0.1:{other.server_port}", 1),  # listed for chain 1, answers 80002
+        ("dead", "http://10.255.255.1:8545", 1),  # unroutable: hangs until timeout
+        ("slow", f"http://127.0.0.1:{slow.server_port}", 1),
+        ("fast", f"http://127.0.0.1:{fast.server_port}", 1),
+    ], chain_id=1, timeout=8, probe_interval=1)
+
+    t0 = time.perf_counter()
+    best = pool.start()
+    print(f"start() returned in {time.perf_counter() - t0:.2f} s (old serial loop: up to 8 s per dead RPC), best: {best.name}")
+    w3 = Web3(PooledProvider(pool))
+    print("block via pool:", w3.eth.block_number)
+
+    fast.shutdown()
+    fast.server_close()
+    t0 = time.perf_counter()
+    print("block after fast endpoint died:", w3.eth.block_number, f"(failover took {time.perf_counter() - t0:.3f} s)")
+    for info in pool.status():
+        print("  ", info)
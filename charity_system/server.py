@@ -1,66 +1,146 @@
-from flask import Flask, send_from_directory, jsonify, request, Response
+from flask import Flask, jsonify, request, Response, redirect
 import json, os, random
 from web3 import Web3
 from flask_cors import CORS
+from gazetteer import Gazetteer, GAZETTEER_FILE
+from ngo_registry import NGORegistry
+from sse_stream import coalesce, sse_body, make_asgi_chat_app
+from fee_oracle import FeeOracle
+from balances import BalanceBook
+from health import HealthMonitor, standard_checks
+from static_assets import StaticAssets
+from upstream import AsyncUpstream
 
-app = Flask(__name__, static_folder='.', static_url_path='')
-CORS(app)
+app = Flask(__name__, static_folder=None)  # files are only reachable through ASSETS below
+CORS(app, expose_headers=["X-NGOs-Rejected"])
 
 # Web3
 w3 = Web3(Web3.HTTPProvider("https://rpc.testnet.arc.network"))
+USDC = Web3.to_checksum_address("0x41e94eb019c0762f9bfcf9fb429c8daa7d4e4d1e")
+# Fee tiers refreshed in the background; sendUSDC() reads them from /fees instead of estimating per click
+FEES = FeeOracle(w3.provider, USDC).start()
 
-# Global NGOs
-GLOBAL_NGOS = {
-    "Pakistan": [
-        {"name": "Akhuwat Foundation", "country": "Pakistan", "wallet": "0x2de592b3951807dfb72931596d11fe93b753881e"},
-        {"name": "Edhi Foundation", "country": "Pakistan", "wallet": "0x1234567890123456789012345678901234567890"}
-    ],
-    "Afghanistan": [
-        {"name": "Doctors Without Borders", "country": "Afghanistan", "wallet": "0xMSF1234567890abcdef1234567890abcdef1234"},
-        {"name": "Save the Children", "country": "Afghanistan", "wallet": "0xSTC1234567890abcdef1234567890abcdef5678"}
-    ],
-    "India": [
-        {"name": "Goonj", "country": "India", "wallet": "0xGOONJ1234567890abcdef1234567890abcdef12"},
-        {"name": "Akshaya Patra", "country": "India", "wallet": "0xAKP1234567890abcdef1234567890abcdef3456"}
-    ],
-    "default": [
-        {"name": "Global Relief Fund", "country": "Global", "wallet": "0xGLOBAL1234567890abcdef1234567890abcdef"},
-        {"name": "Humanity First", "country": "Global", "wallet": "0xHF1234567890abcdef1234567890abcdef123456"}
-    ]
-}
+# NGO registry, loaded and indexed once
+GAZETTEER = Gazetteer.from_file(GAZETTEER_FILE)
+REGISTRY = NGORegistry.from_file(resolve=GAZETTEER.first)
+# Every registered wallet's USDC balance, one batched chain read per block for all viewers
+BALANCES = BalanceBook(w3.provider, USDC, REGISTRY.wallets())
+
+# Agents, RPC and AI/ML API checked concurrently in the background; /health serves the last snapshot
+HEALTH = HealthMonitor(standard_checks(
+    rpc_providers=[("arc", w3.provider)],
+    agent_directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents", "agent_directory.json"),
+    elevenlabs_key=os.getenv("ELEVENLABS_API_KEY"),
+    aiml_key=os.getenv("AIML_API_KEY"),
+    aiml_base=os.getenv("AIML_BASE_URL"),
+), interval=float(os.getenv("HEALTH_INTERVAL", "10"))).start()
+
+# web3.min.js and friends under content-hash URLs, gzip/brotli-compressed once; index.html points at them
+ASSETS = StaticAssets()
 
 @app.route('/')
 def index():
-    return send_from_directory('.', 'index.html')
+    return ASSETS.send_page(request, 'index.html')
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    msg = request.json.get("message", "").lower()
-    
-    response = "Connecting to Orchestrator Agent... Here are verified NGOs in Pakistan. Use the USDC Transfer panel below to send directly!"
-    
-    # Detect country
-    country = "Pakistan"
-    for c in ["afghanistan", "india", "usa", "brazil"]:
-        if c in msg:
-            country = c.title()
-            break
+@app.route('/static/<path:name>')
+def static_asset(name):
+    return ASSETS.send(request, name)
+
+# The assets' old unversioned URLs (/style.css, /web3.min.js) lead to their current fingerprinted ones
+@app.route('/<any(%s):name>' % ", ".join(json.dumps(name) for name in ASSETS.assets))
+def legacy_asset(name):
+    return redirect(ASSETS.url(name), code=302)
+
+def chat_reply(message):
+    # Detect country: first mention that has NGOs listed, else first mention at all
+    mentioned = GAZETTEER.keys(message)
+    country = next((c for c in mentioned if REGISTRY.has_country(c)), mentioned[0] if mentioned else "Pakistan")
     
-    if "afghanistan" in msg:
-        response = f"Connecting to Orchestrator Agent... Here are verified NGOs in Afghanistan. Use the USDC Transfer panel below to send directly!"
+    response = f"Connecting to Orchestrator Agent... Here are verified NGOs in {country}. Use the USDC Transfer panel below to send directly!"
     
-    def stream():
-        for word in response.split():
-            yield word + " "
-            import time
-            time.sleep(0.05)
-    return Response(stream(), mimetype="text/plain")
+    for word in response.split():
+        yield word + " "
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    tokens = chat_reply(request.json.get("message", ""))
+    # EventSource-style clients get SSE frames, plain fetch readers get raw text
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        return Response(sse_body(tokens), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    return Response(coalesce(tokens), mimetype="text/plain")
+
+# With AIML_API_KEY the ASGI /chat streams the AI/ML reply token by token over one pooled async client
+# (UPSTREAM_HTTP2=1 multiplexes it over HTTP/2); without it, the canned reply above
+AIML_KEY = os.getenv("AIML_API_KEY")
+AIML = AsyncUpstream(
+    "aiml", os.getenv("AIML_BASE_URL", "https://api.aimlapi.com"),
+    max_concurrency=int(os.getenv("AIML_MAX_CONCURRENCY", "64")),
+    headers={"Authorization": f"Bearer {AIML_KEY}"},
+    http2=os.getenv("UPSTREAM_HTTP2") == "1",
+) if AIML_KEY else None
+
+async def aiml_reply(message):
+    mentioned = GAZETTEER.keys(message)
+    country = next((c for c in mentioned if REGISTRY.has_country(c)), mentioned[0] if mentioned else "Pakistan")
+    payload = {"model": "gpt-4o", "stream": True, "messages": [
+        {"role": "system", "content": f"You are a charity assistant. The page lists verified NGOs in {country}; "
+                                      "point donors to its USDC Transfer panel to give directly."},
+        {"role": "user", "content": message},
+    ]}
+    async with AIML.stream("POST", "/v1/chat/completions", json=payload, timeout=30) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            choices = json.loads(line[6:]).get("choices") or [{}]
+            token = choices[0].get("delta", {}).get("content")
+            if token:
+                yield token
+
+# ASGI entry point for the streaming /chat: `uvicorn server:asgi_chat`
+asgi_chat = make_asgi_chat_app(aiml_reply if AIML else chat_reply)
 
 @app.route('/research')
 def research():
-    q = request.args.get('q', 'Pakistan').title()
-    ngos = GLOBAL_NGOS.get(q, GLOBAL_NGOS["default"])
-    return jsonify(ngos)
+    bucket = REGISTRY.lookup(request.args.get('q', 'Pakistan'))
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = bucket.gzip_etag if use_gzip else bucket.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if bucket.rejected:  # entries listed here but left out for invalid wallets
+        headers["X-NGOs-Rejected"] = str(bucket.rejected)
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(bucket.gzip_body, mimetype="application/json", headers=headers)
+    return Response(bucket.body, mimetype="application/json", headers=headers)
+
+@app.route('/fees')
+def fees():
+    to = request.args.get('to')
+    if to and not Web3.is_address(to):
+        return jsonify({"error": "invalid address"}), 400
+    try:
+        return jsonify(FEES.quote(to, request.args.get('from')))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 503
+
+@app.route('/health')
+def health():
+    status, body = HEALTH.get(verbose=request.args.get('verbose') == '1')
+    return Response(body, status=status, mimetype="application/json", headers={"Cache-Control": "no-store"})
+
+@app.route('/balances')
+def balances():
+    try:
+        block, body, etag = BALANCES.get()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 503
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
 
 @app.route('/donate', methods=['POST'])
 def donate():
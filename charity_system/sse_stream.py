@@ -0,0 +1,290 @@
+# sse_stream.py — Server-Sent Events streaming for /chat (WSGI + ASGI)
+import asyncio
+import json
+import time
+
+# Flush a buffered chunk once it reaches this many bytes or has waited this long
+MAX_CHUNK_BYTES = 512
+MAX_CHUNK_DELAY = 0.025
+# Bytes buffered per stream before the producer has to wait for the client
+HIGH_WATER = 64 * 1024
+
+
+def sse_event(data, event=None):
+    """Encode one SSE frame. Multi-line data is split into several data: lines."""
+    out = []
+    if event:
+        out.append(f"event: {event}")
+    for line in str(data).split("\n"):
+        out.append(f"data: {line}")
+    return ("\n".join(out) + "\n\n").encode("utf-8")
+
+
+SSE_DONE = sse_event("[DONE]", event="done")
+
+
+def coalesce(tokens, max_bytes=MAX_CHUNK_BYTES, max_delay=MAX_CHUNK_DELAY):
+    """Group a token iterator into chunks bounded by size and age (sync version).
+
+    The first token is sent at once, like StreamBuffer's first chunk: a
+    buffered token only leaves when the next one arrives.
+    """
+    buf, size, started, first = [], 0, 0.0, True
+    for token in tokens:
+        if not token:
+            continue
+        if first:
+            first = False
+            yield token
+            continue
+        if not buf:
+            started = time.monotonic()
+        buf.append(token)
+        size += len(token.encode("utf-8"))
+        if size >= max_bytes or time.monotonic() - started >= max_delay:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+
+
+class StreamBuffer:
+    """Coalescing buffer between an upstream producer and one SSE client.
+
+    The producer appends tokens; the sender takes everything buffered at once.
+    The first chunk goes out immediately, later ones are held back until they
+    reach max_bytes or have aged max_delay.  Once high_water bytes are waiting
+    the producer blocks until the sender drains, which is how a slow client
+    pushes back on the upstream.  Cost per token is a list append, cost per
+    flush is at most one timer.
+    """
+
+    def __init__(self, max_bytes=MAX_CHUNK_BYTES, max_delay=MAX_CHUNK_DELAY, high_water=HIGH_WATER):
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.high_water = high_water
+        self.buf = []
+        self.size = 0
+        self.first_at = 0.0
+        self.closed = False
+        self.flushed_once = False
+        self.ready = asyncio.Event()
+        self.drained = asyncio.Event()
+        self.drained.set()
+
+    async def put(self, token):
+        if not token:
+            return
+        if not self.buf:
+            self.first_at = time.monotonic()
+            self.ready.set()
+        self.buf.append(token)
+        self.size += len(token.encode("utf-8"))
+        if self.size >= self.high_water:
+            self.drained.clear()
+            await self.drained.wait()
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+    async def take(self):
+        """Next coalesced chunk, or None once the producer closed and all is sent."""
+        await self.ready.wait()
+        if self.flushed_once and not self.closed and self.size < self.max_bytes:
+            wait = self.first_at + self.max_delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        if not self.buf:
+            return None
+        chunk = "".join(self.buf)
+        self.buf, self.size = [], 0
+        self.flushed_once = True
+        if not self.closed:
+            self.ready.clear()
+        self.drained.set()
+        return chunk
+
+
+async def aiter_tokens(tokens):
+    """Adapt a sync or async token iterable to an async iterator."""
+    if hasattr(tokens, "__aiter__"):
+        async for token in tokens:
+            yield token
+    else:
+        for token in tokens:
+            yield token
+            await asyncio.sleep(0)
+
+
+def sse_body(tokens, **kw):
+    """WSGI generator: SSE frames for a sync token iterator."""
+    for chunk in coalesce(tokens, **kw):
+        yield sse_event(chunk)
+    yield SSE_DONE
+
+
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream; charset=utf-8"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+    (b"access-control-allow-origin", b"*"),
+]
+
+
+def make_asgi_chat_app(reply_tokens, path="/chat", **buffer_kw):
+    """Build a bare ASGI app serving POST <path> as an SSE stream.
+
+    reply_tokens(message) returns a sync or async iterable of text tokens.
+    Any ASGI server (uvicorn, hypercorn) can run it; each open stream is one
+    coroutine pair instead of one worker thread.
+    """
+
+    async def read_body(receive):
+        body = b""
+        while True:
+            msg = await receive()
+            if msg["type"] == "http.disconnect":
+                return None
+            body += msg.get("body", b"")
+            if not msg.get("more_body"):
+                return body
+
+    async def respond(send, status, body, ctype=b"text/plain"):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", ctype), (b"access-control-allow-origin", b"*"),
+                                (b"access-control-allow-headers", b"Content-Type")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                msg = await receive()
+                if msg["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif msg["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        if scope["path"] != path:
+            return await respond(send, 404, b"Not Found")
+        if scope["method"] == "OPTIONS":
+            return await respond(send, 200, b"")
+        if scope["method"] != "POST":
+            return await respond(send, 405, b"Method Not Allowed")
+
+        raw = await read_body(receive)
+        if raw is None:
+            return
+        try:
+            message = json.loads(raw or b"{}").get("message", "")
+        except (ValueError, AttributeError):
+            return await respond(send, 400, b"Invalid JSON")
+
+        stream = StreamBuffer(**buffer_kw)
+        failure = []
+
+        async def produce():
+            try:
+                async for token in aiter_tokens(reply_tokens(message)):
+                    await stream.put(token)
+            except Exception as e:
+                failure.append(e)
+            finally:
+                stream.close()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            producer.cancel()
+            stream.buf, stream.size = [], 0
+
+        producer = asyncio.create_task(produce())
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": SSE_HEADERS})
+            while True:
+                chunk = await stream.take()
+                if chunk is None:
+                    break
+                await send({"type": "http.response.body", "body": sse_event(chunk), "more_body": True})
+            if watcher.done():
+                return
+            if failure:
+                await send({"type": "http.response.body", "body": sse_event(f"[Stream Error: {failure[0]}]", event="error"),
+                            "more_body": True})
+            await send({"type": "http.response.body", "body": SSE_DONE})
+        finally:
+            producer.cancel()
+            watcher.cancel()
+
+    return app
+
+
+# === Benchmark: legacy sleep-per-word generator vs SSE ===
+def _legacy_stream(response):
+    for word in response.split():
+        yield word + " "
+        time.sleep(0.05)
+
+
+async def _run_asgi_stream(app, message):
+    """Drive one request through the ASGI app in-process; returns (ttfb, total)."""
+    body = json.dumps({"message": message}).encode()
+    sent = asyncio.Event()
+    first = None
+    t0 = time.perf_counter()
+
+    async def receive():
+        if not sent.is_set():
+            sent.set()
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(msg):
+        nonlocal first
+        if msg["type"] == "http.response.body" and msg.get("body") and first is None:
+            first = time.perf_counter() - t0
+
+    scope = {"type": "http", "method": "POST", "path": "/chat", "headers": []}
+    await app(scope, receive, send)
+    return first, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    import statistics
+
+    reply = ("Connecting to Orchestrator Agent... Here are verified NGOs in Pakistan. "
+             "Use the USDC Transfer panel below to send directly!")
+
+    t0 = time.perf_counter()
+    gen = _legacy_stream(reply)
+    next(gen)
+    legacy_ttfb = time.perf_counter() - t0
+    for _ in gen:
+        pass
+    legacy_total = time.perf_counter() - t0
+    print(f"legacy generator : ttfb {legacy_ttfb * 1e3:7.2f} ms   last byte {legacy_total * 1e3:7.1f} ms"
+          f"   streams/core = worker threads (1 thread held {legacy_total:.2f} s per reply)")
+
+    async def upstream(message):
+        # Upstream that emits a token every 2 ms, like a fast LLM
+        for word in reply.split():
+            yield word + " "
+            await asyncio.sleep(0.002)
+
+    app = make_asgi_chat_app(upstream)
+    ttfb, total = asyncio.run(_run_asgi_stream(app, "hi"))
+    print(f"asgi sse         : ttfb {ttfb * 1e3:7.2f} ms   last byte {total * 1e3:7.1f} ms")
+
+    async def many(n):
+        return await asyncio.gather(*(_run_asgi_stream(app, "hi") for _ in range(n)))
+
+    for n in (1000, 5000):
+        t0 = time.perf_counter()
+        results = asyncio.run(many(n))
+        wall = time.perf_counter() - t0
+        ttfbs = sorted(r[0] for r in results)
+        print(f"{n:5d} open streams on 1 core : wall {wall:5.2f} s   {n / wall:7.0f} streams/s"
+              f"   ttfb p50 {statistics.median(ttfbs) * 1e3:6.1f} ms   p99 {ttfbs[int(n * 0.99) - 1] * 1e3:6.1f} ms")
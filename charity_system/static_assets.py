@@ -0,0 +1,187 @@
+# static_assets.py — fingerprinted, precompressed static assets with immutable caching
+#
+#   python static_assets.py    build the compressed variants now (the server builds missing ones at startup)
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from collections import namedtuple
+
+from flask import Response, send_file
+
+try:
+    import brotli
+except ImportError:  # gzip only; `pip install brotli` adds the ~20% smaller br variants
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSETS = ("web3.min.js", "style.css")
+PAGES = ("index.html",)
+IMMUTABLE = "public, max-age=31536000, immutable"
+MIN_SIZE = 1024  # smaller files are not worth a compressed variant
+
+Asset = namedtuple("Asset", "name url digest mimetype variants")  # variants: encoding -> (path, size)
+
+
+def _write_once(path, data):
+    """Content-addressed files never change, so an existing one is reused as is."""
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return path, len(data)
+
+
+def compress(data):
+    """{encoding: bytes} for every encoding worth sending, best first."""
+    out = {}
+    if brotli is not None:
+        out["br"] = brotli.compress(data, quality=11)
+    out["gzip"] = gzip.compress(data, 9, mtime=0)
+    return {enc: body for enc, body in out.items() if len(body) < len(data)}
+
+
+def _choose(accepted, variants):
+    for encoding in variants:
+        if accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+class StaticAssets:
+    """Assets served under content-hash URLs from precompressed files, and pages that point at them.
+
+    Each asset is hashed once at startup and served as
+    /static/<name>.<hash>.<ext> with a one-year immutable Cache-Control:
+    its URL changes whenever its content does, so browsers never have to
+    revalidate it. Brotli and gzip variants are compressed once into
+    cache_dir (named by hash, so an unchanged asset is never compressed
+    again) and sent with send_file, which streams the file through the
+    server's file wrapper (sendfile under gunicorn, X-Sendfile when
+    USE_X_SENDFILE is set) and answers If-None-Match and Range requests.
+    Pages keep their URL and are revalidated by ETag; their references to
+    assets are rewritten to the fingerprinted URLs.
+    """
+
+    def __init__(self, root=ROOT, assets=ASSETS, pages=PAGES, cache_dir=None, prefix="/static"):
+        self.root = root
+        self.prefix = prefix
+        self.cache_dir = cache_dir or os.path.join(root, ".static_cache")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.assets, self.by_url = {}, {}
+        for name in assets:
+            self._add_asset(name)
+        self.pages = {name: self._build_page(name) for name in pages}
+
+    def _add_asset(self, name):
+        path = os.path.join(self.root, name)
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        fingerprinted = f"{stem}.{digest}{ext}"
+        variants = {}
+        if len(data) >= MIN_SIZE:
+            cached = {enc: os.path.join(self.cache_dir, f"{fingerprinted}.{enc}") for enc in ("br", "gzip")}
+            if not os.path.exists(cached["gzip"]) or (brotli is not None and not os.path.exists(cached["br"])):
+                for enc, body in compress(data).items():
+                    _write_once(cached[enc], body)
+            for enc, p in cached.items():
+                if os.path.exists(p):
+                    variants[enc] = (p, os.path.getsize(p))
+        variants[None] = (path, len(data))
+        asset = Asset(name, f"{self.prefix}/{fingerprinted}", digest,
+                      mimetypes.guess_type(name)[0] or "application/octet-stream", variants)
+        self.assets[name] = asset
+        self.by_url[fingerprinted] = asset
+
+    def _build_page(self, name):
+        with open(os.path.join(self.root, name), encoding="utf-8") as f:
+            html = f.read()
+        for asset in self.assets.values():
+            html = re.sub(rf'''(\b(?:src|href)=["'])(?:\./|/)?{re.escape(asset.name)}(["'])''',
+                          rf"\g<1>{asset.url}\g<2>", html)
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        variants = {enc: (data, f'"{digest}-{enc}"') for enc, data in compress(body).items()}
+        variants[None] = (body, f'"{digest}"')
+        return variants
+
+    def url(self, name):
+        return self.assets[name].url
+
+    def send(self, request, fingerprinted):
+        """Response for /static/<fingerprinted>; 404 for anything not built (no path ever reaches the disk)."""
+        asset = self.by_url.get(fingerprinted)
+        if asset is None:
+            return Response("Not Found", status=404, mimetype="text/plain")
+        encoding = _choose(request.accept_encodings, [e for e in asset.variants if e])
+        path, _ = asset.variants[encoding]
+        resp = send_file(path, mimetype=asset.mimetype, conditional=True,
+                         etag=f"{asset.digest}-{encoding}" if encoding else asset.digest, max_age=31536000)
+        resp.headers["Cache-Control"] = IMMUTABLE
+        resp.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        return resp
+
+    def send_page(self, request, name):
+        variants = self.pages[name]
+        encoding = _choose(request.accept_encodings, [e for e in variants if e])
+        body, etag = variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, mimetype="text/html", headers=headers)
+
+    def manifest(self):
+        return {a.name: {"url": a.url, "bytes": {enc or "identity": size for enc, (_, size) in a.variants.items()}}
+                for a in self.assets.values()}
+
+
+# === Build, then compare a first and a repeat page load with serving the raw files ===
+if __name__ == "__main__":
+    import json
+    import time
+
+    from flask import Flask, request
+
+    t0 = time.perf_counter()
+    assets = StaticAssets()
+    print(f"built in {time.perf_counter() - t0:.2f} s: {json.dumps(assets.manifest(), indent=2)}")
+
+    app = Flask(__name__, static_folder=None)
+    app.add_url_rule("/", "index", lambda: assets.send_page(request, "index.html"))
+    app.add_url_rule("/static/<path:name>", "static_asset", lambda name: assets.send(request, name))
+    client = app.test_client()
+    accept = "br, gzip" if brotli else "gzip"
+
+    first = client.get("/", headers={"Accept-Encoding": accept})
+    html = assets.pages["index.html"][None][0].decode()
+    urls = [a.url for a in assets.assets.values() if a.url in html]
+    responses = [client.get(u, headers={"Accept-Encoding": accept}) for u in urls]
+    weight = len(first.get_data()) + sum(len(r.get_data()) for r in responses)
+    raw = sum(os.path.getsize(os.path.join(ROOT, n)) for n in PAGES) + sum(
+        os.path.getsize(os.path.join(ROOT, a.name)) for a in assets.assets.values() if a.url in urls)
+    repeat = client.get("/", headers={"Accept-Encoding": accept, "If-None-Match": first.headers["ETag"]})
+    print(f"first visit: {weight / 1024:,.0f} KiB over the wire vs {raw / 1024:,.0f} KiB raw")
+    for u, r in zip(urls, responses):
+        print(f"  {u}: {r.status_code}, {r.headers.get('Content-Encoding')}, {r.headers['Cache-Control']}")
+    print(f"repeat visit: index.html {repeat.status_code}, assets served from the browser cache (immutable): 0 bytes")
+    ranged = client.get(urls[0], headers={"Range": "bytes=0-99"})
+    print(f"range request: {ranged.status_code} {ranged.headers.get('Content-Range')}")
+
+    data = open(os.path.join(ROOT, "web3.min.js"), "rb").read()
+    n, t0 = 20, time.perf_counter()
+    for _ in range(n):
+        gzip.compress(data, 6)
+    dynamic = (time.perf_counter() - t0) / n
+    n, t0 = 200, time.perf_counter()
+    for _ in range(n):
+        client.get(assets.url("web3.min.js"), headers={"Accept-Encoding": accept}).close()
+    served = (time.perf_counter() - t0) / n
+    print(f"web3.min.js per request: {served * 1e3:.2f} ms precompressed vs {dynamic * 1e3:.1f} ms to gzip on the fly")
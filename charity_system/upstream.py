@@ -0,0 +1,306 @@
+# upstream.py — pooled, concurrency-limited HTTP clients for AI/ML and ElevenLabs
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # only HTTP/2 and AsyncUpstream need it: pip install 'httpx[http2]'
+    httpx = None
+
+
+def _require_httpx(name, what):
+    if httpx is None:
+        raise RuntimeError(f"{name}: {what} needs httpx, which is not installed (pip install 'httpx[http2]')")
+
+
+class UpstreamSaturated(Exception):
+    """Raised when an upstream's bulkhead stays full past acquire_timeout."""
+
+
+class _Stats:
+    def __init__(self, limit):
+        self.lock = threading.Lock()
+        self.limit = limit
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+
+    def admitted(self, waited_for):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if waited_for > 0.001:
+                self.waited += 1
+                self.wait_seconds += waited_for
+
+    def queued(self, delta):
+        with self.lock:
+            self.waiting += delta
+
+    def reject(self):
+        with self.lock:
+            self.rejected += 1
+
+    def released(self, failed):
+        with self.lock:
+            self.in_flight -= 1
+            self.errors += bool(failed)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waiting": self.waiting,
+                "saturation": round(self.in_flight / self.limit, 3),
+                "requests": self.requests,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "waited": self.waited,
+                "avg_wait_ms": round(self.wait_seconds / self.waited * 1e3, 2) if self.waited else 0.0,
+            }
+
+
+class Upstream:
+    """One upstream host: a keep-alive pool plus a bulkhead of max_concurrency slots.
+
+    The pool is sized to the bulkhead, so connections are never opened beyond
+    the limit and a request either reuses a warm connection or waits for a
+    slot. Wait counts and times show when the pool is the bottleneck.
+    http2=True runs the pool on an httpx HTTP/2 client instead of requests
+    (retry then does not apply); without httpx it is a RuntimeError.
+    """
+
+    def __init__(self, name, base_url, max_concurrency=16, headers=None, retry=None,
+                 acquire_timeout=10.0, http2=False):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.acquire_timeout = acquire_timeout
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.stats = _Stats(max_concurrency)
+        if http2:
+            _require_httpx(name, "http2=True")
+            limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+            self.session = httpx.Client(http2=True, limits=limits, headers=headers)
+            return
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry or 0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers or {})
+
+    def _acquire(self):
+        t0 = time.monotonic()
+        self.stats.queued(1)
+        try:
+            ok = self.slots.acquire(timeout=self.acquire_timeout)
+        finally:
+            self.stats.queued(-1)
+        if not ok:
+            self.stats.reject()
+            raise UpstreamSaturated(f"{self.name}: all {self.stats.limit} slots busy for {self.acquire_timeout}s")
+        self.stats.admitted(time.monotonic() - t0)
+
+    def _release(self, failed):
+        self.slots.release()
+        self.stats.released(failed)
+
+    def request(self, method, path, **kw):
+        """Send a request and read the whole body while holding a slot."""
+        self._acquire()
+        failed = True
+        try:
+            r = self.session.request(method, self.base_url + path, **kw)
+            r.content  # read fully so the connection goes back to the pool
+            failed = r.status_code >= 500
+            return r
+        finally:
+            self._release(failed)
+
+    def post(self, path, **kw):
+        return self.request("POST", path, **kw)
+
+    def get(self, path, **kw):
+        return self.request("GET", path, **kw)
+
+    @contextmanager
+    def stream(self, method, path, **kw):
+        """Streaming response; the slot is held until the block exits."""
+        self._acquire()
+        failed = True
+        try:
+            if httpx is not None and isinstance(self.session, httpx.Client):
+                with self.session.stream(method, self.base_url + path, **kw) as r:
+                    yield r
+            else:
+                with self.session.request(method, self.base_url + path, stream=True, **kw) as r:
+                    yield r
+            failed = False
+        finally:
+            self._release(failed)
+
+
+class AsyncUpstream:
+    """Async counterpart of Upstream on httpx.AsyncClient with an asyncio bulkhead.
+
+    Same stats as Upstream, so both kinds report side by side in
+    UpstreamClient.stats(). Needs httpx; http2=True also needs h2.
+    """
+
+    def __init__(self, name, base_url, max_concurrency=64, headers=None, acquire_timeout=10.0, http2=False):
+        _require_httpx(name, "AsyncUpstream")
+        self.name = name
+        self.acquire_timeout = acquire_timeout
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.stats = _Stats(max_concurrency)
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        self.client = httpx.AsyncClient(base_url=base_url.rstrip("/"), http2=http2, limits=limits, headers=headers)
+
+    @asynccontextmanager
+    async def _slot(self):
+        t0 = time.monotonic()
+        self.stats.queued(1)
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats.reject()
+            raise UpstreamSaturated(f"{self.name}: all {self.stats.limit} slots busy for {self.acquire_timeout}s")
+        finally:
+            self.stats.queued(-1)
+        self.stats.admitted(time.monotonic() - t0)
+        outcome = {"failed": True}
+        try:
+            yield outcome
+        finally:
+            self.slots.release()
+            self.stats.released(outcome["failed"])
+
+    async def request(self, method, path, **kw):
+        """Send a request and read the whole body while holding a slot."""
+        async with self._slot() as outcome:
+            r = await self.client.request(method, path, **kw)
+            outcome["failed"] = r.status_code >= 500
+            return r
+
+    async def post(self, path, **kw):
+        return await self.request("POST", path, **kw)
+
+    async def get(self, path, **kw):
+        return await self.request("GET", path, **kw)
+
+    @asynccontextmanager
+    async def stream(self, method, path, **kw):
+        """Streaming response; the slot is held until the block exits."""
+        async with self._slot() as outcome:
+            async with self.client.stream(method, path, **kw) as r:
+                yield r
+            outcome["failed"] = False
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class UpstreamClient:
+    """Registry of named upstreams so every call site shares the same pools."""
+
+    def __init__(self):
+        self.upstreams = {}
+
+    def add(self, name, base_url, **kw):
+        self.upstreams[name] = Upstream(name, base_url, **kw)
+        return self.upstreams[name]
+
+    def add_async(self, name, base_url, **kw):
+        self.upstreams[name] = AsyncUpstream(name, base_url, **kw)
+        return self.upstreams[name]
+
+    def __getitem__(self, name):
+        return self.upstreams[name]
+
+    def stats(self):
+        return {name: u.stats.snapshot() for name, u in self.upstreams.items()}
+
+
+# === Local stub server demo: pooled client vs bare requests.post ===
+if __name__ == "__main__":
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Stub(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        connections = set()
+
+        def do_POST(self):
+            Stub.connections.add(self.client_address)
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(0.02)  # upstream think time
+            body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.request_queue_size = 256
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    payload = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]}
+
+    def bare(_):
+        return requests.post(base + "/v1/chat/completions", json=payload, timeout=5).status_code
+
+    client = UpstreamClient()
+    aiml = client.add("aiml", base, max_concurrency=32)
+    narrow = client.add("narrow", base, max_concurrency=4)
+
+    def pooled(_):
+        return aiml.post("/v1/chat/completions", json=payload, timeout=5).status_code
+
+    def saturated(_):
+        return narrow.post("/v1/chat/completions", json=payload, timeout=5).status_code
+
+    for label, fn in (("bare requests.post  ", bare), ("pooled, 32 slots    ", pooled),
+                      ("pooled, 4 slots     ", saturated)):
+        Stub.connections.clear()
+        with ThreadPoolExecutor(32) as pool:
+            t0 = time.perf_counter()
+            list(pool.map(fn, range(400)))
+        print(f"{label}: 400 calls in {time.perf_counter() - t0:.2f} s, "
+              f"{len(Stub.connections)} TCP connections opened")
+
+    if httpx is not None:  # the async variant: one event loop instead of 32 threads
+        # On loopback its time goes to httpcore's per-request pool bookkeeping (CPU), not to waiting on slots
+        fast = client.add_async("aiml-async", base, max_concurrency=32)
+
+        async def burst():
+            await asyncio.gather(*(fast.post("/v1/chat/completions", json=payload, timeout=5) for _ in range(400)))
+            await fast.aclose()
+
+        Stub.connections.clear()
+        t0 = time.perf_counter()
+        asyncio.run(burst())
+        print(f"async, 32 slots     : 400 calls in {time.perf_counter() - t0:.2f} s, "
+              f"{len(Stub.connections)} TCP connections opened")
+    else:
+        print("async variant skipped: pip install 'httpx[http2]'")
+    for name, snap in client.stats().items():
+        print(f"  {name}: {json.dumps(snap)}")
+    server.shutdown()